@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
+from datetime import datetime
 import ipaddress
 
-from ...dependencies import get_db_session
+from ...dependencies import get_session, get_current_admin, DBSession
+from ...database import get_session_factory, run_in_session
 from ...schemas.order import (
-    OrderCreate, OrderResponse, OrderStatusResponse,
+    OrderCreate, OrderResponse, OrderStatusResponse, OrderListResponse,
     PaymentResponse, YooKassaNotification, get_size_label
 )
 from ...services.order import OrderService
+from ...services.order_export import FORMATTERS
 from ...services.payment import PaymentService
 from ...services.feedback import FeedbackService
 from ...core.logging import get_logger
@@ -71,7 +75,7 @@ def is_yookassa_ip(ip: str) -> bool:
              description="Создает новый заказ и инициирует платеж через ЮKassa. Возвращает токен подтверждения для встраиваемого виджета.")
 async def create_order(
     order_data: OrderCreate,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Создать новый заказ с оплатой через ЮKassa
@@ -79,22 +83,11 @@ async def create_order(
     try:
         logger.info(f"Создание заказа для {order_data.email}")
         
-        # Создаем заказ в базе данных
-        order = order_service.create_order(db, order_data)
-        
-        # Создаем платеж в ЮKassa
-        payment_data = payment_service.create_payment(
-            order_id=order.id,
-            amount=order.total_amount,
-            description=f"Заказ №{order.id}",
-            customer_email=order.email,
-            customer_phone=order.phone,
-            items=order.items,
+        # Создаем заказ, платеж в ЮKassa (вне транзакции БД) и сохраняем ID платежа
+        order, payment_data = await run_in_session(
+            db, order_service.create_order_with_payment, order_data, payment_service.create_payment
         )
         
-        # Обновляем заказ с ID платежа
-        order_service.update_payment_id(db, order.id, payment_data["payment_id"])
-        
         logger.info(f"Заказ {order.id} создан, платеж {payment_data['payment_id']} инициирован")
         
         return PaymentResponse(
@@ -110,18 +103,48 @@ async def create_order(
         )
 
 
+@router.get("/export",
+            summary="Выгрузка заказов",
+            description=(
+                "Потоковая выгрузка заказов в CSV или NDJSON (для админа): одна строка на позицию заказа. "
+                "date_from/date_to ограничивают created_at (date_to не включается), status фильтрует по статусу."
+            ))
+async def export_orders(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$", description="Формат: csv | ndjson"),
+    date_from: Optional[datetime] = Query(None, description="Заказы, созданные начиная с"),
+    date_to: Optional[datetime] = Query(None, description="Заказы, созданные до (не включая)"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Фильтр по статусу заказа"),
+    session_factory=Depends(get_session_factory),
+    current_admin: str = Depends(get_current_admin)
+):
+    """
+    Выгрузка заказов серверным курсором: строки читаются порциями и сразу отдаются клиенту.
+    Сессией владеет сам генератор: ее время жизни совпадает с потоком, а не с обработчиком
+    """
+    # Синхронный генератор Starlette выполняет в пуле потоков
+    chunks = await order_service.stream_export(session_factory, export_format, date_from, date_to, status_filter)
+    formatter = FORMATTERS[export_format]
+    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formatter.extension}"
+    logger.info(f"Выгрузка заказов ({export_format}) запрошена администратором {current_admin}")
+    return StreamingResponse(
+        chunks,
+        media_type=formatter.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{order_id}", response_model=OrderResponse,
             summary="Получить заказ", 
             description="Возвращает полную информацию о заказе по его ID.")
 async def get_order(
     order_id: int,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить заказ по ID
     """
     try:
-        order = order_service.get_order(db, order_id)
+        order = await run_in_session(db, order_service.get_order, order_id)
         if not order:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -145,13 +168,13 @@ async def get_order(
             description="Возвращает текущий статус заказа и ID платежа.")
 async def get_order_status(
     order_id: int,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить статус заказа
     """
     try:
-        order_status = order_service.get_order_status(db, order_id)
+        order_status = await run_in_session(db, order_service.get_order_status, order_id)
         if not order_status:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -170,22 +193,30 @@ async def get_order_status(
         )
 
 
-@router.get("/email/{email}", response_model=List[OrderResponse],
+@router.get("/email/{email}", response_model=Union[List[OrderResponse], OrderListResponse],
             summary="Получить заказы по email", 
-            description="Возвращает список заказов для указанного email адреса.")
+            description=(
+                "Возвращает список заказов для указанного email адреса. "
+                "С параметром cursor (пустой — первая страница) возвращает страницу с next_cursor (keyset-пагинация)."
+            ))
 async def get_orders_by_email(
     email: str,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить заказы по email
     """
     try:
-        orders = order_service.get_orders_by_email(db, email, skip, limit)
+        if cursor is not None:
+            return await run_in_session(db, order_service.get_orders_by_email_page, email, limit, cursor)
+        orders = await run_in_session(db, order_service.get_orders_by_email, email, skip, limit)
         return orders
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении заказов для {email}: {str(e)}")
         raise HTTPException(
@@ -200,7 +231,7 @@ async def get_orders_by_email(
 async def yookassa_webhook(
     request: Request,
     notification: YooKassaNotification,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Обработка webhook от ЮKassa
@@ -224,7 +255,10 @@ async def yookassa_webhook(
             payment_id = notification.object.get("id")
             if payment_id:
                 # Получаем заказ по ID платежа
-                order = order_service.get_order_by_payment_id(db, payment_id)
+                order = await run_in_session(
+                    db, order_service.get_order_by_payment_id, payment_id,
+                    (notification.object.get("metadata") or {}).get("order_id")
+                )
                 if order:
                     # Отладка: проверяем типы данных времени
                     logger.info(f"Order time type: {type(order.order_time)}, value: {order.order_time}")
@@ -234,7 +268,7 @@ async def yookassa_webhook(
                     payment_status = payment_service.get_payment_status(payment_id)
                     if payment_status and payment_status["status"] == "succeeded":
                         # Обновляем статус заказа
-                        order_service.update_order_status(db, order.id, "paid")
+                        await run_in_session(db, order_service.update_order_status, order.id, "paid")
                         
                         # Функция для форматирования времени в MSK
                         def format_msk_time(dt):
@@ -293,9 +327,9 @@ async def yookassa_webhook(
         elif notification.event == "payment.canceled":
             payment_id = notification.object.get("id")
             if payment_id:
-                order = order_service.get_order_by_payment_id(db, payment_id)
+                order = await run_in_session(db, order_service.get_order_by_payment_id, payment_id)
                 if order:
-                    order_service.update_order_status(db, order.id, "canceled")
+                    await run_in_session(db, order_service.update_order_status, order.id, "canceled")
                     logger.info(f"Заказ {order.id} отменен")
         
         return {"status": "ok"}
@@ -310,21 +344,35 @@ async def yookassa_webhook(
         )
 
 
-@router.get("/", response_model=List[OrderResponse],
+@router.get("/", response_model=Union[List[OrderResponse], OrderListResponse],
             summary="Получить все заказы", 
-            description="Возвращает список всех заказов (для админа).")
+            description=(
+                "Возвращает список всех заказов (для админа). "
+                "С параметром cursor (пустой — первая страница) возвращает страницу с next_cursor (keyset-пагинация); "
+                "status фильтрует заказы по статусу."
+            ))
 async def get_all_orders(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status", description="Фильтр по статусу заказа"),
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить все заказы (для админа)
     """
     try:
-        orders = order_service.get_recent_orders(db, skip, limit)
+        if cursor is not None:
+            if status_filter:
+                return await run_in_session(db, order_service.get_orders_by_status_page, status_filter, limit, cursor)
+            return await run_in_session(db, order_service.get_recent_orders_page, limit, cursor)
+        if status_filter:
+            return await run_in_session(db, order_service.get_orders_by_status, status_filter, skip, limit)
+        orders = await run_in_session(db, order_service.get_recent_orders, skip, limit)
         return orders
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении всех заказов: {str(e)}")
         raise HTTPException(
@@ -337,13 +385,13 @@ async def get_all_orders(
             summary="Получить статистику заказов", 
             description="Возвращает статистику по заказам (для админа).")
 async def get_orders_statistics(
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить статистику заказов
     """
     try:
-        stats = order_service.get_orders_statistics(db)
+        stats = await run_in_session(db, order_service.get_orders_statistics)
         return stats
         
     except Exception as e:
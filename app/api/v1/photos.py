@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Path, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
-from ...dependencies import get_db_session, get_current_admin
+from ...dependencies import get_session, get_read_session, get_current_admin, DBSession
+from ...database import run_in_session
 from ...services.file_service import FileService
+from ...services.product import catalog_cache
 from ...schemas.photo import (
     ProductPhotoCreate,
     ProductPhotoUpdate,
     ProductPhotoResponse,
     ProductPhotoUpload
 )
-from ...repositories.photo import ProductPhotoRepository
+from ...repositories.photo import AsyncProductPhotoRepository
 from ...models.photo import ProductPhoto
+from ...core.http_cache import cached_get, encoded_response
+from ...core.invalidation import publish_change
 from ...core.logging import get_logger
 
 router = APIRouter(prefix="/photos", tags=["Фотографии товаров"])
 file_service = FileService()
-photo_repo = ProductPhotoRepository()
+photo_repo = AsyncProductPhotoRepository()
 logger = get_logger("PhotosAPI")
 
 
@@ -25,7 +29,7 @@ async def upload_product_photo(
     product_id: UUID = Query(..., description="ID товара"),
     photo: UploadFile = File(...),
     priority: int = Query(0, ge=0, le=2, description="Приоритет фотографии (0-2)"),
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -46,12 +50,13 @@ async def upload_product_photo(
             file_path=file_path,
             priority=priority
         )
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
+        obj = await photo_repo.create(db, obj)
+        response = ProductPhotoResponse.model_validate(obj)
+        # Фотографии входят в карточку товара и списки каталога
+        await run_in_session(db, publish_change, "product", product_id)
 
         logger.info(f"Фотография {photo.filename} успешно загружена для товара {product_id}")
-        return ProductPhotoResponse.model_validate(obj)
+        return response
 
     except Exception as e:
         logger.error(f"Ошибка при загрузке фотографии для товара {product_id}: {str(e)}")
@@ -61,17 +66,23 @@ async def upload_product_photo(
 @router.get("/product/{product_id}", response_model=List[ProductPhotoResponse])
 async def get_product_photos(
     product_id: UUID,
-    db: Session = Depends(get_db_session)
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить все фотографии товара
     """
     logger.info(f"Запрос фотографий для товара {product_id}")
     
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
     try:
-        photos = photo_repo.get_by_product_id(db, product_id)
+        photos = await photo_repo.get_by_product_id(db, product_id)
         logger.info(f"Возвращено {len(photos)} фотографий для товара {product_id}")
-        return [ProductPhotoResponse.model_validate(p) for p in photos]
+        return encoded_response(request, response, [ProductPhotoResponse.model_validate(p) for p in photos])
     except Exception as e:
         logger.error(f"Ошибка при получении фотографий товара {product_id}: {str(e)}")
         raise
@@ -80,7 +91,7 @@ async def get_product_photos(
 @router.get("/{photo_id}", response_model=ProductPhotoResponse)
 async def get_product_photo(
     photo_id: UUID,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить фотографию по ID
@@ -88,10 +99,7 @@ async def get_product_photo(
     logger.info(f"Запрос фотографии {photo_id}")
     
     try:
-        from sqlalchemy import select
-        from ...models.photo import ProductPhoto
-        stmt = select(ProductPhoto).where(ProductPhoto.id == photo_id)
-        res = db.execute(stmt).scalar_one_or_none()
+        res = await photo_repo.get(db, photo_id)
         if not res:
             logger.warning(f"Фотография {photo_id} не найдена")
             raise HTTPException(status_code=404, detail="Фотография не найдена")
@@ -107,7 +115,7 @@ async def get_product_photo(
 async def update_product_photo(
     photo_id: UUID,
     photo_data: ProductPhotoUpdate,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -116,20 +124,14 @@ async def update_product_photo(
     logger.info(f"Обновление фотографии {photo_id} админом {current_admin}")
     
     try:
-        from sqlalchemy import select
-        from ...models.photo import ProductPhoto
-        stmt = select(ProductPhoto).where(ProductPhoto.id == photo_id)
-        obj = db.execute(stmt).scalar_one_or_none()
+        # Обновляем только переданные непустые поля
+        obj = await photo_repo.update(db, photo_id, ProductPhotoUpdate(**photo_data.model_dump(exclude_none=True)))
         if not obj:
             logger.warning(f"Фотография {photo_id} не найдена для обновления")
             raise HTTPException(status_code=404, detail="Фотография не найдена")
-        if photo_data.name is not None:
-            obj.name = photo_data.name
-        if photo_data.priority is not None:
-            obj.priority = photo_data.priority
-        db.commit()
-        db.refresh(obj)
-        return ProductPhotoResponse.model_validate(obj)
+        response = ProductPhotoResponse.model_validate(obj)
+        await run_in_session(db, publish_change, "product", response.product_id)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -140,7 +142,7 @@ async def update_product_photo(
 @router.delete("/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product_photo(
     photo_id: UUID,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -149,18 +151,16 @@ async def delete_product_photo(
     logger.info(f"Удаление фотографии {photo_id} админом {current_admin}")
     
     try:
-        from sqlalchemy import select
-        from ...models.photo import ProductPhoto
-        stmt = select(ProductPhoto).where(ProductPhoto.id == photo_id)
-        obj = db.execute(stmt).scalar_one_or_none()
+        obj = await photo_repo.get(db, photo_id)
         if not obj:
             logger.warning(f"Фотография {photo_id} не найдена для удаления")
             raise HTTPException(status_code=404, detail="Фотография не найдена")
         # Удаляем файл с диска (мягко)
         file_service.delete_file(obj.file_path)
+        product_id = obj.product_id
         # Удаляем запись
-        db.delete(obj)
-        db.commit()
+        await photo_repo.delete(db, photo_id)
+        await run_in_session(db, publish_change, "product", product_id)
         return
     except HTTPException:
         raise
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
-from ...dependencies import get_db_session, get_current_admin
-from ...services.product import ProductService
+from ...dependencies import get_session, get_read_session, get_current_admin, DBSession
+from ...database import run_in_session
+from ...services.product import ProductService, catalog_cache, product_fields
+from ...services.suggest_index import suggest_index
 from ...schemas.product import (
     ProductCreate, 
     ProductUpdate, 
     ProductResponse, 
-    ProductListResponse
+    ProductListResponse,
+    ProductBatchCreate,
+    ProductBatchUpdate,
+    ProductBatchDelete,
+    ProductBatchResponse,
+    ProductBatchDeleteResponse,
+    ProductSuggestResponse
 )
+from ...core.http_cache import cached_get, encoded_response
 from ...core.logging import get_logger
 
 router = APIRouter(prefix="/products", tags=["Товары"])
@@ -26,7 +35,7 @@ logger = get_logger("ProductsAPI")
 )
 async def create_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -35,7 +44,7 @@ async def create_product(
     logger.info(f"Создание товара '{product_data.name}' админом {current_admin}")
     
     try:
-        result = product_service.create_product(db, product_data)
+        result = await run_in_session(db, product_service.create_product, product_data)
         logger.info(f"Товар '{product_data.name}' успешно создан с ID {result.id}")
         return result
     except Exception as e:
@@ -47,27 +56,46 @@ async def create_product(
     "/",
     response_model=ProductListResponse,
     summary="Список товаров",
-    description="Возвращает список товаров с пагинацией. Поле size — массив чисел (0-4)."
+    description=(
+        "Возвращает список товаров с пагинацией. Поле size — массив чисел (0-4). "
+        "Если передан cursor (пустой — первая страница), используется keyset-пагинация по (order_number, id): "
+        "skip игнорируется, а next_cursor указывает на следующую страницу."
+    )
 )
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
-    limit: int = Query(100, ge=1, le=1000, description="Количество записей")
+    limit: int = Query(100, ge=1, le=1000, description="Количество записей"),
+    cursor: Optional[str] = Query(None, description="Курсор keyset-пагинации из next_cursor"),
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти поля товара через запятую (id — всегда), например id,name,price,soon"
+    ),
+    photos: str = Query(
+        "all",
+        pattern="^(main|all|none)$",
+        description="Фотографии: all — все, main — только главная, none — без фотографий"
+    ),
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить список товаров с пагинацией
     """
-    logger.info(f"Запрос списка товаров: skip={skip}, limit={limit}")
+    logger.info(f"Запрос списка товаров: skip={skip}, limit={limit}, cursor={cursor}")
+    
+    projection = product_fields(fields)
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
     
     try:
-        # Получаем сессию БД напрямую
-        from ...database import SessionLocal
-        db = SessionLocal()
-        try:
-            result = product_service.get_products(db, skip, limit)
-            logger.info(f"Возвращено {len(result.products)} товаров")
-            return result
-        finally:
-            db.close()
+        if cursor is not None:
+            result = await run_in_session(db, product_service.get_products_page, limit, cursor, photos, projection)
+        else:
+            result = await run_in_session(db, product_service.get_products, skip, limit, photos, projection)
+        logger.info(f"Возвращено {len(result.products)} товаров")
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при получении списка товаров: {str(e)}")
         raise
@@ -76,7 +104,7 @@ async def get_products(
 # @router.get("/{product_id}", response_model=ProductResponse)
 # async def get_product(
 #     product_id: UUID,
-#     db: Session = Depends(get_db_session)
+#     db: DBSession = Depends(get_session)
 # ):
 #     """
 #     Получить товар по ID
@@ -88,7 +116,7 @@ async def get_products(
 # async def update_product(
 #     product_id: UUID,
 #     product_data: ProductUpdate,
-#     db: Session = Depends(get_db_session),
+#     db: DBSession = Depends(get_session),
 #     current_admin: str = Depends(get_current_admin)
 # ):
 #     """
@@ -100,7 +128,7 @@ async def get_products(
 # @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 # async def delete_product(
 #     product_id: UUID,
-#     db: Session = Depends(get_db_session),
+#     db: DBSession = Depends(get_session),
 #     current_admin: str = Depends(get_current_admin)
 # ):
 #     """
@@ -116,25 +144,58 @@ async def get_products(
     description="Поиск по названию и цвету."
 )
 async def search_products(
+    request: Request,
+    response: Response,
     q: str = Query(..., min_length=1, description="Поисковый запрос"),
     skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей"),
-    db: Session = Depends(get_db_session)
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти поля товара через запятую (id — всегда), например id,name,price,soon"
+    ),
+    photos: str = Query(
+        "all",
+        pattern="^(main|all|none)$",
+        description="Фотографии: all — все, main — только главная, none — без фотографий"
+    ),
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Поиск товаров по названию, характеристикам или цвету
     """
     logger.info(f"Поиск товаров: query='{q}', skip={skip}, limit={limit}")
     
+    projection = product_fields(fields)
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
     try:
-        result = product_service.search_products(db, q, skip, limit)
+        result = await run_in_session(db, product_service.search_products, q, skip, limit, photos, projection)
         logger.info(f"Поиск по '{q}' вернул {len(result.products)} товаров")
-        return result
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при поиске товаров по '{q}': {str(e)}")
         raise
 
 
+@router.get(
+    "/suggest",
+    response_model=ProductSuggestResponse,
+    summary="Подсказки поиска",
+    description="Названия и артикулы товаров, начинающиеся с введенного текста. Отвечает из памяти, без запросов к БД."
+)
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Начало названия или артикула"),
+    limit: int = Query(10, ge=1, le=50, description="Максимум подсказок")
+):
+    """
+    Подсказки для поля поиска (запрос на каждое нажатие клавиши)
+    """
+    suggest_index.refresh_in_background()
+    return ProductSuggestResponse(suggestions=suggest_index.suggest(q, limit))
+
+
 @router.get(
     "/size/{size}",
     response_model=ProductListResponse,
@@ -142,25 +203,90 @@ async def search_products(
     description="Возвращает товары, содержащие указанный размер в массиве size."
 )
 async def get_products_by_size(
+    request: Request,
+    response: Response,
     size: int = Path(..., ge=0, le=4, description="Размер товара"),
     skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей"),
-    db: Session = Depends(get_db_session)
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти поля товара через запятую (id — всегда), например id,name,price,soon"
+    ),
+    photos: str = Query(
+        "all",
+        pattern="^(main|all|none)$",
+        description="Фотографии: all — все, main — только главная, none — без фотографий"
+    ),
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить товары по размеру
     """
     logger.info(f"Запрос товаров по размеру {size}: skip={skip}, limit={limit}")
     
+    projection = product_fields(fields)
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
     try:
-        result = product_service.get_products_by_size(db, size, skip, limit)
+        result = await run_in_session(db, product_service.get_products_by_size, size, skip, limit, photos, projection)
         logger.info(f"Возвращено {len(result.products)} товаров размера {size}")
-        return result
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при получении товаров размера {size}: {str(e)}")
         raise
 
 
+@router.get(
+    "/sizes/",
+    response_model=ProductListResponse,
+    summary="Товары по нескольким размерам",
+    description="Возвращает товары, у которых есть хотя бы один из размеров: /products/sizes/?size=1&size=2."
+)
+async def get_products_by_sizes(
+    request: Request,
+    response: Response,
+    size: List[int] = Query(..., description="Размеры товара (0-4), параметр повторяется"),
+    skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
+    limit: int = Query(100, ge=1, le=1000, description="Количество записей"),
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти поля товара через запятую (id — всегда), например id,name,price,soon"
+    ),
+    photos: str = Query(
+        "all",
+        pattern="^(main|all|none)$",
+        description="Фотографии: all — все, main — только главная, none — без фотографий"
+    ),
+    db: DBSession = Depends(get_read_session)
+):
+    """
+    Получить товары по нескольким размерам
+    """
+    logger.info(f"Запрос товаров по размерам {size}: skip={skip}, limit={limit}")
+    
+    if any(s < 0 or s > 4 for s in size):
+        logger.warning(f"Некорректные размеры: {size}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Размер должен быть от 0 до 4"
+        )
+    
+    projection = product_fields(fields)
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
+    try:
+        result = await run_in_session(db, product_service.get_products_by_sizes, size, skip, limit, photos, projection)
+        logger.info(f"Возвращено {len(result.products)} товаров размеров {size}")
+        return encoded_response(request, response, result)
+    except Exception as e:
+        logger.error(f"Ошибка при получении товаров размеров {size}: {str(e)}")
+        raise
+
+
 @router.get(
     "/price/range",
     response_model=ProductListResponse,
@@ -168,11 +294,22 @@ async def get_products_by_size(
     description="Возвращает товары в заданном диапазоне цен."
 )
 async def get_products_by_price_range(
+    request: Request,
+    response: Response,
     min_price: int = Query(..., ge=0, description="Минимальная цена"),
     max_price: int = Query(..., ge=0, description="Максимальная цена"),
     skip: int = Query(0, ge=0, description="Количество пропущенных записей"),
     limit: int = Query(100, ge=1, le=1000, description="Количество записей"),
-    db: Session = Depends(get_db_session)
+    fields: Optional[str] = Query(
+        None,
+        description="Только эти поля товара через запятую (id — всегда), например id,name,price,soon"
+    ),
+    photos: str = Query(
+        "all",
+        pattern="^(main|all|none)$",
+        description="Фотографии: all — все, main — только главная, none — без фотографий"
+    ),
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить товары по диапазону цен
@@ -186,10 +323,15 @@ async def get_products_by_price_range(
             detail="Минимальная цена не может быть больше максимальной"
         )
     
+    projection = product_fields(fields)
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
     try:
-        result = product_service.get_products_by_price_range(db, min_price, max_price, skip, limit)
+        result = await run_in_session(db, product_service.get_products_by_price_range, min_price, max_price, skip, limit, photos, projection)
         logger.info(f"Возвращено {len(result.products)} товаров в диапазоне цен {min_price}-{max_price}")
-        return result
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при получении товаров по диапазону цен {min_price}-{max_price}: {str(e)}")
         raise
@@ -203,17 +345,24 @@ async def get_products_by_price_range(
 )
 async def get_product(
     product_id: UUID,
-    db: Session = Depends(get_db_session)
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_session)
 ):
     """
     Получить товар по ID
     """
     logger.info(f"Запрос товара по ID: {product_id}")
     
+    # Версия catalog меняется при любом изменении товара или его фото
+    cached = await cached_get(request, response, catalog_cache)
+    if cached is not None:
+        return cached
+    
     try:
-        result = product_service.get_product(db, product_id)
+        result = await run_in_session(db, product_service.get_product, product_id)
         logger.info(f"Товар {product_id} успешно найден")
-        return result
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при получении товара {product_id}: {str(e)}")
         raise
@@ -228,7 +377,7 @@ async def get_product(
 async def update_product(
     product_id: UUID,
     product_data: ProductUpdate,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -237,7 +386,7 @@ async def update_product(
     logger.info(f"Обновление товара {product_id} админом {current_admin}")
     
     try:
-        result = product_service.update_product(db, product_id, product_data)
+        result = await run_in_session(db, product_service.update_product, product_id, product_data)
         logger.info(f"Товар {product_id} успешно обновлен")
         return result
     except Exception as e:
@@ -253,6 +402,7 @@ async def update_product(
 )
 async def delete_product(
     product_id: UUID,
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -261,14 +411,90 @@ async def delete_product(
     logger.info(f"Удаление товара {product_id} админом {current_admin}")
     
     try:
-        # Локально открываем сессию, чтобы исключить проблемы с Depends
-        from ...database import SessionLocal
-        db = SessionLocal()
-        try:
-            product_service.delete_product(db, product_id)
-            logger.info(f"Товар {product_id} успешно удален")
-        finally:
-            db.close()
+        await run_in_session(db, product_service.delete_product, product_id)
+        logger.info(f"Товар {product_id} успешно удален")
     except Exception as e:
         logger.error(f"Ошибка при удалении товара {product_id}: {str(e)}")
         raise
+
+
+@router.post(
+    "/batch",
+    response_model=ProductBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать товары пакетом",
+    description="Создает до 1000 товаров одним INSERT. Требуется авторизация админа."
+)
+async def create_products_batch(
+    batch: ProductBatchCreate,
+    db: DBSession = Depends(get_session),
+    current_admin: str = Depends(get_current_admin)
+):
+    """
+    Пакетное создание товаров (требует аутентификации)
+    """
+    logger.info(f"Пакетное создание {len(batch.items)} товаров админом {current_admin}")
+    
+    try:
+        products = await run_in_session(db, product_service.bulk_create_products, batch.items)
+        logger.info(f"Создано {len(products)} товаров")
+        return ProductBatchResponse(products=products, total=len(products))
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном создании товаров: {str(e)}")
+        raise
+
+
+@router.patch(
+    "/batch",
+    response_model=ProductBatchResponse,
+    summary="Обновить товары пакетом",
+    description=(
+        "Частично обновляет до 1000 товаров: в каждом элементе id и изменяемые поля. "
+        "Если какого-то товара нет — 404, изменения не применяются. Требуется авторизация админа."
+    )
+)
+async def update_products_batch(
+    batch: ProductBatchUpdate,
+    db: DBSession = Depends(get_session),
+    current_admin: str = Depends(get_current_admin)
+):
+    """
+    Пакетное обновление товаров (требует аутентификации)
+    """
+    logger.info(f"Пакетное обновление {len(batch.items)} товаров админом {current_admin}")
+    
+    try:
+        products = await run_in_session(db, product_service.bulk_update_products, batch.items)
+        logger.info(f"Обновлено {len(products)} товаров")
+        return ProductBatchResponse(products=products, total=len(products))
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном обновлении товаров: {str(e)}")
+        raise
+
+
+@router.post(
+    "/batch/delete",
+    response_model=ProductBatchDeleteResponse,
+    summary="Удалить товары пакетом",
+    description=(
+        "Удаляет до 1000 товаров и записи их фотографий. "
+        "Если какого-то товара нет — 404, ничего не удаляется. Требуется авторизация админа."
+    )
+)
+async def delete_products_batch(
+    batch: ProductBatchDelete,
+    db: DBSession = Depends(get_session),
+    current_admin: str = Depends(get_current_admin)
+):
+    """
+    Пакетное удаление товаров (требует аутентификации)
+    """
+    logger.info(f"Пакетное удаление {len(batch.ids)} товаров админом {current_admin}")
+    
+    try:
+        deleted = await run_in_session(db, product_service.bulk_delete_products, batch.ids)
+        logger.info(f"Удалено {deleted} товаров")
+        return ProductBatchDeleteResponse(deleted=deleted)
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном удалении товаров: {str(e)}")
+        raise
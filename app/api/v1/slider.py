@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Path, Query, Request, Form
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Path, Query, Request, Response, Form
 import uuid
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
-from ...dependencies import get_db_session, get_current_admin
+from ...dependencies import get_session, get_current_admin, DBSession
+from ...database import run_in_session
 from ...services.file_service import FileService
-from ...services.slider import SliderService
+from ...services.slider import SliderService, slider_cache
 from ...schemas.slider import (
     SliderPhotoCreate, 
     SliderPhotoUpdate, 
@@ -14,6 +16,9 @@ from ...schemas.slider import (
     SliderListResponse,
     SliderPhotoSimple
 )
+from ...core.http_cache import cached_get, encoded_response
+from ...core.invalidation import publish_change
+from ...core.single_flight import cached_load_async
 from ...core.logging import get_logger
 
 router = APIRouter(prefix="/slider", tags=["Слайдер"])
@@ -130,6 +135,59 @@ def _find_file_by_id(photo_id: UUID) -> tuple:
     return None, None
 
 
+def _scan_slider_photos(base_url: str) -> SliderListResponse:
+    """Список фото слайдера из каталога и манифеста; ссылки абсолютные от base_url."""
+    import os
+    from pathlib import Path
+    
+    # Путь к папке с фотографиями слайдера (файловая система)
+    slider_dir = Path("/app/uploads/slider")
+    
+    photos = []
+    logger.info(f"Проверка папки: {slider_dir}")
+    logger.info(f"Папка существует: {slider_dir.exists()}")
+    
+    if slider_dir.exists():
+        # Получаем все файлы из папки слайдера
+        files = list(slider_dir.iterdir())
+        manifest = _read_manifest()
+        logger.info(f"Найдено файлов в папке: {len(files)}")
+        
+        for file_path in files:
+            logger.info(f"Проверка файла: {file_path.name}, расширение: {file_path.suffix}")
+            if file_path.is_file() and file_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+                # Читаем order_number из манифеста; если нет — 0
+                mval = manifest.get(file_path.name, 0)
+                if isinstance(mval, dict):
+                    order_number = int(mval.get("order", 0))
+                else:
+                    order_number = int(mval)
+                logger.info(f"Добавление файла: {file_path.name}")
+                
+                # Абсолютный URL для отдачи через статику
+                file_url = base_url.rstrip('/') + f"/app/uploads/slider/{file_path.name}"
+                # Имя отображаемое — из манифеста, иначе имя файла БЕЗ префикса порядка
+                from uuid import UUID, uuid5, NAMESPACE_URL
+                if isinstance(mval, dict) and mval.get("name"):
+                    original_name = mval.get("name")
+                else:
+                    _pref, original_name = _split_prefixed_name(file_path.name)
+                # id из манифеста (если нет — детерминированный uuid5 от имени файла)
+                pid = mval.get("id") if isinstance(mval, dict) else None
+                photo_uuid = UUID(pid) if pid else uuid5(NAMESPACE_URL, file_path.name)
+                photos.append(SliderPhotoSimple(
+                    id=photo_uuid,
+                    name=original_name,
+                    file_path=file_url,
+                    order_number=order_number
+                ))
+        
+        # Сортируем по порядковому номеру, затем по имени
+        photos.sort(key=lambda x: (x.order_number, x.file_path))
+    
+    return SliderListResponse(photos=photos, total=len(photos))
+
+
 @router.post(
     "/upload",
     response_model=SliderPhotoResponse,
@@ -148,6 +206,7 @@ async def upload_slider_photo(
     photo: UploadFile = File(...),
     # Принимаем order_number из multipart/form-data (а не из query)
     order_number: int = Form(0, ge=0, description="Порядковый номер фотографии"),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -176,6 +235,7 @@ async def upload_slider_photo(
             _write_manifest(manifest)
         except Exception as e:
             logger.warning(f"Не удалось записать манифест порядка: {str(e)}")
+        await run_in_session(db, publish_change, "slider", photo_id)
 
         # Возвращаем информацию о загруженном файле (абсолютный URL)
         logger.info(f"Фотография {photo.filename} успешно загружена для слайдера с порядковым номером {order_number}")
@@ -198,63 +258,26 @@ async def upload_slider_photo(
     summary="Список фото слайдера",
     description="Возвращает файлы из каталога /app/uploads/slider с данными из манифеста: id, name, order_number."
 )
-async def get_slider_photos(request: Request):
+async def get_slider_photos(request: Request, response: Response):
     """
     Получить все фотографии слайдера
     """
     logger.info("Запрос фотографий слайдера")
     
+    cached = await cached_get(request, response, slider_cache)
+    if cached is not None:
+        return cached
+    
+    cache_key = str(request.base_url)
     try:
-        import os
-        from pathlib import Path
-        
-        # Путь к папке с фотографиями слайдера (файловая система)
-        slider_dir = Path("/app/uploads/slider")
-        
-        photos = []
-        logger.info(f"Проверка папки: {slider_dir}")
-        logger.info(f"Папка существует: {slider_dir.exists()}")
-        
-        if slider_dir.exists():
-            # Получаем все файлы из папки слайдера
-            files = list(slider_dir.iterdir())
-            manifest = _read_manifest()
-            logger.info(f"Найдено файлов в папке: {len(files)}")
-            
-            for file_path in files:
-                logger.info(f"Проверка файла: {file_path.name}, расширение: {file_path.suffix}")
-                if file_path.is_file() and file_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                    # Читаем order_number из манифеста; если нет — 0
-                    mval = manifest.get(file_path.name, 0)
-                    if isinstance(mval, dict):
-                        order_number = int(mval.get("order", 0))
-                    else:
-                        order_number = int(mval)
-                    logger.info(f"Добавление файла: {file_path.name}")
-                    
-                    # Абсолютный URL для отдачи через статику
-                    file_url = str(request.base_url).rstrip('/') + f"/app/uploads/slider/{file_path.name}"
-                    # Имя отображаемое — из манифеста, иначе имя файла БЕЗ префикса порядка
-                    from uuid import UUID, uuid5, NAMESPACE_URL
-                    if isinstance(mval, dict) and mval.get("name"):
-                        original_name = mval.get("name")
-                    else:
-                        _pref, original_name = _split_prefixed_name(file_path.name)
-                    # id из манифеста (если нет — детерминированный uuid5 от имени файла)
-                    pid = mval.get("id") if isinstance(mval, dict) else None
-                    photo_uuid = UUID(pid) if pid else uuid5(NAMESPACE_URL, file_path.name)
-                    photos.append(SliderPhotoSimple(
-                        id=photo_uuid,
-                        name=original_name,
-                        file_path=file_url,
-                        order_number=order_number
-                    ))
-            
-            # Сортируем по порядковому номеру, затем по имени
-            photos.sort(key=lambda x: (x.order_number, x.file_path))
-        
-        logger.info(f"Возвращено {len(photos)} фотографий слайдера")
-        return SliderListResponse(photos=photos, total=len(photos))
+        # Каталог читается в пуле потоков: одновременные промахи и фоновое обновление устаревшего списка — одно чтение
+        result = await cached_load_async(
+            slider_cache, cache_key, lambda: asyncio.to_thread(_scan_slider_photos, cache_key)
+        )
+        if not isinstance(result, SliderListResponse):
+            result = SliderListResponse.model_validate(result)
+        logger.info(f"Возвращено {len(result.photos)} фотографий слайдера")
+        return encoded_response(request, response, result)
     except Exception as e:
         logger.error(f"Ошибка при получении фотографий слайдера: {str(e)}")
         raise
@@ -268,7 +291,7 @@ async def get_slider_photos(request: Request):
 )
 async def get_slider_photo(
     photo_id: UUID,
-    db: Session = Depends(get_db_session)
+    db: DBSession = Depends(get_session)
 ):
     """
     Получить фотографию слайдера по ID
@@ -310,7 +333,7 @@ async def get_slider_photo(
 async def update_slider_photo(
     photo_id: UUID,
     photo_data: SliderPhotoUpdate,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -338,6 +361,7 @@ async def update_slider_photo(
             mentry["order"] = int(photo_data.order_number)
         manifest[p.name] = mentry
         _write_manifest(manifest)
+        await run_in_session(db, publish_change, "slider", photo_id)
         # Ответ
         current_m = _read_manifest().get(p.name, {})
         current_order = int(current_m.get("order", 0)) if isinstance(current_m, dict) else int(current_m or 0)
@@ -363,7 +387,7 @@ async def update_slider_photo(
 )
 async def delete_slider_photo(
     photo_id: UUID,
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
@@ -393,6 +417,7 @@ async def delete_slider_photo(
             _reindex_orders()
         except Exception as e:
             logger.warning(f"Не удалось переиндексировать порядок после удаления: {str(e)}")
+        await run_in_session(db, publish_change, "slider", photo_id)
         return
     except HTTPException:
         raise
@@ -405,7 +430,7 @@ async def delete_slider_photo(
 async def update_slider_photo_order(
     photo_id: UUID,
     order_number: int = Query(..., ge=0, description="Новый порядковый номер"),
-    db: Session = Depends(get_db_session),
+    db: DBSession = Depends(get_session),
     current_admin: str = Depends(get_current_admin)
 ):
     """
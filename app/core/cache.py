@@ -0,0 +1,503 @@
+import asyncio
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple, TypeVar
+import redis
+from pydantic import BaseModel
+from sqlalchemy.util import await_only
+from .logging import get_logger
+
+logger = get_logger("Cache")
+
+# Значение-маркер промаха в бэкендах (None — допустимое закэшированное значение)
+MISSING = object()
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """
+    Кэш в памяти процесса: время жизни записей (TTL) и вытеснение давно не использованных (LRU).
+    ttl=0 выключает кэш. Отсутствующие объекты кэшируются значением None на negative_ttl секунд.
+
+    generation растет при каждой очистке: значение, прочитанное из БД до очистки,
+    не попадет в кэш (set с устаревшим generation игнорируется).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, negative_ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        (найдено, значение). Значение None при найдено=True — закэшированное отсутствие объекта
+        """
+        if not self.enabled:
+            return False, None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        """
+        Сохранить значение. generation — значение self.generation, снятое до чтения из БД
+        """
+        if not self.enabled:
+            return
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Сбросить все записи (после изменения данных)
+        """
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def _encode_default(value: Any) -> Any:
+    """
+    Pydantic-модели сериализуются в JSON-совместимые словари (UUID и даты — строками)
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется для кэша")
+
+
+class Codec:
+    """
+    Кодирование значений для внешнего кэша: orjson | msgpack | json.
+    Если библиотека не установлена, используется стандартный json.
+    """
+
+    def __init__(self, name: str = "orjson"):
+        self.name = "json"
+        self.dumps: Callable[[Any], bytes] = lambda value: json.dumps(
+            value, default=_encode_default, ensure_ascii=False
+        ).encode("utf-8")
+        self.loads: Callable[[bytes], Any] = json.loads
+        if name == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                logger.warning("orjson не установлен, значения кэша кодируются через json")
+            else:
+                self.name = "orjson"
+                self.dumps = lambda value: orjson.dumps(value, default=_encode_default)
+                self.loads = orjson.loads
+        elif name == "msgpack":
+            try:
+                import msgpack
+            except ImportError:
+                logger.warning("msgpack не установлен, значения кэша кодируются через json")
+            else:
+                self.name = "msgpack"
+                # msgpack не знает UUID и datetime: модели приводятся к JSON-виду заранее
+                self.dumps = lambda value: msgpack.packb(
+                    value.model_dump(mode="json") if isinstance(value, BaseModel) else value,
+                    default=_encode_default,
+                    use_bin_type=True
+                )
+                self.loads = lambda data: msgpack.unpackb(data, raw=False)
+
+
+class CacheBackend:
+    """
+    Хранилище кэша. Ключи — строки, get возвращает MISSING при промахе.
+    encoded=True — значения хранятся байтами (через Codec), иначе объектами как есть.
+    epoch — отличает версии разных хранилищ: у общего кэша пустая (версии общие для воркеров).
+    blocking — вызовы ждут ответа сервера: из event loop их выполняют в пуле потоков (run_cache_call).
+    shared — хранилище общее для всех воркеров: сброс делает один воркер, остальные его видят.
+    """
+    name = "base"
+    encoded = True
+    blocking = True
+    shared = True
+    epoch = ""
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def get_version(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr_version(self, key: str) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Кэш в памяти процесса (у каждого воркера свой). Версии пространств имен не вытесняются.
+    """
+    name = "memory"
+    encoded = False
+    blocking = False
+    shared = False
+
+    def __init__(self, maxsize: int = 1024):
+        # Версии начинаются с 0 в каждом процессе: epoch не дает спутать их между воркерами и перезапусками
+        self.epoch = uuid.uuid4().hex[:8]
+        self.store = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        found, value = self.store.get(key)
+        return value if found else MISSING
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.store.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(key)
+
+    def get_version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def incr_version(self, key: str) -> int:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    def stats(self) -> dict:
+        stats = self.store.stats()
+        return {"backend": self.name, "size": stats["size"], "maxsize": stats["maxsize"], "evictions": stats["evictions"]}
+
+
+class RedisBackend(CacheBackend):
+    """
+    Общий кэш всех воркеров на сервере с протоколом Redis.
+    Недоступность сервера не ломает запросы: чтение считается промахом, запись пропускается,
+    а сервер не опрашивается cooldown секунд.
+
+    Клиент redis-py синхронный (пул соединений потокобезопасен): внутри AsyncSession.run_sync
+    (код сервисов на event loop) ответ сервера ждет поток из пула, а greenlet SQLAlchemy отдает
+    управление циклу; корутины вызывают кэш через run_cache_call.
+    """
+    name = "redis"
+    encoded = True
+
+    def __init__(self, url: str, timeout: float = 0.5, cooldown: float = 5.0):
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        connection = self.client.connection_pool.connection_kwargs
+        self.address = f"{connection.get('host', 'localhost')}:{connection.get('port', 6379)}"
+        self.cooldown = cooldown
+        self.errors = 0
+        self._down_until = 0.0
+
+    def _call(self, default: Any, *args) -> Any:
+        if time.monotonic() < self._down_until:
+            return default
+        try:
+            return self._execute(*args)
+        except (OSError, redis.RedisError) as e:
+            self.errors += 1
+            self._down_until = time.monotonic() + self.cooldown
+            logger.warning(f"Кэш {self.address} недоступен, пропуск на {self.cooldown} с: {str(e)}")
+            return default
+
+    def _execute(self, *args) -> Any:
+        from .single_flight import in_async_session
+        if in_async_session():
+            return await_only(asyncio.to_thread(self.client.execute_command, *args))
+        return self.client.execute_command(*args)
+
+    def get(self, key: str) -> Any:
+        value = self._call(None, "GET", key)
+        return MISSING if value is None else value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._call(None, "SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self._call(None, "DEL", key)
+
+    def get_version(self, key: str) -> int:
+        """
+        Версия пространства имен; -1 — сервер недоступен
+        """
+        value = self._call(MISSING, "GET", key)
+        if value is MISSING:
+            return -1
+        return int(value) if value is not None else 0
+
+    def incr_version(self, key: str) -> int:
+        return self._call(0, "INCR", key)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "errors": self.errors, "available": time.monotonic() >= self._down_until}
+
+
+class Cache:
+    """
+    Пространство имен в общем кэше: ключ {prefix}:{namespace}:v{версия}:{ключ}.
+    invalidate() увеличивает версию — все записи пространства сразу становятся недоступны
+    (старые удаляются по TTL). Значение, прочитанное из БД до invalidate(), сохраняется
+    под старой версией и потому не возвращается (version передается в set).
+
+    stale_ttl > 0 — записи хранятся еще stale_ttl секунд после истечения ttl: lookup() отдает их
+    как устаревшие (stale-while-revalidate), get() — нет. После invalidate() устаревшие записи
+    недоступны, как и свежие: изменения данных видны сразу.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 60.0, negative_ttl: float = 0.0, stale_ttl: float = 0.0):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        _registry[namespace] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def _version_key(self) -> str:
+        return f"{_prefix}:{self.namespace}:version"
+
+    def _key(self, key: Hashable, version: int) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return f"{_prefix}:{self.namespace}:v{version}:" + ":".join(str(part) for part in parts)
+
+    def version(self) -> int:
+        """
+        Текущая версия пространства имен (снимается до чтения из БД и передается в set)
+        """
+        return get_cache_backend().get_version(self._version_key)
+
+    def version_token(self) -> Optional[str]:
+        """
+        Метка состояния пространства имен для кэша готовых ответов (http_cache): меняется при
+        каждом invalidate(). Содержит epoch воркера, поэтому для ETag не годится.
+        None — версия неизвестна (сервер кэша недоступен)
+        """
+        backend = get_cache_backend()
+        version = backend.get_version(self._version_key)
+        return f"{backend.epoch}:{version}" if version >= 0 else None
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        (найдено, значение). Из внешнего кэша модели возвращаются словарями
+        """
+        found, value, stale = self._read(key, None)
+        if not found or stale:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, value
+
+    def lookup(self, key: Hashable, version: Optional[int] = None) -> Tuple[bool, Any, bool]:
+        """
+        (найдено, значение, устарело). Устаревшие записи бывают только при stale_ttl > 0.
+        version — снятая заранее версия (чтобы не запрашивать ее у бэкенда повторно)
+        """
+        found, value, stale = self._read(key, version)
+        if not found:
+            self.misses += 1
+        elif stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return found, value, stale
+
+    def _read(self, key: Hashable, version: Optional[int]) -> Tuple[bool, Any, bool]:
+        if not self.enabled:
+            return False, None, False
+        backend = get_cache_backend()
+        value = backend.get(self._key(key, self.version() if version is None else version))
+        if value is MISSING:
+            return False, None, False
+        if backend.encoded:
+            value = _codec.loads(value)
+        if self.stale_ttl <= 0:
+            return True, value, False
+        # Запись вида [свежа до (unix time), значение]: время общее для всех воркеров.
+        # Запись в другом формате (до включения stale_ttl) считается промахом
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            return False, None, False
+        fresh_until, value = value
+        return True, value, fresh_until <= time.time()
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """
+        Сохранить значение. None — отсутствие объекта, хранится negative_ttl секунд
+        """
+        ttl = self.negative_ttl if value is None else self.ttl
+        if not self.enabled or ttl <= 0:
+            return
+        backend = get_cache_backend()
+        if version is None:
+            version = self.version()
+        if self.stale_ttl > 0:
+            value = [time.time() + ttl, value]
+            if value[1] is not None:
+                ttl += self.stale_ttl
+        backend.set(self._key(key, version), _codec.dumps(value) if backend.encoded else value, ttl)
+
+    def delete(self, key: Hashable) -> None:
+        backend = get_cache_backend()
+        if backend.shared and _skip_shared.get():
+            return
+        backend.delete(self._key(key, self.version()))
+
+    def invalidate(self) -> None:
+        """
+        Сбросить все записи пространства имен (во всех воркерах при общем бэкенде)
+        """
+        backend = get_cache_backend()
+        if backend.shared and _skip_shared.get():
+            return
+        backend.incr_version(self._version_key)
+        logger.debug(f"Кэш {self.namespace} сброшен")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "stale_hits": self.stale_hits,
+            "coalesced": self.coalesced,
+        }
+
+
+# Пространства имен процесса: имя -> Cache
+_registry: Dict[str, Cache] = {}
+_backend: Optional[CacheBackend] = None
+_codec = Codec("json")
+_prefix = "cache"
+_backend_lock = threading.Lock()
+# Изменение пришло от другого воркера: общий кэш он уже сбросил сам
+_skip_shared = contextvars.ContextVar("skip_shared_cache", default=False)
+
+
+def create_cache_backend() -> CacheBackend:
+    """
+    Бэкенд по настройкам CACHE_BACKEND / CACHE_URL
+    """
+    from ..config import settings
+    if settings.cache_backend == "redis":
+        logger.info(f"Общий кэш: {settings.cache_url.rsplit('@', 1)[-1]}")
+        return RedisBackend(settings.cache_url, timeout=settings.cache_socket_timeout)
+    return MemoryBackend(maxsize=settings.cache_memory_size)
+
+
+def configure_cache(backend: Optional[CacheBackend] = None, serializer: Optional[str] = None, prefix: Optional[str] = None) -> None:
+    """
+    Установить бэкенд, кодек и префикс ключей (без аргументов — по настройкам)
+    """
+    global _backend, _codec, _prefix
+    from ..config import settings
+    with _backend_lock:
+        _backend = backend or create_cache_backend()
+        _codec = Codec(serializer or settings.cache_serializer)
+        _prefix = prefix or settings.cache_prefix
+
+
+def get_cache_backend() -> CacheBackend:
+    if _backend is None:
+        configure_cache()
+    return _backend
+
+
+@contextmanager
+def shared_cache_untouched() -> Iterator[None]:
+    """
+    Внутри блока Cache.invalidate() и Cache.delete() не меняют общий бэкенд (версии и записи
+    в нем сбрасывает воркер, сделавший изменение); кэш в памяти процесса сбрасывается как обычно
+    """
+    token = _skip_shared.set(True)
+    try:
+        yield
+    finally:
+        _skip_shared.reset(token)
+
+
+async def run_cache_call(fn: Callable[..., T], *args) -> T:
+    """
+    Вызвать из корутины fn(*args), обращающуюся к кэшу: при сетевом бэкенде — в пуле потоков,
+    чтобы медленный или недоступный сервер не останавливал event loop; кэш в памяти — сразу
+    """
+    if not get_cache_backend().blocking:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+def cache_stats_snapshot() -> Dict[str, Any]:
+    """
+    Счетчики всех пространств имен и состояние бэкенда для эндпоинта метрик
+    """
+    return {
+        "backend": get_cache_backend().stats(),
+        "serializer": _codec.name,
+        "namespaces": {name: cache.stats() for name, cache in _registry.items()},
+    }
@@ -66,3 +66,25 @@ class TelegramBotException(HTTPException):
             detail=f"Ошибка отправки в Telegram: {message}"
         )
 
+
+
+class InvalidCursorException(HTTPException):
+    """
+    Исключение при некорректном курсоре пагинации
+    """
+    def __init__(self, cursor: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Некорректный курсор пагинации: {cursor}"
+        )
+
+
+class InvalidFieldsException(HTTPException):
+    """
+    Исключение при запросе неизвестных полей (?fields=)
+    """
+    def __init__(self, fields: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {fields}"
+        )
@@ -0,0 +1,149 @@
+import hashlib
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from pydantic import BaseModel
+from ..config import settings
+from .cache import Cache, Codec, TTLCache, run_cache_call
+from .compression import add_vary, compress, negotiate_encoding
+
+_codec = Codec("orjson")
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Слабый ETag по содержимому ответа: W/"<sha1[:16]>". Зависит только от данных,
+    поэтому у всех воркеров для одного и того же ответа он одинаковый
+    """
+    return f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Совпадение с заголовком If-None-Match (список через запятую или *, сравнение без учета W/)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cache_control() -> str:
+    """
+    Cache-Control для публичных ответов каталога
+    """
+    value = f"public, max-age={settings.http_cache_max_age}"
+    if settings.http_cache_stale_while_revalidate:
+        value += f", stale-while-revalidate={settings.http_cache_stale_while_revalidate}"
+    return value
+
+
+async def conditional_get(request: Request, cache: Cache) -> Optional[Response]:
+    """
+    Условный GET: если тело ответа для текущей версии пространства имен уже есть в кэше
+    ответов и у клиента тот же ETag — готовый ответ 304 (без запросов к БД и сериализации).
+    Метка версии снимается до чтения данных и запоминается в request.state для кэша ответов
+    """
+    token = await run_cache_call(cache.version_token)
+    request.state.cache_token = token
+    entry = _cached_body(request)
+    return _not_modified(request, entry) if entry is not None else None
+
+
+class EncodedBody:
+    """
+    Готовое JSON-тело ответа и его сжатые варианты: каждая кодировка сжимается один раз
+    на заполнение кэша, а не на каждый запрос
+    """
+
+    __slots__ = ("body", "etag", "variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = make_etag(body)
+        self.variants: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = self.variants[encoding] = compress(self.body, encoding)
+        return variant
+
+
+# Готовые тела ответов в памяти воркера: ключ — (метка версии пространства имен, URL).
+# После изменения данных метка другая, и старые тела больше не находятся (вытесняются по LRU и TTL)
+response_cache = TTLCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl)
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    JSON-тело ответа: pydantic-модели кодируются своим сериализатором (без повторной валидации)
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump_json().encode("utf-8")
+    return _codec.dumps(value)
+
+
+def _cached_body(request: Request) -> Optional[EncodedBody]:
+    token = getattr(request.state, "cache_token", None)
+    if token is None:
+        return None
+    found, entry = response_cache.get((token, str(request.url)))
+    return entry if found else None
+
+
+def _validators(entry: EncodedBody) -> Dict[str, str]:
+    if not settings.http_etag_enabled:
+        return {}
+    return {"ETag": entry.etag, "Cache-Control": cache_control()}
+
+
+def _not_modified(request: Request, entry: EncodedBody) -> Optional[Response]:
+    if settings.http_etag_enabled and etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=_validators(entry))
+    return None
+
+
+def _json_response(entry: EncodedBody, request: Request, response: Response) -> Response:
+    # Заголовки из response, кроме длины пустого тела, и ETag/Cache-Control по телу ответа
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    headers.update(_validators(entry))
+    encoding = None
+    if settings.compression_enabled and len(entry.body) >= settings.compression_min_size:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    result = Response(content=entry.encoded(encoding), media_type="application/json", headers=headers)
+    if settings.compression_enabled:
+        add_vary(result.headers)
+    if encoding is not None:
+        # Тело уже сжато: CompressionMiddleware пропускает ответы с Content-Encoding
+        result.headers["Content-Encoding"] = encoding
+    return result
+
+
+async def cached_get(request: Request, response: Response, cache: Cache) -> Optional[Response]:
+    """
+    Начало кэшируемого GET: 304 либо готовое тело из кэша ответов. None — ответ нужно построить
+    и вернуть через encoded_response()
+    """
+    not_modified = await conditional_get(request, cache)
+    if not_modified is not None:
+        return not_modified
+    entry = _cached_body(request)
+    return _json_response(entry, request, response) if entry is not None else None
+
+
+def encoded_response(request: Request, response: Response, value: Any) -> Response:
+    """
+    Закодировать ответ один раз и сохранить тело в кэш ответов. Возвращается готовый Response:
+    FastAPI не повторяет валидацию по response_model и кодирование. Если у клиента уже
+    есть такое же тело (ETag получен от другого воркера) — 304
+    """
+    entry = EncodedBody(encode_json(value))
+    token = getattr(request.state, "cache_token", None)
+    if token is not None:
+        response_cache.set((token, str(request.url)), entry)
+    not_modified = _not_modified(request, entry)
+    return not_modified if not_modified is not None else _json_response(entry, request, response)
@@ -0,0 +1,221 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from .cache import get_cache_backend, run_cache_call, shared_cache_untouched
+from .logging import get_logger
+
+logger = get_logger("Invalidation")
+
+# Канал PostgreSQL, в который пишутся изменения каталога: payload вида "<entity>:<id>" или "<entity>:*"
+CHANNEL = "catalog_changed"
+
+# Обработчики изменений: сущность -> функция(id), сбрасывающая локальные кэши
+_handlers: Dict[str, Callable[[str], None]] = {}
+
+# Функции, вызываемые при любом изменении до обработчиков сущностей
+_hooks: List[Callable[[str], None]] = []
+
+# Ключ в session.info: изменения, которые применяются к локальным кэшам после commit
+_PENDING = "pending_changes"
+
+# PID серверных процессов PostgreSQL, через которые этот воркер отправлял NOTIFY:
+# свои уведомления слушатель пропускает (они уже применены после commit).
+# PID хранится и в info соединения пула и забывается при его закрытии
+_BACKEND_PID = "notify_backend_pid"
+_own_pids: Set[int] = set()
+
+
+def on_change(entity: str, handler: Callable[[str], None]) -> None:
+    """
+    Зарегистрировать сброс локальных кэшей для сущности (product, slider, ...)
+    """
+    _handlers[entity] = handler
+
+
+def on_any_change(hook: Callable[[str], None]) -> None:
+    """
+    Зарегистрировать функцию, вызываемую с payload при любом изменении до сброса кэшей
+    """
+    _hooks.append(hook)
+
+
+def apply_change(payload: str) -> None:
+    """
+    Применить изменение "<entity>:<id>" к локальным кэшам процесса
+    """
+    for hook in _hooks:
+        try:
+            hook(payload)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке изменения {payload}: {str(e)}")
+    entity, _, entity_id = payload.partition(":")
+    handler = _handlers.get(entity)
+    if handler is None:
+        logger.debug(f"Нет обработчика изменения {payload}")
+        return
+    try:
+        handler(entity_id or "*")
+    except Exception as e:
+        logger.error(f"Ошибка при сбросе кэша по изменению {payload}: {str(e)}")
+
+
+def apply_all() -> None:
+    """
+    Сбросить кэши всех сущностей (уведомления могли быть пропущены)
+    """
+    for entity in list(_handlers):
+        apply_change(f"{entity}:*")
+
+
+def apply_remote_change(payload: Optional[str] = None) -> None:
+    """
+    Применить изменение другого воркера (None — все сущности): общий кэш уже сброшен
+    им самим, поэтому сбрасываются только данные этого процесса
+    """
+    with shared_cache_untouched():
+        if payload is None:
+            apply_all()
+        else:
+            apply_change(payload)
+
+
+def publish_change(db: Session, entity: str, entity_id: Any = "*") -> None:
+    """
+    Сообщить об изменении сущности: локальные кэши сбрасываются после commit транзакции,
+    остальные воркеры получают NOTIFY catalog_changed (PostgreSQL доставляет его тоже при commit).
+    Внутри unit_of_work изменение фиксируется вместе с ним, вне — отдельным commit.
+    """
+    from ..database import in_unit_of_work
+    payload = f"{entity}:{entity_id}"
+    db.info.setdefault(_PENDING, []).append(payload)
+    in_uow = in_unit_of_work(db)
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            _, pid = db.execute(select(func.pg_notify(CHANNEL, payload), func.pg_backend_pid())).one()
+            db.connection().info[_BACKEND_PID] = pid
+            _own_pids.add(pid)
+        if not in_uow:
+            db.commit()
+    except SQLAlchemyError as e:
+        if in_uow:
+            raise
+        # Данные уже сохранены: локальный кэш сбрасываем, остальные воркеры обновятся по TTL
+        logger.warning(f"Не удалось отправить уведомление {payload}: {str(e)}")
+        db.rollback()
+        apply_change(payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    for payload in session.info.pop(_PENDING, ()):
+        apply_change(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_changes(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+@event.listens_for(Pool, "close")
+def _forget_backend_pid(dbapi_connection, connection_record) -> None:
+    # Серверный процесс завершается вместе с соединением, его PID может достаться другому воркеру
+    _own_pids.discard(connection_record.info.pop(_BACKEND_PID, None))
+
+
+def listener_dsn(database_url: str) -> str:
+    """
+    DSN для asyncpg из URL SQLAlchemy (без указания драйвера)
+    """
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class ChangeListener:
+    """
+    Фоновая задача: отдельное соединение asyncpg слушает канал catalog_changed и сбрасывает
+    локальные кэши по уведомлениям других воркеров. При разрыве соединение восстанавливается,
+    а кэши сбрасываются целиком — уведомления за время разрыва потеряны.
+    Уведомления этого же воркера (PID отправителя из _own_pids) пропускаются, версии в общем
+    кэше не меняются — их уже сбросил отправитель. Обращения к внешнему кэшу выполняются
+    в пуле потоков (run_cache_call), не блокируя event loop.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = CHANNEL,
+        reconnect_delay: float = 5.0,
+        ping_interval: float = 30.0,
+        connect: Optional[Callable[[str], Awaitable[Any]]] = None
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.ping_interval = ping_interval
+        self._connect = connect
+        self._task: Optional[asyncio.Task] = None
+        self._applying: Set[asyncio.Task] = set()
+        self.received = 0
+        self.skipped_own = 0
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        if pid in _own_pids:
+            self.skipped_own += 1
+            return
+        self.received += 1
+        if not get_cache_backend().blocking:
+            apply_remote_change(payload)
+            return
+        task = asyncio.get_running_loop().create_task(run_cache_call(apply_remote_change, payload))
+        self._applying.add(task)
+        task.add_done_callback(self._applying.discard)
+
+    async def _open(self):
+        if self._connect is not None:
+            return await self._connect(self.dsn)
+        import asyncpg
+        return await asyncpg.connect(self.dsn)
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                conn = await self._open()
+                try:
+                    closed = asyncio.Event()
+                    conn.add_termination_listener(lambda _conn: closed.set())
+                    await conn.add_listener(self.channel, self._on_notification)
+                    if connected_before:
+                        await run_cache_call(apply_remote_change)
+                    connected_before = True
+                    logger.info(f"Подписка на канал {self.channel} активна")
+                    while not closed.is_set():
+                        try:
+                            await asyncio.wait_for(closed.wait(), timeout=self.ping_interval)
+                        except asyncio.TimeoutError:
+                            # Проверка, что соединение живо (обрыв без закрытия сокета)
+                            await asyncio.wait_for(conn.execute("SELECT 1"), timeout=self.ping_interval)
+                    logger.warning(f"Соединение подписки на {self.channel} закрыто")
+                finally:
+                    if not conn.is_closed():
+                        await conn.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Подписка на канал {self.channel} недоступна: {str(e)}")
+            await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,37 @@
+import base64
+import json
+from typing import Any, List, Optional
+from .exceptions import InvalidCursorException
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Закодировать ключ последней записи страницы в непрозрачный курсор
+    """
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    Раскодировать курсор. Пустой курсор означает первую страницу (None).
+    Некорректный курсор — InvalidCursorException (400).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise InvalidCursorException(cursor)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorException(cursor)
+    return values
+
+
+def _to_json(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .logging import get_logger
+
+logger = get_logger("PoolMetrics")
+
+# Границы гистограммы ожидания соединения, секунды
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class _CheckoutTimerMixin:
+    """
+    Замер ожидания соединения в пуле: время _do_get кладется в info записи соединения,
+    откуда его забирает обработчик события checkout
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        record = super()._do_get()
+        record.info["checkout_wait"] = time.perf_counter() - start
+        return record
+
+
+class TimedQueuePool(_CheckoutTimerMixin, QueuePool):
+    """
+    QueuePool с замером ожидания соединения
+    """
+
+
+class TimedAsyncAdaptedQueuePool(_CheckoutTimerMixin, AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool с замером ожидания соединения
+    """
+
+
+class PoolMetrics:
+    """
+    Счетчики пула соединений одного движка
+    """
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Текущее состояние пула и накопленные счетчики
+        """
+        pool = self.engine.pool
+        state = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            state.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        with self._lock:
+            buckets = {f"le_{bound}": n for bound, n in zip(WAIT_BUCKETS, self.wait_buckets)}
+            buckets["inf"] = self.wait_buckets[-1]
+            state.update(
+                checkouts=self.checkouts,
+                connects=self.connects,
+                invalidations=self.invalidations,
+                checkout_wait_avg_ms=round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                checkout_wait_max_ms=round(self.wait_max * 1000, 3),
+                checkout_wait_buckets=buckets,
+            )
+        return state
+
+
+# Метрики всех движков приложения: имя -> PoolMetrics
+_registry: Dict[str, PoolMetrics] = {}
+
+
+def install_pool_metrics(engine, name: str) -> PoolMetrics:
+    """
+    Подключить сбор метрик к движку (для AsyncEngine передается engine.sync_engine)
+    """
+    metrics = PoolMetrics(name, engine)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout(connection_record.info.pop("checkout_wait", 0.0))
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+        logger.warning(f"Соединение пула {name} инвалидировано: {exception}")
+
+    _registry[name] = metrics
+    return metrics
+
+
+def pool_metrics_snapshot() -> Dict[str, dict]:
+    """
+    Состояние всех пулов для эндпоинта метрик
+    """
+    return {name: metrics.snapshot() for name, metrics in _registry.items()}
@@ -0,0 +1,132 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..config import settings
+from .logging import get_logger
+
+logger = get_logger("QueryStats")
+
+# Статистика запросов текущего HTTP-запроса (или блока track_queries)
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*[?%$:][\w()\[\]]*\s*,?)+\)", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Форма SQL-запроса без литералов: одинаковые запросы с разными параметрами дают одну форму
+    """
+    shape = _STRING_RE.sub("?", statement)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _WHITESPACE_RE.sub(" ", shape).strip()
+    return _IN_LIST_RE.sub("IN (...)", shape)
+
+
+class QueryStats:
+    """
+    Количество и суммарное время SQL-запросов в рамках одного HTTP-запроса
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """
+        Формы запросов, выполненные больше threshold раз (признак N+1)
+        """
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+@contextmanager
+def track_queries():
+    """
+    Подсчитать запросы внутри блока. Пригодно для бюджетов запросов в тестах:
+
+        with track_queries() as stats:
+            service.get_products(db)
+        assert stats.count <= 2
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def install_query_listeners(engine: Engine) -> None:
+    """
+    Подключить учет запросов к движку (для AsyncEngine передается engine.sync_engine)
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: считает SQL-запросы каждого HTTP-запроса, отдает заголовки
+    X-DB-Queries и Server-Timing и предупреждает о повторяющихся запросах (N+1)
+    """
+
+    def __init__(self, app, repeat_threshold: Optional[int] = None):
+        self.app = app
+        self.repeat_threshold = settings.db_query_repeat_threshold if repeat_threshold is None else repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"'.encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            for shape, n in stats.repeated(self.repeat_threshold):
+                logger.warning(
+                    f"Возможный N+1: запрос выполнен {n} раз за {scope.get('method')} {scope.get('path')}: {shape[:300]}"
+                )
@@ -0,0 +1,57 @@
+import itertools
+import threading
+import time
+from typing import Dict, Generic, Iterator, List, TypeVar
+from .logging import get_logger
+
+logger = get_logger("Replicas")
+
+EngineType = TypeVar("EngineType")
+
+
+class ReplicaRouter(Generic[EngineType]):
+    """
+    Выбор реплики для чтения: round-robin по репликам, упавшая реплика исключается
+    на cooldown секунд, после всех реплик — primary. После изменения данных (prefer_primary)
+    чтение на время идет только из primary: реплики могут отставать
+    """
+
+    def __init__(self, primary: EngineType, replicas: List[EngineType], cooldown: float = 30.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.cooldown = cooldown
+        self._cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._down_until: Dict[int, float] = {}
+        self._primary_until = 0.0
+        self._lock = threading.Lock()
+
+    def candidates(self) -> Iterator[EngineType]:
+        """
+        Движки в порядке попыток подключения: доступные реплики начиная со следующей по кругу, затем primary
+        """
+        now = time.monotonic()
+        if self._cycle is not None and now >= self._primary_until:
+            with self._lock:
+                start = next(self._cycle)
+            for offset in range(len(self.replicas)):
+                index = (start + offset) % len(self.replicas)
+                if self._down_until.get(index, 0.0) <= now:
+                    yield self.replicas[index]
+        yield self.primary
+
+    def prefer_primary(self, seconds: float) -> None:
+        """
+        Читать только из primary ближайшие seconds секунд
+        """
+        with self._lock:
+            self._primary_until = max(self._primary_until, time.monotonic() + seconds)
+
+    def mark_failed(self, engine: EngineType, error: Exception) -> None:
+        """
+        Исключить реплику из ротации на cooldown секунд
+        """
+        for index, replica in enumerate(self.replicas):
+            if replica is engine:
+                self._down_until[index] = time.monotonic() + self.cooldown
+                logger.warning(f"Реплика {index} недоступна, исключена на {self.cooldown} с: {str(error)}")
+                return
@@ -0,0 +1,231 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, TypeVar
+from greenlet import getcurrent
+from sqlalchemy.util import await_only
+from .cache import Cache, run_cache_call
+from .logging import get_logger
+
+logger = get_logger("SingleFlight")
+
+T = TypeVar("T")
+
+# Event loop, из которого запущен код в потоке (run_in_session в sync-режиме): через него
+# планируются фоновые обновления кэша
+request_loop: contextvars.ContextVar[Optional[asyncio.AbstractEventLoop]] = contextvars.ContextVar(
+    "request_loop", default=None
+)
+
+
+def in_async_session() -> bool:
+    """
+    Код выполняется внутри AsyncSession.run_sync: корутины можно ждать через await_only,
+    не блокируя event loop (run_sync запускает функцию в дочернем greenlet, у основного parent нет)
+    """
+    return getcurrent().parent is not None
+
+
+def _leader_cancelled(future: asyncio.Future) -> bool:
+    """
+    Вычисление отменено вместе с запросом-лидером (клиент отключился), а текущий запрос — нет
+    """
+    return future.cancelled() and not asyncio.current_task().cancelling()
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вычислений одного ключа в процессе: первый запрос (лидер) вычисляет
+    значение, остальные ждут его результат (или ошибку). Если лидер отменен, вычисление
+    повторяет один из ожидающих.
+
+    do() — для синхронного кода сервисов: в async-режиме (внутри run_sync) ожидание идет через
+    greenlet SQLAlchemy, в sync-режиме (код в пуле потоков) ожидающий поток блокируется до
+    результата лидера. run() — для корутин.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._threads: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        (значение, получено ли оно от другого запроса)
+        """
+        if not in_async_session():
+            return self._do_in_thread(key, fn)
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                return await_only(asyncio.shield(future)), True
+            except asyncio.CancelledError:
+                if not _leader_cancelled(future):
+                    raise
+        future = self._lead(key)
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    def _do_in_thread(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        with self._lock:
+            future = self._threads.get(key)
+            leader = future is None
+            if leader:
+                future = self._threads[key] = concurrent.futures.Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._threads[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._threads[key]
+        future.set_result(result)
+        return result, False
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        (значение, получено ли оно от другого запроса)
+        """
+        while key in self._inflight:
+            future = self._inflight[key]
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not _leader_cancelled(future):
+                    raise
+        future = self._lead(key)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    def _lead(self, key: Hashable) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def _finish(self, key: Hashable, future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            # Ожидающих может не быть: ошибка уже передана лидеру, в лог asyncio ее не пишем
+            future.exception()
+        else:
+            future.set_result(result)
+
+
+_flight = SingleFlight()
+# Ключи, которые сейчас обновляются в фоне, и сами задачи (чтобы их не собрал GC)
+_refreshing: Set[Hashable] = set()
+_tasks: Set[asyncio.Task] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _schedule_refresh(cache: Cache, key: Hashable, version: int, refresh: Callable[[], Awaitable[Any]]) -> bool:
+    """
+    Обновить запись в фоне (одна задача на ключ). Из потока (sync-режим) задача создается
+    в event loop запроса. False — нет event loop (вызов вне приложения)
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        in_loop = True
+    except RuntimeError:
+        loop, in_loop = request_loop.get(), False
+        if loop is None or loop.is_closed():
+            return False
+    flight_key = (cache.namespace, version, key)
+    with _refreshing_lock:
+        if flight_key in _refreshing:
+            return True
+        _refreshing.add(flight_key)
+
+    async def run() -> None:
+        try:
+            value = await refresh()
+            await run_cache_call(cache.set, key, value, version)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить кэш {cache.namespace} в фоне: {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(flight_key)
+
+    def start() -> None:
+        # Пустой контекст: запросы фонового обновления не попадают в статистику HTTP-запроса
+        task = loop.create_task(run(), context=contextvars.Context())
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+    if in_loop:
+        start()
+    else:
+        loop.call_soon_threadsafe(start)
+    return True
+
+
+def cached_load(
+    cache: Cache,
+    key: Hashable,
+    load: Callable[[], T],
+    refresh: Optional[Callable[[], Awaitable[T]]] = None
+) -> T:
+    """
+    Значение из кэша либо load() с сохранением в кэш; одновременные промахи одного ключа
+    выполняют load() один раз. Устаревшая запись (stale_ttl) возвращается сразу, а refresh() —
+    корутина, вычисляющая значение в своей сессии, — обновляет ее в фоне.
+    Из внешнего кэша модели возвращаются словарями.
+    """
+    version = cache.version()
+    found, value, stale = cache.lookup(key, version)
+    if found and not stale:
+        return value
+    if found and refresh is not None and _schedule_refresh(cache, key, version, refresh):
+        return value
+
+    def compute() -> T:
+        result = load()
+        cache.set(key, result, version)
+        return result
+
+    value, coalesced = _flight.do((cache.namespace, version, key), compute)
+    if coalesced:
+        cache.coalesced += 1
+    return value
+
+
+async def cached_load_async(cache: Cache, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+    """
+    Асинхронный вариант cached_load: load() — корутина, она же обновляет устаревшую запись в фоне.
+    Обращения к кэшу выполняются через run_cache_call
+    """
+    version = await run_cache_call(cache.version)
+    found, value, stale = await run_cache_call(cache.lookup, key, version)
+    if found and not stale:
+        return value
+    if found and _schedule_refresh(cache, key, version, load):
+        return value
+
+    async def compute() -> T:
+        result = await load()
+        await run_cache_call(cache.set, key, result, version)
+        return result
+
+    value, coalesced = await _flight.run((cache.namespace, version, key), compute)
+    if coalesced:
+        cache.coalesced += 1
+    return value
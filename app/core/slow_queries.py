@@ -0,0 +1,147 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .logging import get_logger
+from .query_stats import statement_shape
+
+logger = get_logger("SlowQueries")
+
+# Слои, по которым ищется метод-источник запроса (в порядке приоритета)
+_ORIGIN_MODULES = ("app.repositories", "app.services", "app.api")
+_MAX_PARAMS_LENGTH = 500
+
+
+def statement_fingerprint(statement: str) -> str:
+    """
+    Короткий отпечаток формы запроса (без литералов) для дедупликации планов
+    """
+    return hashlib.sha1(statement_shape(statement).encode("utf-8")).hexdigest()[:12]
+
+
+def find_query_origin() -> str:
+    """
+    Метод, из которого выполнен запрос, например ProductRepository.search_products
+    """
+    frame = sys._getframe(1)
+    candidates: Dict[str, str] = {}
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        for prefix in _ORIGIN_MODULES:
+            if prefix not in candidates and module.startswith(prefix):
+                owner = frame.f_locals.get("self")
+                name = frame.f_code.co_name
+                candidates[prefix] = f"{type(owner).__name__}.{name}" if owner is not None else f"{module}.{name}"
+        frame = frame.f_back
+    for prefix in _ORIGIN_MODULES:
+        if prefix in candidates:
+            return candidates[prefix]
+    return "unknown"
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных запросов: запрос дольше порога пишется в лог с параметрами и методом-источником.
+    Для SELECT в PostgreSQL (psycopg2) в фоне снимается EXPLAIN (ANALYZE, BUFFERS): один план
+    на отпечаток запроса за explain_interval секунд и не больше explain_per_minute планов в минуту.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        threshold: float,
+        explain: bool = False,
+        explain_interval: float = 3600.0,
+        explain_per_minute: int = 5
+    ):
+        self.engine = engine
+        self.threshold = threshold
+        self.explain = explain and self._can_explain(engine)
+        self.explain_interval = explain_interval
+        self.explain_per_minute = explain_per_minute
+        self._explained: Dict[str, float] = {}
+        self._recent_explains: deque = deque()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _can_explain(engine: Engine) -> bool:
+        # EXPLAIN выполняется отдельным соединением из фонового потока — нужен синхронный драйвер
+        return engine.dialect.name == "postgresql" and not engine.dialect.is_async
+
+    def record(self, statement: str, parameters, duration: float) -> None:
+        """
+        Записать медленный запрос и при необходимости запланировать EXPLAIN
+        """
+        fingerprint = statement_fingerprint(statement)
+        params = repr(parameters)
+        if len(params) > _MAX_PARAMS_LENGTH:
+            params = params[:_MAX_PARAMS_LENGTH] + "..."
+        logger.warning(
+            f"Медленный запрос {duration * 1000:.1f} мс [{fingerprint}] из {find_query_origin()}: "
+            f"{' '.join(statement.split())[:1000]} | параметры: {params}"
+        )
+        if self.explain and statement.lstrip()[:6].upper() == "SELECT" and self._should_explain(fingerprint):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._executor.submit(self._run_explain, fingerprint, statement, parameters)
+
+    def _should_explain(self, fingerprint: str) -> bool:
+        """
+        Дедупликация по отпечатку и ограничение числа планов в минуту
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(fingerprint, float("-inf")) < self.explain_interval:
+                return False
+            while self._recent_explains and now - self._recent_explains[0] > 60:
+                self._recent_explains.popleft()
+            if len(self._recent_explains) >= self.explain_per_minute:
+                return False
+            self._explained[fingerprint] = now
+            self._recent_explains.append(now)
+            return True
+
+    def _run_explain(self, fingerprint: str, statement: str, parameters) -> None:
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(slow_query_log=False)
+                # ANALYZE выполняет запрос — только SELECT и всегда с откатом
+                with conn.begin() as transaction:
+                    rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).all()
+                    transaction.rollback()
+            plan = "\n".join(row[0] for row in rows)
+            logger.warning(f"План медленного запроса [{fingerprint}]:\n{plan}")
+        except Exception as e:
+            logger.error(f"Не удалось получить план медленного запроса [{fingerprint}]: {str(e)}")
+
+
+def install_slow_query_log(engine: Engine, threshold: float, **kwargs) -> SlowQueryLog:
+    """
+    Подключить журнал медленных запросов к движку (для AsyncEngine передается engine.sync_engine).
+    threshold — порог в секундах.
+    """
+    slow_log = SlowQueryLog(engine, threshold, **kwargs)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("slow_query_start")
+        if not start_times:
+            return
+        duration = time.perf_counter() - start_times.pop()
+        if duration < slow_log.threshold:
+            return
+        if context is not None and context.execution_options.get("slow_query_log") is False:
+            return
+        slow_log.record(statement, parameters, duration)
+
+    return slow_log
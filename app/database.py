@@ -1,21 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 from .core.logging import get_logger
+from .core.query_stats import install_query_listeners
+from .core.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, install_pool_metrics
+from .core.invalidation import on_any_change
+from .core.replicas import ReplicaRouter
+from .core.single_flight import request_loop
+from .core.slow_queries import install_slow_query_log
 
 # Логгер
 logger = get_logger("Database")
 
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Параметры движка и пула из настроек (DB_POOL_*, DB_STATEMENT_TIMEOUT)
+    """
+    options = dict(
+        pool_pre_ping=True,
+        pool_recycle=settings.db_pool_recycle,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        echo=False,  # Отключаем SQL логирование в продакшене
+    )
+    if settings.db_pool_metrics_enabled:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+    if settings.db_statement_timeout and url.startswith(("postgresql", "postgres")):
+        timeout = str(settings.db_statement_timeout)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def setup_engine(target, name: str) -> None:
+    """
+    Подключить учет запросов, метрики пула и журнал медленных запросов
+    (для AsyncEngine передается engine.sync_engine)
+    """
+    if settings.db_query_stats_enabled:
+        install_query_listeners(target)
+    if settings.db_pool_metrics_enabled:
+        install_pool_metrics(target, name)
+    if settings.slow_query_threshold_ms:
+        install_slow_query_log(
+            target,
+            settings.slow_query_threshold_ms / 1000,
+            explain=settings.slow_query_explain,
+            explain_interval=settings.slow_query_explain_interval,
+            explain_per_minute=settings.slow_query_explain_per_minute,
+        )
+
+
 # Создаем движок базы данных
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=10,
-    max_overflow=20,
-    echo=False,  # Отключаем SQL логирование в продакшене
-)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
+setup_engine(engine, "primary")
+
+# Реплики для чтения каталога (DATABASE_REPLICA_URLS); без реплик чтение идет в primary
+replica_engines = [create_engine(url, **engine_options(url)) for url in settings.database_replica_urls]
+for index, replica_engine in enumerate(replica_engines):
+    setup_engine(replica_engine, f"replica{index}")
+read_router = ReplicaRouter(engine, replica_engines, settings.database_replica_cooldown)
 
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -24,6 +76,67 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def to_async_url(url: str) -> str:
+    """
+    URL PostgreSQL с драйвером asyncpg
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def get_async_database_url() -> str:
+    """
+    URL базы данных для asyncpg: явный ASYNC_DATABASE_URL либо DATABASE_URL со сменой драйвера
+    """
+    if settings.async_database_url:
+        return settings.async_database_url
+    return to_async_url(settings.database_url)
+
+
+# Async-движок создается только в async-режиме, чтобы sync-режим не требовал asyncpg
+async_engine = None
+AsyncSessionLocal = None
+async_read_router = None
+
+if settings.database_mode == "async":
+    async_engine = create_async_engine(get_async_database_url(), **engine_options(get_async_database_url(), is_async=True))
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    async_replica_engines = [
+        create_async_engine(to_async_url(url), **engine_options(to_async_url(url), is_async=True))
+        for url in settings.database_replica_urls
+    ]
+    setup_engine(async_engine.sync_engine, "async_primary")
+    for index, async_replica_engine in enumerate(async_replica_engines):
+        setup_engine(async_replica_engine.sync_engine, f"async_replica{index}")
+    async_read_router = ReplicaRouter(async_engine, async_replica_engines, settings.database_replica_cooldown)
+    logger.info("База данных работает в async-режиме (asyncpg)")
+
+if settings.database_replica_urls:
+    logger.info(f"Чтение каталога распределяется по {len(settings.database_replica_urls)} репликам")
+
+
+def read_primary_after_change(payload: str) -> None:
+    """
+    После изменения каталога чтение на database_replica_read_after_write секунд идет из primary:
+    реплика могла еще не получить изменение, а кэш после сброса заполнился бы старыми данными
+    """
+    if settings.database_replica_read_after_write <= 0:
+        return
+    for router in (read_router, async_read_router):
+        if router is not None and router.replicas:
+            router.prefer_primary(settings.database_replica_read_after_write)
+
+
+on_any_change(read_primary_after_change)
+
+
 def get_db():
     """
     Dependency для получения сессии базы данных
@@ -41,16 +154,159 @@ def get_db():
         logger.debug("Сессия базы данных закрыта")
 
 
-def create_tables():
+def connect_for_read(router: ReplicaRouter):
     """
-    Создание всех таблиц в базе данных
+    Соединение для чтения: первая доступная реплика по кругу, при ошибках — primary
     """
+    for candidate in router.candidates():
+        try:
+            return candidate.connect()
+        except (DBAPIError, OSError) as e:
+            if candidate is router.primary:
+                raise
+            router.mark_failed(candidate, e)
+
+
+def get_session_factory():
+    """
+    Dependency: фабрика сессий для кода, который сам открывает и закрывает сессию
+    (потоковые ответы, живущие дольше обработчика). В async-режиме — фабрика AsyncSession
+    """
+    if settings.database_mode == "async":
+        return AsyncSessionLocal
+    return SessionLocal
+
+
+def get_read_db():
+    """
+    Dependency для получения сессии только для чтения (реплика либо primary)
+    """
+    if not read_router.replicas:
+        yield from get_db()
+        return
+    connection = connect_for_read(read_router)
+    db = SessionLocal(bind=connection)
     try:
-        logger.info("Создание таблиц в базе данных...")
-        # Импортируем все модели для регистрации в Base.metadata
-        from .models import Product, ProductPhoto, SliderPhoto, Order
-        Base.metadata.create_all(bind=engine)
-        logger.info("Таблицы в базе данных успешно созданы")
+        logger.debug("Сессия чтения создана")
+        yield db
     except Exception as e:
-        logger.error(f"Ошибка при создании таблиц: {str(e)}")
+        logger.error(f"Ошибка в сессии чтения: {str(e)}")
+        db.rollback()
         raise
+    finally:
+        db.close()
+        connection.close()
+        logger.debug("Сессия чтения закрыта")
+
+
+async def get_async_db():
+    """
+    Dependency для получения асинхронной сессии базы данных
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async-сессия недоступна: установите DATABASE_MODE=async")
+    async with AsyncSessionLocal() as db:
+        try:
+            logger.debug("Async-сессия базы данных создана")
+            yield db
+        except Exception as e:
+            logger.error(f"Ошибка в async-сессии базы данных: {str(e)}")
+            await db.rollback()
+            raise
+        finally:
+            logger.debug("Async-сессия базы данных закрыта")
+
+
+async def async_connect_for_read(router: ReplicaRouter):
+    """
+    Async-соединение для чтения: первая доступная реплика по кругу, при ошибках — primary
+    """
+    for candidate in router.candidates():
+        try:
+            return await candidate.connect()
+        except (DBAPIError, OSError) as e:
+            if candidate is router.primary:
+                raise
+            router.mark_failed(candidate, e)
+
+
+async def get_async_read_db():
+    """
+    Dependency для получения асинхронной сессии только для чтения (реплика либо primary)
+    """
+    if async_read_router is None or not async_read_router.replicas:
+        async for db in get_async_db():
+            yield db
+        return
+    connection = await async_connect_for_read(async_read_router)
+    async with AsyncSessionLocal(bind=connection) as db:
+        try:
+            logger.debug("Async-сессия чтения создана")
+            yield db
+        except Exception as e:
+            logger.error(f"Ошибка в async-сессии чтения: {str(e)}")
+            await db.rollback()
+            raise
+        finally:
+            await connection.close()
+            logger.debug("Async-сессия чтения закрыта")
+
+
+async def run_in_session(db, fn, *args, **kwargs):
+    """
+    Выполнить синхронную функцию вида fn(db, *args) в переданной сессии.
+    Для AsyncSession функция выполняется через run_sync: запросы идут через asyncpg
+    и не блокируют event loop. Для обычной Session — в пуле потоков: запросы к БД и кэшу
+    ждет поток, а не event loop (сессия запроса используется потоками по очереди).
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    token = request_loop.set(asyncio.get_running_loop())
+    try:
+        return await asyncio.to_thread(fn, db, *args, **kwargs)
+    finally:
+        request_loop.reset(token)
+
+
+async def run_in_read_session(fn, *args, **kwargs):
+    """
+    Выполнить fn(db, *args) в новой сессии чтения — для фоновых задач вне HTTP-запроса.
+    В sync-режиме функция выполняется в пуле потоков, чтобы не блокировать event loop.
+    """
+    if settings.database_mode == "async":
+        async with asynccontextmanager(get_async_read_db)() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+    
+    def run():
+        with contextmanager(get_read_db)() as db:
+            return fn(db, *args, **kwargs)
+    
+    return await asyncio.to_thread(run)
+
+
+@contextmanager
+def unit_of_work(db):
+    """
+    Единица работы: внутри блока репозитории делают flush вместо commit,
+    а в конце блока выполняется один commit (rollback при ошибке).
+    Вложенный блок присоединяется к внешнему.
+    """
+    if in_unit_of_work(db):
+        yield db
+        return
+    db.info["unit_of_work"] = True
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.info.pop("unit_of_work", None)
+
+
+def in_unit_of_work(db) -> bool:
+    """
+    Открыта ли для сессии единица работы
+    """
+    return bool(db.info.get("unit_of_work"))
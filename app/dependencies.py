@@ -1,8 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Union
 from jose import JWTError, jwt
-from .database import get_db
+from .database import get_db, get_async_db, get_read_db, get_async_read_db
 from .config import settings
 from .core.logging import get_logger
 # from .core.security import verify_admin_credentials
@@ -68,3 +70,33 @@ def get_db_session(db: Session = Depends(get_db)) -> Session:
     Возвращает реальный объект Session.
     """
     return db
+
+
+async def get_async_db_session(db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
+    """
+    Dependency для получения асинхронной сессии базы данных (asyncpg).
+    """
+    return db
+
+
+def get_read_db_session(db: Session = Depends(get_read_db)) -> Session:
+    """
+    Dependency для получения сессии только для чтения (реплика из DATABASE_REPLICA_URLS либо primary).
+    Только для GET-обработчиков каталога: заказы и вебхуки всегда работают с primary.
+    """
+    return db
+
+
+async def get_async_read_db_session(db: AsyncSession = Depends(get_async_read_db)) -> AsyncSession:
+    """
+    Dependency для получения асинхронной сессии только для чтения
+    """
+    return db
+
+
+# Сессия для роутеров: выбирается настройкой DATABASE_MODE (sync | async).
+# Обработчики выполняют запросы через run_in_session, поэтому работают в обоих режимах.
+get_session = get_async_db_session if settings.database_mode == "async" else get_db_session
+get_read_session = get_async_read_db_session if settings.database_mode == "async" else get_read_db_session
+
+DBSession = Union[Session, AsyncSession]
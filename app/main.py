@@ -1,9 +1,9 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 from .config import settings
-from .database import create_tables
 from .api.v1 import auth, products, photos, slider, feedback, orders
 from .core.exceptions import (
     ProductNotFoundException,
@@ -14,11 +14,27 @@ from .core.exceptions import (
     TelegramBotException
 )
 from .core.logging import setup_logging, get_logger
+from .core.query_stats import QueryStatsMiddleware
+from .core.compression import CompressionMiddleware
+from .core.pool_metrics import pool_metrics_snapshot
+from .core.cache import cache_stats_snapshot
+from .core.http_cache import response_cache
+from .core.invalidation import ChangeListener, listener_dsn
+from .database import run_in_read_session
+from .services.suggest_index import suggest_index
 
 # Инициализируем логирование
 setup_logging()
 logger = get_logger("Main")
 
+# Ответы кодируются orjson (быстрее стандартного json); без библиотеки — обычный JSONResponse
+try:
+    import orjson  # noqa: F401
+    default_response_class = ORJSONResponse
+except ImportError:
+    logger.warning("orjson не установлен, ответы кодируются через json")
+    default_response_class = JSONResponse
+
 # Создаем экземпляр FastAPI
 app = FastAPI(
     title="SOUTH CLUB Backend API",
@@ -34,7 +50,8 @@ app = FastAPI(
     ),
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=default_response_class
 )
 
 # Настройка CORS
@@ -48,6 +65,14 @@ app.add_middleware(
     max_age=600,
 )
 
+# Учет SQL-запросов на каждый HTTP-запрос (X-DB-Queries, Server-Timing, предупреждения о N+1)
+if settings.db_query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Сжатие ответов gzip/brotli (добавлено последним — внешний слой, сжимает ответы целиком)
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
 # Подключаем статические файлы для загрузок по требуемому префиксу
 if os.path.exists(settings.upload_dir):
     # Доступно по URL: /app/uploads/<subdir>/<filename>
@@ -100,10 +125,7 @@ async def startup_event():
     """
     logger.info("Запуск SOUTH CLUB Backend...")
     try:
-        # Создаем таблицы в БД
-        create_tables()
-        logger.info("База данных инициализирована")
-        
+        # Схема БД управляется миграциями Alembic (alembic upgrade head) и не создается при старте
         # Отладка маршрутов
         logger.info("=== ОТЛАДКА: Доступные маршруты ===")
         for route in app.routes:
@@ -111,6 +133,18 @@ async def startup_event():
                 logger.info(f"Путь: {route.path}, Методы: {route.methods}")
         logger.info("=== Конец отладки маршрутов ===")
         
+        # Сброс кэша в памяти и индексов поиска и подсказок по изменениям каталога из других воркеров.
+        # Общему кэшу подписка не нужна, но индекс подсказок в памяти есть у каждого воркера всегда
+        if settings.cache_invalidation_listen and settings.database_url.startswith("postgresql"):
+            app.state.change_listener = ChangeListener(listener_dsn(settings.database_url))
+            app.state.change_listener.start()
+        
+        # Подсказки поиска отвечают только из памяти: загружаем их до первого запроса
+        try:
+            await run_in_read_session(suggest_index.load)
+        except Exception as e:
+            logger.warning(f"Индекс подсказок не загружен при запуске, загрузится в фоне: {str(e)}")
+        
         logger.info("🚀 SOUTH CLUB Backend успешно запущен")
     except Exception as e:
         logger.error(f"Ошибка при запуске приложения: {str(e)}")
@@ -122,6 +156,9 @@ async def shutdown_event():
     Событие при остановке приложения
     """
     logger.info("SOUTH CLUB Backend останавливается...")
+    change_listener = getattr(app.state, "change_listener", None)
+    if change_listener is not None:
+        await change_listener.stop()
     logger.info("🛑 SOUTH CLUB Backend остановлен")
 
 # Корневой эндпоинт
@@ -147,6 +184,22 @@ async def health_check():
     logger.debug("Запрос health check")
     return {"status": "healthy", "message": "SOUTH CLUB Backend работает"}
 
+# Метрики пулов соединений с БД
+@app.get("/health/db-pool")
+async def db_pool_metrics():
+    """
+    Состояние пулов соединений: занятые соединения, overflow, ожидание соединения, инвалидации
+    """
+    return {"pid": os.getpid(), "pools": pool_metrics_snapshot()}
+
+# Счетчики кэшей в памяти процесса
+@app.get("/health/cache")
+async def cache_metrics():
+    """
+    Попадания и промахи кэшей процесса (у каждого воркера свои)
+    """
+    return {"pid": os.getpid(), "caches": cache_stats_snapshot(), "responses": response_cache.stats()}
+
 # Тестовый эндпоинт для проверки слайдера
 @app.get("/test-slider")
 async def test_slider():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.sql import func
 from ..database import Base
@@ -6,6 +6,14 @@ from ..database import Base
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_payment_id", "payment_id", unique=True),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_email_created_at", "email", "created_at"),
+        Index("ix_orders_created_at", "created_at"),
+    )
+    # created_at/updated_at возвращаются из INSERT/UPDATE ... RETURNING, без отдельного SELECT после flush
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True, comment="ID заказа")
     customer_name = Column(String(255), nullable=False, comment="Имя клиента")
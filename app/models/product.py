@@ -1,15 +1,49 @@
-from sqlalchemy import Column, String, Integer, Text, Boolean
-from sqlalchemy.dialects.postgresql import UUID, JSON
+from typing import Iterable, List
+from sqlalchemy import Column, String, Integer, SmallInteger, Text, Boolean, CheckConstraint
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 from ..database import Base
 
+# Размеры 0-4 (XS..XL) хранятся битовой маской: бит n установлен, если есть размер n
+SIZE_COUNT = 5
+SIZE_MASK_ALL = (1 << SIZE_COUNT) - 1
+
+
+def sizes_to_mask(sizes: Iterable[int]) -> int:
+    """
+    Массив размеров -> битовая маска
+    """
+    mask = 0
+    for size in sizes:
+        mask |= 1 << size
+    return mask
+
+
+def mask_to_sizes(mask: int) -> List[int]:
+    """
+    Битовая маска -> отсортированный массив размеров
+    """
+    return [size for size in range(SIZE_COUNT) if mask & (1 << size)]
+
+
+def masks_with_any_size(sizes: Iterable[int]) -> List[int]:
+    """
+    Все маски, содержащие хотя бы один из размеров. Масок всего 31, поэтому фильтр
+    по размерам — это один предикат size_mask IN (...) по btree-индексу.
+    """
+    wanted = sizes_to_mask(sizes)
+    return [mask for mask in range(1, SIZE_MASK_ALL + 1) if mask & wanted]
+
 
 class Product(Base):
     """
     Модель товара
     """
     __tablename__ = "products"
+    __table_args__ = (
+        CheckConstraint(f"size_mask BETWEEN 0 AND {SIZE_MASK_ALL}", name="ck_products_size_mask"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(Text, nullable=False, comment="Название товара")
@@ -17,7 +51,7 @@ class Product(Base):
     color = Column(Text, nullable=True, comment="Цвет")
     composition = Column(Text, nullable=True, comment="Состав")
     print_technology = Column(Text, nullable=True, comment="Технология печати")
-    size = Column(JSON, nullable=False, comment="Размеры (массив чисел 0-4)")
+    size_mask = Column(SmallInteger, nullable=False, default=0, index=True, comment="Размеры 0-4 (битовая маска)")
     price = Column(Integer, nullable=False, comment="Цена")
     order_number = Column(Integer, nullable=True, comment="Порядковый номер отображения")
     soon = Column(Boolean, nullable=False, default=False, server_default='false', comment="Скоро в продаже")
@@ -25,6 +59,17 @@ class Product(Base):
     # Связи
     photos = relationship("ProductPhoto", back_populates="product", cascade="all, delete-orphan")
 
+    @property
+    def size(self) -> List[int]:
+        """
+        Размеры товара (массив чисел 0-4) — так поле отдается в API
+        """
+        return mask_to_sizes(self.size_mask or 0)
+
+    @size.setter
+    def size(self, sizes: Iterable[int]) -> None:
+        self.size_mask = sizes_to_mask(sizes or [])
+
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', price={self.price})>"
 
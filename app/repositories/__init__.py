@@ -1,8 +1,12 @@
 # Repository pattern implementation
-from .base import BaseRepository
-from .product import ProductRepository
-from .photo import ProductPhotoRepository
-from .slider import SliderPhotoRepository
-from .order import OrderRepository
+from .base import BaseRepository, AsyncBaseRepository
+from .product import ProductRepository, AsyncProductRepository
+from .photo import ProductPhotoRepository, AsyncProductPhotoRepository
+from .slider import SliderPhotoRepository, AsyncSliderPhotoRepository
+from .order import OrderRepository, AsyncOrderRepository
 
-__all__ = ["BaseRepository", "ProductRepository", "ProductPhotoRepository", "SliderPhotoRepository", "OrderRepository"]
+__all__ = [
+    "BaseRepository", "ProductRepository", "ProductPhotoRepository", "SliderPhotoRepository", "OrderRepository",
+    "AsyncBaseRepository", "AsyncProductRepository", "AsyncProductPhotoRepository", "AsyncSliderPhotoRepository",
+    "AsyncOrderRepository",
+]
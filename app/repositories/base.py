@@ -1,11 +1,17 @@
-from typing import Generic, TypeVar, Type, Optional, List, Any
+import time
+from typing import Generic, TypeVar, Type, Optional, List, Any, Union, Dict, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, func, text, inspect as sa_inspect
 from uuid import UUID
-from ..database import Base
+from ..config import settings
+from ..database import Base, run_in_session, in_unit_of_work
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# Кэш количества записей по таблицам: имя таблицы -> (значение, время истечения)
+_count_cache: Dict[str, Tuple[int, float]] = {}
+
 
 class BaseRepository(Generic[ModelType]):
     """
@@ -15,6 +21,19 @@ class BaseRepository(Generic[ModelType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
     
+    def commit(self, db: Session, db_obj: Optional[ModelType] = None) -> None:
+        """
+        Зафиксировать изменения. Внутри unit_of_work — только flush: серверные значения
+        приходят через INSERT/UPDATE ... RETURNING, а commit делает владелец единицы работы.
+        Вне ее — commit и refresh, как раньше.
+        """
+        if in_unit_of_work(db):
+            db.flush()
+            return
+        db.commit()
+        if db_obj is not None:
+            db.refresh(db_obj)
+    
     def get(self, db: Session, id: UUID) -> Optional[ModelType]:
         """
         Получить объект по ID
@@ -29,6 +48,27 @@ class BaseRepository(Generic[ModelType]):
         result = db.execute(stmt)
         return result.scalars().all()
     
+    @staticmethod
+    def _dump(obj_in: Any, exclude_unset: bool = False) -> Dict[str, Any]:
+        """
+        Входные данные в dict: Pydantic v2 / v1 либо обычный dict
+        """
+        if hasattr(obj_in, "model_dump"):
+            return obj_in.model_dump(exclude_unset=exclude_unset)
+        if hasattr(obj_in, "dict"):
+            return obj_in.dict(exclude_unset=exclude_unset)
+        # На всякий случай пытаемся использовать как обычный dict
+        return dict(obj_in)
+    
+    def _column_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Значения колонок для bulk-операций. Данные проходят через конструктор модели,
+        поэтому работают и свойства-обертки над колонками (Product.size -> size_mask)
+        """
+        obj = self.model(**data)
+        columns = {attr.key for attr in sa_inspect(self.model).column_attrs}
+        return {key: value for key, value in obj.__dict__.items() if key in columns}
+    
     def create(self, db: Session, obj_in: Any) -> ModelType:
         """
         Создать новый объект.
@@ -38,20 +78,11 @@ class BaseRepository(Generic[ModelType]):
         if isinstance(obj_in, self.model):
             db_obj = obj_in
         else:
-            # Поддержка Pydantic v2 / v1
-            if hasattr(obj_in, "model_dump"):
-                obj_data = obj_in.model_dump()
-            elif hasattr(obj_in, "dict"):
-                obj_data = obj_in.dict()
-            else:
-                # На всякий случай пытаемся использовать как обычный dict
-                obj_data = dict(obj_in)
-
-            db_obj = self.model(**obj_data)
+            db_obj = self.model(**self._dump(obj_in))
 
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self.commit(db, db_obj)
+        self.invalidate_count()
         return db_obj
     
     def update(self, db: Session, id: UUID, obj_in: Any) -> Optional[ModelType]:
@@ -60,11 +91,10 @@ class BaseRepository(Generic[ModelType]):
         """
         db_obj = self.get(db, id)
         if db_obj:
-            update_data = obj_in.dict(exclude_unset=True)
+            update_data = self._dump(obj_in, exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_obj, field, value)
-            db.commit()
-            db.refresh(db_obj)
+            self.commit(db, db_obj)
         return db_obj
     
     def delete(self, db: Session, id: UUID) -> bool:
@@ -74,15 +104,180 @@ class BaseRepository(Generic[ModelType]):
         db_obj = self.get(db, id)
         if db_obj:
             db.delete(db_obj)
-            db.commit()
+            self.commit(db)
+            self.invalidate_count()
             return True
         return False
     
-    def count(self, db: Session) -> int:
+    def bulk_create(self, db: Session, objs_in: List[Any]) -> List[ModelType]:
         """
-        Подсчитать общее количество объектов
+        Создать объекты одним INSERT ... VALUES (...), (...) RETURNING.
+        Вне unit_of_work после commit объекты истекают — читать их лучше внутри единицы работы.
+        """
+        if not objs_in:
+            return []
+        rows = [self._column_values(self._dump(obj_in)) for obj_in in objs_in]
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        db_objs = db.scalars(stmt, rows).all()
+        self.commit(db)
+        self.invalidate_count()
+        return db_objs
+    
+    def bulk_update(self, db: Session, updates: List[Tuple[Any, Any]]) -> None:
         """
-        stmt = select(self.model)
+        Обновить объекты по первичному ключу: updates — пары (id, данные), передаются только
+        заданные поля. Один executemany на каждый набор обновляемых полей.
+        Число обновленных строк не возвращается: rowcount у executemany драйверы
+        сообщают по-разному, существование объектов проверяет вызывающий код
+        """
+        rows = []
+        for obj_id, obj_in in updates:
+            values = self._column_values(self._dump(obj_in, exclude_unset=True))
+            if values:
+                rows.append({"id": obj_id, **values})
+        if rows:
+            db.execute(update(self.model), rows)
+        self.commit(db)
+    
+    def bulk_delete(self, db: Session, ids: List[Any]) -> int:
+        """
+        Удалить объекты одним DELETE ... WHERE id IN (...). Возвращает число удаленных строк
+        """
+        if not ids:
+            return 0
+        result = db.execute(
+            delete(self.model).where(self.model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        self.commit(db)
+        self.invalidate_count()
+        return result.rowcount
+    
+    def get_by_ids(self, db: Session, ids: List[Any]) -> List[ModelType]:
+        """
+        Получить объекты по списку ID одним запросом
+        """
+        if not ids:
+            return []
+        stmt = select(self.model).where(self.model.id.in_(ids))
         result = db.execute(stmt)
-        return len(result.scalars().all())
+        return result.scalars().all()
+    
+    def count(self, db: Session, cached: bool = False) -> int:
+        """
+        Подсчитать общее количество объектов.
+        cached=True — значение берется из кэша (TTL count_cache_ttl), а для больших
+        таблиц PostgreSQL — из оценки pg_class.reltuples без сканирования таблицы.
+        """
+        if not cached:
+            return self._exact_count(db)
+        
+        table_name = self.model.__tablename__
+        cached_value = _count_cache.get(table_name)
+        if cached_value and cached_value[1] > time.monotonic():
+            return cached_value[0]
+        
+        value = self._estimated_count(db)
+        if value is None:
+            value = self._exact_count(db)
+        if settings.count_cache_ttl > 0:
+            _count_cache[table_name] = (value, time.monotonic() + settings.count_cache_ttl)
+        return value
+    
+    def invalidate_count(self) -> None:
+        """
+        Сбросить кэшированное количество записей таблицы
+        """
+        _count_cache.pop(self.model.__tablename__, None)
+    
+    def _exact_count(self, db: Session) -> int:
+        """
+        Точное количество через SELECT count(*)
+        """
+        stmt = select(func.count()).select_from(self.model)
+        return db.execute(stmt).scalar() or 0
+    
+    def _estimated_count(self, db: Session) -> Optional[int]:
+        """
+        Оценка количества из статистики PostgreSQL (pg_class.reltuples).
+        Возвращает None, если оценка недоступна или таблица меньше порога count_estimate_threshold.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return None
+        stmt = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)")
+        estimate = db.execute(stmt, {"table_name": self.model.__tablename__}).scalar()
+        # reltuples = -1, пока таблица ни разу не анализировалась
+        if estimate is None or estimate < 0 or estimate < settings.count_estimate_threshold:
+            return None
+        return int(estimate)
+
 
+class AsyncBaseRepository(Generic[ModelType]):
+    """
+    Асинхронный вариант репозитория.
+    Запросы строит синхронный репозиторий, а выполнение идет через run_in_session:
+    с AsyncSession — через asyncpg без блокировки event loop, с Session — как раньше.
+    """
+    
+    def __init__(self, repository: BaseRepository[ModelType]):
+        self.repository = repository
+        self.model = repository.model
+    
+    async def get(self, db: Union[Session, AsyncSession], id: UUID) -> Optional[ModelType]:
+        """
+        Получить объект по ID
+        """
+        return await run_in_session(db, self.repository.get, id)
+    
+    async def get_all(self, db: Union[Session, AsyncSession], skip: int = 0, limit: int = 100) -> List[ModelType]:
+        """
+        Получить все объекты с пагинацией
+        """
+        return await run_in_session(db, self.repository.get_all, skip, limit)
+    
+    async def create(self, db: Union[Session, AsyncSession], obj_in: Any) -> ModelType:
+        """
+        Создать новый объект
+        """
+        return await run_in_session(db, self.repository.create, obj_in)
+    
+    async def update(self, db: Union[Session, AsyncSession], id: UUID, obj_in: Any) -> Optional[ModelType]:
+        """
+        Обновить объект
+        """
+        return await run_in_session(db, self.repository.update, id, obj_in)
+    
+    async def delete(self, db: Union[Session, AsyncSession], id: UUID) -> bool:
+        """
+        Удалить объект
+        """
+        return await run_in_session(db, self.repository.delete, id)
+    
+    async def bulk_create(self, db: Union[Session, AsyncSession], objs_in: List[Any]) -> List[ModelType]:
+        """
+        Создать объекты одним INSERT
+        """
+        return await run_in_session(db, self.repository.bulk_create, objs_in)
+    
+    async def bulk_update(self, db: Union[Session, AsyncSession], updates: List[Tuple[Any, Any]]) -> None:
+        """
+        Обновить объекты по первичному ключу
+        """
+        await run_in_session(db, self.repository.bulk_update, updates)
+    
+    async def bulk_delete(self, db: Union[Session, AsyncSession], ids: List[Any]) -> int:
+        """
+        Удалить объекты одним DELETE
+        """
+        return await run_in_session(db, self.repository.bulk_delete, ids)
+    
+    async def get_by_ids(self, db: Union[Session, AsyncSession], ids: List[Any]) -> List[ModelType]:
+        """
+        Получить объекты по списку ID
+        """
+        return await run_in_session(db, self.repository.get_by_ids, ids)
+    
+    async def count(self, db: Union[Session, AsyncSession], cached: bool = False) -> int:
+        """
+        Подсчитать общее количество объектов
+        """
+        return await run_in_session(db, self.repository.count, cached)
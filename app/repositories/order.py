@@ -1,8 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, and_, or_
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from datetime import datetime
+from ..database import run_in_session
 from ..models.order import Order
-from .base import BaseRepository
+from .base import BaseRepository, AsyncBaseRepository
 
 
 class OrderRepository(BaseRepository[Order]):
@@ -19,27 +22,58 @@ class OrderRepository(BaseRepository[Order]):
         result = db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def get_by_email(self, db: Session, email: str, skip: int = 0, limit: int = 100) -> List[Order]:
+    def set_payment_id(self, db: Session, order_id: int, payment_id: str) -> bool:
         """
-        Получить заказы по email клиента
+        Записать ID платежа одним UPDATE без чтения заказа
+        """
+        result = db.execute(update(Order).where(Order.id == order_id).values(payment_id=payment_id))
+        self.commit(db)
+        return result.rowcount > 0
+    
+    def get_by_email(
+        self,
+        db: Session,
+        email: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
+        """
+        Получить заказы по email клиента.
+        Если передан after — keyset-пагинация вместо OFFSET (skip игнорируется).
         """
-        stmt = select(Order).where(Order.email == email).offset(skip).limit(limit).order_by(Order.created_at.desc())
+        stmt = self._paginate(select(Order).where(Order.email == email), skip, limit, after)
         result = db.execute(stmt)
         return result.scalars().all()
     
-    def get_by_status(self, db: Session, status: str, skip: int = 0, limit: int = 100) -> List[Order]:
+    def get_by_status(
+        self,
+        db: Session,
+        status: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
         """
-        Получить заказы по статусу
+        Получить заказы по статусу.
+        Если передан after — keyset-пагинация вместо OFFSET (skip игнорируется).
         """
-        stmt = select(Order).where(Order.status == status).offset(skip).limit(limit).order_by(Order.created_at.desc())
+        stmt = self._paginate(select(Order).where(Order.status == status), skip, limit, after)
         result = db.execute(stmt)
         return result.scalars().all()
     
-    def get_recent_orders(self, db: Session, skip: int = 0, limit: int = 100) -> List[Order]:
+    def get_recent_orders(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
         """
-        Получить последние заказы
+        Получить последние заказы.
+        Если передан after — keyset-пагинация вместо OFFSET (skip игнорируется).
         """
-        stmt = select(Order).offset(skip).limit(limit).order_by(Order.created_at.desc())
+        stmt = self._paginate(select(Order), skip, limit, after)
         result = db.execute(stmt)
         return result.scalars().all()
     
@@ -66,4 +100,156 @@ class OrderRepository(BaseRepository[Order]):
         stmt = select(func.sum(Order.total_amount)).where(Order.status == "paid")
         result = db.execute(stmt)
         return result.scalar() or 0.0
+    
+    def get_statistics_by_status(self, db: Session) -> List[Tuple[str, int, float]]:
+        """
+        Количество заказов и сумма по каждому статусу — один запрос с GROUP BY
+        """
+        stmt = select(
+            Order.status,
+            func.count(),
+            func.coalesce(func.sum(Order.total_amount), 0.0)
+        ).group_by(Order.status)
+        result = db.execute(stmt)
+        return [(status, count, float(amount)) for status, count, amount in result.all()]
+    
+    def export_query(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None
+    ):
+        """
+        Запрос выгрузки: только колонки (без ORM-объектов и identity map), по возрастанию created_at
+        """
+        stmt = select(
+            Order.id, Order.created_at, Order.status, Order.customer_name, Order.email, Order.phone,
+            Order.address, Order.delivery_time, Order.order_time, Order.total_amount, Order.payment_id,
+            Order.items
+        )
+        if date_from is not None:
+            stmt = stmt.where(Order.created_at >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(Order.created_at < date_to)
+        if status is not None:
+            stmt = stmt.where(Order.status == status)
+        return stmt.order_by(Order.created_at, Order.id)
+    
+    def stream_for_export(
+        self,
+        db: Session,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator:
+        """
+        Строки заказов серверным курсором: в памяти не больше batch_size строк
+        """
+        stmt = self.export_query(date_from, date_to, status).execution_options(yield_per=batch_size)
+        yield from db.execute(stmt)
+    
+    def _paginate(self, stmt, skip: int, limit: int, after: Optional[Tuple[datetime, int]]):
+        """
+        Сортировка по (created_at, id) от новых к старым и OFFSET либо keyset-условие
+        """
+        if after is not None:
+            created_at, last_id = after
+            stmt = stmt.where(or_(
+                Order.created_at < created_at,
+                and_(Order.created_at == created_at, Order.id < last_id)
+            ))
+        else:
+            stmt = stmt.offset(skip)
+        return stmt.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit)
+
 
+class AsyncOrderRepository(AsyncBaseRepository[Order]):
+    """Асинхронный репозиторий для работы с заказами"""
+    
+    def __init__(self):
+        super().__init__(OrderRepository())
+    
+    async def get_by_payment_id(self, db: AsyncSession, payment_id: str) -> Optional[Order]:
+        """
+        Получить заказ по ID платежа
+        """
+        return await run_in_session(db, self.repository.get_by_payment_id, payment_id)
+    
+    async def get_by_email(
+        self,
+        db: AsyncSession,
+        email: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
+        """
+        Получить заказы по email клиента
+        """
+        return await run_in_session(db, self.repository.get_by_email, email, skip, limit, after)
+    
+    async def get_by_status(
+        self,
+        db: AsyncSession,
+        status: str,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
+        """
+        Получить заказы по статусу
+        """
+        return await run_in_session(db, self.repository.get_by_status, status, skip, limit, after)
+    
+    async def get_recent_orders(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Order]:
+        """
+        Получить последние заказы
+        """
+        return await run_in_session(db, self.repository.get_recent_orders, skip, limit, after)
+    
+    async def get_orders_count(self, db: AsyncSession) -> int:
+        """
+        Получить общее количество заказов
+        """
+        return await run_in_session(db, self.repository.get_orders_count)
+    
+    async def get_orders_count_by_status(self, db: AsyncSession, status: str) -> int:
+        """
+        Получить количество заказов по статусу
+        """
+        return await run_in_session(db, self.repository.get_orders_count_by_status, status)
+    
+    async def get_total_revenue(self, db: AsyncSession) -> float:
+        """
+        Получить общую выручку (сумма всех оплаченных заказов)
+        """
+        return await run_in_session(db, self.repository.get_total_revenue)
+    
+    async def stream_for_export(
+        self,
+        db: AsyncSession,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator:
+        """
+        Строки заказов серверным курсором asyncpg
+        """
+        stmt = self.repository.export_query(date_from, date_to, status).execution_options(yield_per=batch_size)
+        result = await db.stream(stmt)
+        async for row in result:
+            yield row
+    
+    async def get_statistics_by_status(self, db: AsyncSession) -> List[Tuple[str, int, float]]:
+        """
+        Количество заказов и сумма по каждому статусу
+        """
+        return await run_in_session(db, self.repository.get_statistics_by_status)
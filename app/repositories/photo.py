@@ -1,8 +1,10 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from uuid import UUID
-from .base import BaseRepository
+from sqlalchemy.ext.asyncio import AsyncSession
+from .base import BaseRepository, AsyncBaseRepository
+from ..database import run_in_session
 from ..models.photo import ProductPhoto
 from ..schemas.photo import ProductPhotoCreate, ProductPhotoUpdate
 
@@ -50,9 +52,42 @@ class ProductPhotoRepository(BaseRepository[ProductPhoto]):
         """
         Удалить все фотографии товара
         """
-        photos = self.get_by_product_id(db, product_id)
-        for photo in photos:
-            db.delete(photo)
-        db.commit()
+        db.execute(
+            delete(ProductPhoto).where(ProductPhoto.product_id == product_id).execution_options(synchronize_session=False)
+        )
+        self.commit(db)
+        self.invalidate_count()
         return True
 
+
+class AsyncProductPhotoRepository(AsyncBaseRepository[ProductPhoto]):
+    """
+    Асинхронный репозиторий для работы с фотографиями товаров
+    """
+    
+    def __init__(self):
+        super().__init__(ProductPhotoRepository())
+    
+    async def get_by_product_id(self, db: AsyncSession, product_id: UUID) -> List[ProductPhoto]:
+        """
+        Получить все фотографии товара
+        """
+        return await run_in_session(db, self.repository.get_by_product_id, product_id)
+    
+    async def get_by_priority(self, db: AsyncSession, product_id: UUID, priority: int) -> List[ProductPhoto]:
+        """
+        Получить фотографии товара по приоритету
+        """
+        return await run_in_session(db, self.repository.get_by_priority, product_id, priority)
+    
+    async def get_main_photo(self, db: AsyncSession, product_id: UUID) -> Optional[ProductPhoto]:
+        """
+        Получить главную фотографию товара
+        """
+        return await run_in_session(db, self.repository.get_main_photo, product_id)
+    
+    async def delete_by_product_id(self, db: AsyncSession, product_id: UUID) -> bool:
+        """
+        Удалить все фотографии товара
+        """
+        return await run_in_session(db, self.repository.delete_by_product_id, product_id)
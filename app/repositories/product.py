@@ -1,12 +1,54 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, aliased, load_only, selectinload, noload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, delete, and_, or_, func, cast, literal, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from uuid import UUID
-from .base import BaseRepository
-from ..models.product import Product
+from sqlalchemy.ext.asyncio import AsyncSession
+from .base import BaseRepository, AsyncBaseRepository
+from ..database import run_in_session
+from ..models.photo import ProductPhoto
+from ..models.product import Product, masks_with_any_size
 from ..schemas.product import ProductCreate, ProductUpdate
 
 
+# Поля товара, которые можно запросить через ?fields=, и их колонки (size хранится маской)
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "sku": Product.sku,
+    "color": Product.color,
+    "composition": Product.composition,
+    "print_technology": Product.print_technology,
+    "size": Product.size_mask,
+    "price": Product.price,
+    "order_number": Product.order_number,
+    "soon": Product.soon,
+}
+
+# Конфигурация полнотекстового поиска: с ней построена колонка search_vector (миграция 0004)
+SEARCH_CONFIG = "russian"
+# Колонки поиска PostgreSQL: генерируемые, в модель не входят (в SQLite тестов их нет)
+SEARCH_VECTOR = literal_column("products.search_vector")
+SEARCH_TEXT = literal_column("products.search_text")
+
+# Режимы загрузки фотографий: все, только главная (get_main_photos), без фотографий
+PHOTO_MODES = ("all", "main", "none")
+
+
+def _load_options(photos: str = "all", fields: Optional[Iterable[str]] = None) -> list:
+    """
+    Опции загрузки товаров. Фотографии: selectinload — один дополнительный запрос на всю страницу,
+    noload — не загружаются (product.photos == []). fields — читаются только колонки этих полей
+    (id и order_number нужны всегда: для фотографий и курсора)
+    """
+    options = [selectinload(Product.photos) if photos == "all" else noload(Product.photos)]
+    if fields is not None:
+        names = dict.fromkeys(("id", "order_number", *fields))
+        options.append(load_only(*(PRODUCT_FIELDS[name] for name in names)))
+    return options
+
+
 class ProductRepository(BaseRepository[Product]):
     """
     Репозиторий для работы с товарами
@@ -15,6 +57,94 @@ class ProductRepository(BaseRepository[Product]):
     def __init__(self):
         super().__init__(Product)
     
+    def get_all(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить все товары с пагинацией
+        """
+        stmt = select(Product).options(*_load_options(photos, fields)).offset(skip).limit(limit)
+        result = db.execute(stmt)
+        return result.scalars().all()
+    
+    def get_page(
+        self,
+        db: Session,
+        limit: int = 100,
+        after: Optional[Tuple[Optional[int], UUID]] = None,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Keyset-пагинация товаров по (order_number, id).
+        after — ключ последнего товара предыдущей страницы; товары без order_number идут в конце.
+        """
+        stmt = select(Product).options(*_load_options(photos, fields))
+        if after is not None:
+            order_number, last_id = after
+            if order_number is None:
+                stmt = stmt.where(Product.order_number.is_(None), Product.id > last_id)
+            else:
+                stmt = stmt.where(or_(
+                    Product.order_number > order_number,
+                    and_(Product.order_number == order_number, Product.id > last_id),
+                    Product.order_number.is_(None)
+                ))
+        stmt = stmt.order_by(Product.order_number.asc().nulls_last(), Product.id.asc()).limit(limit)
+        result = db.execute(stmt)
+        return result.scalars().all()
+    
+    def get_by_ids(
+        self,
+        db: Session,
+        ids: List[UUID],
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары по списку ID одним запросом (фотографии — еще одним)
+        """
+        if not ids:
+            return []
+        stmt = select(Product).options(*_load_options(photos, fields)).where(Product.id.in_(ids))
+        result = db.execute(stmt)
+        return result.scalars().all()
+    
+    def bulk_create(self, db: Session, objs_in: List) -> List[Product]:
+        """
+        Создать товары одним INSERT. У новых товаров нет фотографий — связь помечается
+        загруженной, чтобы обращение к photos не делало запрос на каждый товар.
+        """
+        products = super().bulk_create(db, objs_in)
+        for product in products:
+            set_committed_value(product, "photos", [])
+        return products
+    
+    def bulk_delete(self, db: Session, ids: List[UUID]) -> int:
+        """
+        Удалить товары и их фотографии двумя запросами DELETE ... WHERE ... IN (...)
+        """
+        if not ids:
+            return 0
+        db.execute(
+            delete(ProductPhoto).where(ProductPhoto.product_id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        return super().bulk_delete(db, ids)
+    
+    def get_photo_paths(self, db: Session, ids: List[UUID]) -> List[str]:
+        """
+        Получить пути к файлам фотографий товаров одним запросом
+        """
+        if not ids:
+            return []
+        stmt = select(ProductPhoto.file_path).where(ProductPhoto.product_id.in_(ids))
+        return list(db.execute(stmt).scalars())
+    
     def get_by_name(self, db: Session, name: str) -> Optional[Product]:
         """
         Получить товар по названию
@@ -23,42 +153,267 @@ class ProductRepository(BaseRepository[Product]):
         result = db.execute(stmt)
         return result.scalar_one_or_none()
     
-    def get_by_size(self, db: Session, size: int, skip: int = 0, limit: int = 100) -> List[Product]:
+    def get_by_size(
+        self,
+        db: Session,
+        size: int,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
         """
         Получить товары по размеру (проверяет наличие размера в массиве)
         """
-        stmt = select(Product).where(Product.size.contains([size])).offset(skip).limit(limit)
+        return self.get_by_sizes(db, [size], skip, limit, photos, fields)
+    
+    def get_by_sizes(
+        self,
+        db: Session,
+        sizes: Iterable[int],
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары, у которых есть хотя бы один из размеров.
+        Фильтр — один индексируемый предикат size_mask IN (...)
+        """
+        stmt = select(Product).options(*_load_options(photos, fields)).where(
+            Product.size_mask.in_(masks_with_any_size(sizes))
+        ).offset(skip).limit(limit)
         result = db.execute(stmt)
         return result.scalars().all()
     
-    def get_by_price_range(self, db: Session, min_price: int, max_price: int, skip: int = 0, limit: int = 100) -> List[Product]:
+    def get_by_price_range(
+        self,
+        db: Session,
+        min_price: int,
+        max_price: int,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
         """
         Получить товары по диапазону цен
         """
-        stmt = select(Product).where(
+        stmt = select(Product).options(*_load_options(photos, fields)).where(
             Product.price >= min_price,
             Product.price <= max_price
         ).offset(skip).limit(limit)
         result = db.execute(stmt)
         return result.scalars().all()
     
-    def search_products(self, db: Session, query: str, skip: int = 0, limit: int = 100) -> List[Product]:
+    def search_products(
+        self,
+        db: Session,
+        query: str,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Product], int]:
         """
-        Поиск товаров по названию или характеристикам
+        Поиск товаров по названию, артикулу, цвету, составу и технологии печати: (страница, всего).
+        В PostgreSQL — полнотекстовый поиск по search_vector (GIN) с учетом морфологии и
+        нечеткое совпадение pg_trgm по search_text (опечатки, части слов), сортировка по рангу.
+        Всего найденных считается в том же запросе оконной функцией count(*) OVER ().
         """
-        search_term = f"%{query}%"
-        stmt = select(Product).where(
-            (Product.name.ilike(search_term)) |
-            (Product.color.ilike(search_term))
-        ).offset(skip).limit(limit)
-        result = db.execute(stmt)
-        return result.scalars().all()
+        total = func.count().over().label("total")
+        stmt = select(Product, total).options(*_load_options(photos, fields))
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(literal(SEARCH_CONFIG), REGCONFIG), query)
+            stmt = stmt.where(or_(
+                SEARCH_VECTOR.op("@@")(tsquery),
+                literal(query).op("<%")(SEARCH_TEXT)
+            )).order_by(
+                func.ts_rank_cd(SEARCH_VECTOR, tsquery).desc(),
+                func.word_similarity(query, SEARCH_TEXT).desc(),
+                Product.order_number.asc().nulls_last(),
+                Product.id.asc()
+            )
+        else:
+            search_term = f"%{query}%"
+            stmt = stmt.where(or_(
+                Product.name.ilike(search_term),
+                Product.sku.ilike(search_term),
+                Product.color.ilike(search_term),
+                Product.composition.ilike(search_term),
+                Product.print_technology.ilike(search_term)
+            )).order_by(Product.order_number.asc().nulls_last(), Product.id.asc())
+        rows = db.execute(stmt.offset(skip).limit(limit)).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        if skip == 0:
+            return [], 0
+        # Страница за концом результатов: строк нет, и количество считается отдельно
+        count_stmt = select(func.count()).select_from(
+            stmt.with_only_columns(Product.id).order_by(None).subquery()
+        )
+        return [], db.execute(count_stmt).scalar() or 0
+    
+    def get_search_documents(self, db: Session, ids: Optional[List[UUID]] = None) -> list:
+        """
+        Поля для поискового индекса в памяти (id, name, sku, color, order_number) — всех товаров
+        либо только ids
+        """
+        stmt = select(Product.id, Product.name, Product.sku, Product.color, Product.order_number)
+        if ids is not None:
+            if not ids:
+                return []
+            stmt = stmt.where(Product.id.in_(ids))
+        return db.execute(stmt).all()
     
     def get_with_photos(self, db: Session, product_id: UUID) -> Optional[Product]:
         """
         Получить товар с фотографиями
         """
-        stmt = select(Product).where(Product.id == product_id)
+        stmt = select(Product).options(selectinload(Product.photos)).where(Product.id == product_id)
         result = db.execute(stmt)
         return result.scalar_one_or_none()
+    
+    def get_main_photos(self, db: Session, product_ids: List[UUID]) -> Dict[UUID, ProductPhoto]:
+        """
+        Главная фотография (наименьший priority, затем id) каждого товара — одним запросом
+        с row_number() по товару. У товаров без фотографий ключа нет.
+        """
+        if not product_ids:
+            return {}
+        rank = func.row_number().over(
+            partition_by=ProductPhoto.product_id,
+            order_by=(ProductPhoto.priority.asc(), ProductPhoto.id.asc())
+        ).label("rank")
+        ranked = select(ProductPhoto, rank).where(ProductPhoto.product_id.in_(product_ids)).subquery()
+        photo = aliased(ProductPhoto, ranked)
+        result = db.execute(select(photo).where(ranked.c.rank == 1))
+        return {p.product_id: p for p in result.scalars()}
+
 
+class AsyncProductRepository(AsyncBaseRepository[Product]):
+    """
+    Асинхронный репозиторий для работы с товарами
+    """
+    
+    def __init__(self):
+        super().__init__(ProductRepository())
+    
+    async def get_all(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить все товары с пагинацией
+        """
+        return await run_in_session(db, self.repository.get_all, skip, limit, photos, fields)
+    
+    async def get_page(
+        self,
+        db: AsyncSession,
+        limit: int = 100,
+        after: Optional[Tuple[Optional[int], UUID]] = None,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Keyset-пагинация товаров по (order_number, id)
+        """
+        return await run_in_session(db, self.repository.get_page, limit, after, photos, fields)
+    
+    async def get_by_ids(
+        self,
+        db: AsyncSession,
+        ids: List[UUID],
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары по списку ID
+        """
+        return await run_in_session(db, self.repository.get_by_ids, ids, photos, fields)
+    
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[Product]:
+        """
+        Получить товар по названию
+        """
+        return await run_in_session(db, self.repository.get_by_name, name)
+    
+    async def get_by_size(
+        self,
+        db: AsyncSession,
+        size: int,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары по размеру
+        """
+        return await run_in_session(db, self.repository.get_by_size, size, skip, limit, photos, fields)
+    
+    async def get_by_sizes(
+        self,
+        db: AsyncSession,
+        sizes: Iterable[int],
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары, у которых есть хотя бы один из размеров
+        """
+        return await run_in_session(db, self.repository.get_by_sizes, sizes, skip, limit, photos, fields)
+    
+    async def get_by_price_range(
+        self,
+        db: AsyncSession,
+        min_price: int,
+        max_price: int,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Product]:
+        """
+        Получить товары по диапазону цен
+        """
+        return await run_in_session(db, self.repository.get_by_price_range, min_price, max_price, skip, limit, photos, fields)
+    
+    async def search_products(
+        self,
+        db: AsyncSession,
+        query: str,
+        skip: int = 0,
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Product], int]:
+        """
+        Поиск товаров: (страница, всего найденных)
+        """
+        return await run_in_session(db, self.repository.search_products, query, skip, limit, photos, fields)
+    
+    async def get_search_documents(self, db: AsyncSession, ids: Optional[List[UUID]] = None) -> list:
+        """
+        Поля для поискового индекса в памяти
+        """
+        return await run_in_session(db, self.repository.get_search_documents, ids)
+    
+    async def get_with_photos(self, db: AsyncSession, product_id: UUID) -> Optional[Product]:
+        """
+        Получить товар с фотографиями
+        """
+        return await run_in_session(db, self.repository.get_with_photos, product_id)
+    
+    async def get_main_photos(self, db: AsyncSession, product_ids: List[UUID]) -> Dict[UUID, ProductPhoto]:
+        """
+        Главная фотография каждого товара
+        """
+        return await run_in_session(db, self.repository.get_main_photos, product_ids)
@@ -2,7 +2,9 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from uuid import UUID
-from .base import BaseRepository
+from sqlalchemy.ext.asyncio import AsyncSession
+from .base import BaseRepository, AsyncBaseRepository
+from ..database import run_in_session
 from ..models.slider_photo import SliderPhoto
 from ..schemas.slider import SliderPhotoCreate, SliderPhotoUpdate
 
@@ -47,7 +49,7 @@ class SliderPhotoRepository(BaseRepository[SliderPhoto]):
         photos = self.get_ordered(db)
         for i, photo in enumerate(photos):
             photo.order_number = i
-        db.commit()
+        self.commit(db)
         return True
     
     def update_order(self, db: Session, photo_id: UUID, new_order: int) -> Optional[SliderPhoto]:
@@ -67,7 +69,44 @@ class SliderPhotoRepository(BaseRepository[SliderPhoto]):
                     p.order_number += 1
             
             photo.order_number = new_order
-            db.commit()
-            db.refresh(photo)
+            self.commit(db, photo)
         return photo
 
+
+class AsyncSliderPhotoRepository(AsyncBaseRepository[SliderPhoto]):
+    """
+    Асинхронный репозиторий для работы с фотографиями слайдера
+    """
+    
+    def __init__(self):
+        super().__init__(SliderPhotoRepository())
+    
+    async def get_ordered(self, db: AsyncSession) -> List[SliderPhoto]:
+        """
+        Получить все фотографии слайдера в правильном порядке
+        """
+        return await run_in_session(db, self.repository.get_ordered)
+    
+    async def get_by_order_number(self, db: AsyncSession, order_number: int) -> Optional[SliderPhoto]:
+        """
+        Получить фотографию по порядковому номеру
+        """
+        return await run_in_session(db, self.repository.get_by_order_number, order_number)
+    
+    async def get_next_order_number(self, db: AsyncSession) -> int:
+        """
+        Получить следующий доступный порядковый номер
+        """
+        return await run_in_session(db, self.repository.get_next_order_number)
+    
+    async def reorder_photos(self, db: AsyncSession) -> bool:
+        """
+        Пересчитать порядковые номера фотографий
+        """
+        return await run_in_session(db, self.repository.reorder_photos)
+    
+    async def update_order(self, db: AsyncSession, photo_id: UUID, new_order: int) -> Optional[SliderPhoto]:
+        """
+        Обновить порядковый номер фотографии
+        """
+        return await run_in_session(db, self.repository.update_order, photo_id, new_order)
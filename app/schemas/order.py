@@ -110,6 +110,13 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+class OrderListResponse(BaseModel):
+    """Схема страницы заказов при keyset-пагинации"""
+    orders: List[OrderResponse] = Field(..., description="Заказы от новых к старым")
+    size: int = Field(..., description="Размер страницы")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы; null — страниц больше нет")
+
+
 class OrderStatusResponse(BaseModel):
     """Схема ответа со статусом заказа"""
     order_id: int = Field(..., description="ID заказа")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import List, Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, create_model, field_validator, model_validator
+from typing import List, Literal, Optional, Tuple, Type
 from uuid import UUID
 
 
@@ -143,8 +144,52 @@ class ProductListResponse(BaseModel):
     """Схема для списка товаров"""
     products: List[ProductResponse]
     total: int
-    page: int
+    page: Optional[int] = Field(None, description="Номер страницы (только для пагинации skip/limit)")
     size: int
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (keyset-пагинация)")
+
+
+class ProductSuggestion(BaseModel):
+    """Подсказка поиска"""
+    text: str = Field(..., description="Название или артикул товара")
+    kind: Literal["name", "sku"] = Field(..., description="name — название, sku — артикул")
+    product_id: UUID = Field(..., description="ID товара (первого по порядку каталога, если названия совпадают)")
+
+
+class ProductSuggestResponse(BaseModel):
+    """Схема для подсказок поиска"""
+    suggestions: List[ProductSuggestion]
+
+
+class ProductBatchCreate(BaseModel):
+    """Схема для пакетного создания товаров"""
+    items: List[ProductCreate] = Field(..., min_length=1, max_length=1000, description="Товары (до 1000 за запрос)")
+
+
+class ProductBatchUpdateItem(ProductUpdate):
+    """Изменения одного товара в пакетном обновлении"""
+    id: UUID = Field(..., description="ID товара")
+
+
+class ProductBatchUpdate(BaseModel):
+    """Схема для пакетного обновления товаров"""
+    items: List[ProductBatchUpdateItem] = Field(..., min_length=1, max_length=1000, description="Изменения (до 1000 за запрос)")
+
+
+class ProductBatchDelete(BaseModel):
+    """Схема для пакетного удаления товаров"""
+    ids: List[UUID] = Field(..., min_length=1, max_length=1000, description="ID товаров (до 1000 за запрос)")
+
+
+class ProductBatchResponse(BaseModel):
+    """Результат пакетного создания или обновления"""
+    products: List[ProductResponse]
+    total: int
+
+
+class ProductBatchDeleteResponse(BaseModel):
+    """Результат пакетного удаления"""
+    deleted: int
 
 
 # Импорт для избежания циклических зависимостей
@@ -152,3 +197,27 @@ from .photo import ProductPhotoResponse
 
 # Обновляем forward references
 ProductResponse.model_rebuild()
+ProductBatchResponse.model_rebuild()
+
+
+@lru_cache(maxsize=128)
+def product_projection(fields: Tuple[str, ...], with_photos: bool) -> Type[BaseModel]:
+    """
+    Схема товара только с полями fields (?fields=) и, если with_photos, списком photos
+    """
+    definitions = {name: (ProductResponse.model_fields[name].annotation, ...) for name in fields}
+    if with_photos:
+        definitions["photos"] = (List[ProductPhotoResponse], [])
+    return create_model("ProductProjection", __config__=ConfigDict(from_attributes=True), **definitions)
+
+
+@lru_cache(maxsize=128)
+def product_list_projection(fields: Tuple[str, ...], with_photos: bool) -> Type[ProductListResponse]:
+    """
+    Список товаров со схемой product_projection
+    """
+    return create_model(
+        "ProductListProjection",
+        __base__=ProductListResponse,
+        products=(List[product_projection(fields, with_photos)], ...)
+    )
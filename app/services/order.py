@@ -1,9 +1,17 @@
+import asyncio
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from ..models.order import Order
-from ..schemas.order import OrderCreate, OrderResponse, OrderStatusResponse
-from ..repositories.order import OrderRepository
+from ..schemas.order import OrderCreate, OrderResponse, OrderStatusResponse, OrderListResponse
+from ..repositories.order import OrderRepository, AsyncOrderRepository
+from ..config import settings
+from ..database import unit_of_work
+from ..core.cache import Cache
+from ..core.exceptions import InvalidCursorException
 from ..core.logging import get_logger
+from ..core.pagination import encode_cursor, decode_cursor
+from .order_export import FORMATTERS, export_chunks, async_export_chunks
 from datetime import datetime, timezone, timedelta
 import uuid
 
@@ -12,51 +20,59 @@ MSK = timezone(timedelta(hours=3))
 
 logger = get_logger(__name__)
 
+# Кэш статуса заказа: фронт опрашивает статус после оплаты. Запись удаляется при изменении статуса/платежа
+order_status_cache = Cache("order_status", ttl=settings.order_status_cache_ttl)
+
 
 class OrderService:
     """Сервис для работы с заказами"""
     
     def __init__(self):
         self.repository = OrderRepository()
+        self.async_repository = AsyncOrderRepository()
     
-    def create_order(self, db: Session, order_data: OrderCreate) -> OrderResponse:
+    def _build_order(self, order_data: OrderCreate) -> Order:
         """
-        Создать новый заказ
+        ORM-объект нового заказа по данным запроса
         """
-        try:
-            # Преобразуем items в список словарей для сохранения в JSON
-            items_data = []
-            for item in order_data.items:
-                items_data.append({
-                    "name": item.name,
-                    "quantity": item.quantity,
-                    "price": item.price,
-                    "size": item.size
-                })
-            
-            # Определяем время заказа: если не передано, используем текущее в MSK
-            order_time = order_data.order_time or datetime.now(MSK)
+        # Преобразуем items в список словарей для сохранения в JSON
+        items_data = []
+        for item in order_data.items:
+            items_data.append({
+                "name": item.name,
+                "quantity": item.quantity,
+                "price": item.price,
+                "size": item.size
+            })
+        
+        # Определяем время заказа: если не передано, используем текущее в MSK
+        order_time = order_data.order_time or datetime.now(MSK)
 
-            # Создаем объект заказа
-            # Для delivery_time сохраняем как timezone-aware datetime в MSK
-            delivery_time_msk = order_data.delivery_time.replace(tzinfo=MSK) if order_data.delivery_time.tzinfo is None else order_data.delivery_time
+        # Создаем объект заказа
+        # Для delivery_time сохраняем как timezone-aware datetime в MSK
+        delivery_time_msk = order_data.delivery_time.replace(tzinfo=MSK) if order_data.delivery_time.tzinfo is None else order_data.delivery_time
 
-            logger.info(f"Creating order - original delivery_time: {order_data.delivery_time}, MSK delivery_time: {delivery_time_msk}")
+        logger.info(f"Creating order - original delivery_time: {order_data.delivery_time}, MSK delivery_time: {delivery_time_msk}")
 
-            order = Order(
-                customer_name=order_data.customer_name,
-                email=order_data.email,
-                phone=order_data.phone,
-                address=order_data.address,
-                delivery_time=delivery_time_msk,
-                order_time=order_time,
-                items=items_data,
-                total_amount=order_data.total_amount,
-                status="created"
-            )
-            
+        return Order(
+            customer_name=order_data.customer_name,
+            email=order_data.email,
+            phone=order_data.phone,
+            address=order_data.address,
+            delivery_time=delivery_time_msk,
+            order_time=order_time,
+            items=items_data,
+            total_amount=order_data.total_amount,
+            status="created"
+        )
+    
+    def create_order(self, db: Session, order_data: OrderCreate) -> OrderResponse:
+        """
+        Создать новый заказ
+        """
+        try:
             # Сохраняем в базу данных
-            created_order = self.repository.create(db, order)
+            created_order = self.repository.create(db, self._build_order(order_data))
             logger.info(f"Создан заказ {created_order.id} для {order_data.email}")
             
             return OrderResponse.model_validate(created_order)
@@ -65,6 +81,55 @@ class OrderService:
             logger.error(f"Ошибка при создании заказа: {str(e)}")
             raise
     
+    def create_order_with_payment(
+        self,
+        db: Session,
+        order_data: OrderCreate,
+        create_payment: Callable[..., Dict[str, Any]]
+    ) -> Tuple[OrderResponse, Dict[str, Any]]:
+        """
+        Создать заказ и платеж: INSERT ... RETURNING и commit, затем платеж в ЮKassa вне транзакции
+        (соединение и блокировки не держатся, пока отвечает провайдер), затем короткий UPDATE payment_id.
+        Если платеж не создан, заказ удаляется. Если платеж создан, но payment_id не сохранился,
+        ответ все равно возвращается: webhook найдет заказ по metadata.order_id платежа.
+        """
+        try:
+            with unit_of_work(db):
+                order = self.repository.create(db, self._build_order(order_data))
+                # Ответ собирается до commit: после него атрибуты истекают и потребовали бы SELECT
+                response = OrderResponse.model_validate(order)
+                items = order.items
+            
+            try:
+                payment_data = create_payment(
+                    order_id=response.id,
+                    amount=response.total_amount,
+                    description=f"Заказ №{response.id}",
+                    customer_email=response.email,
+                    customer_phone=response.phone,
+                    items=items,
+                )
+            except Exception:
+                self.repository.delete(db, response.id)
+                raise
+            
+            response.payment_id = payment_data["payment_id"]
+            try:
+                self.repository.set_payment_id(db, response.id, response.payment_id)
+            except Exception as e:
+                db.rollback()
+                logger.error(
+                    f"Платеж {response.payment_id} создан, но не сохранен в заказе {response.id}: {str(e)}. "
+                    f"Заказ будет связан с платежом по webhook"
+                )
+            
+            logger.info(f"Создан заказ {response.id} для {order_data.email}, платеж {response.payment_id}")
+            return response, payment_data
+            
+        except Exception as e:
+            logger.error(f"Ошибка при создании заказа с платежом: {str(e)}")
+            raise
+    
     def get_order(self, db: Session, order_id: int) -> Optional[OrderResponse]:
         """
         Получить заказ по ID
@@ -80,12 +145,19 @@ class OrderService:
             logger.error(f"Ошибка при получении заказа {order_id}: {str(e)}")
             raise
     
-    def get_order_by_payment_id(self, db: Session, payment_id: str) -> Optional[OrderResponse]:
+    def get_order_by_payment_id(self, db: Session, payment_id: str, metadata_order_id: Optional[str] = None) -> Optional[OrderResponse]:
         """
-        Получить заказ по ID платежа
+        Получить заказ по ID платежа. metadata_order_id — order_id из metadata платежа: по нему
+        находится заказ, в котором payment_id не сохранился после создания платежа, и связывается с ним
         """
         try:
             order = self.repository.get_by_payment_id(db, payment_id)
+            if not order and metadata_order_id and metadata_order_id.isdigit():
+                order = self.repository.get(db, int(metadata_order_id))
+                if order and order.payment_id is None:
+                    self.update_payment_id(db, order.id, payment_id)
+                else:
+                    order = None
             if not order:
                 return None
             
@@ -100,16 +172,22 @@ class OrderService:
         Получить статус заказа
         """
         try:
+            found, cached = order_status_cache.get(order_id)
+            if found:
+                return cached if isinstance(cached, OrderStatusResponse) else OrderStatusResponse.model_validate(cached)
+            
             order = self.repository.get(db, order_id)
             if not order:
                 return None
             
-            return OrderStatusResponse(
+            response = OrderStatusResponse(
                 order_id=order.id,
                 status=order.status,
                 total_amount=order.total_amount,
                 payment_id=order.payment_id
             )
+            order_status_cache.set(order_id, response)
+            return response
             
         except Exception as e:
             logger.error(f"Ошибка при получении статуса заказа {order_id}: {str(e)}")
@@ -127,9 +205,8 @@ class OrderService:
             order.status = status
             # Поскольку мы работаем напрямую с ORM-объектом Order,
             # просто фиксируем изменения через сессию, не используя generic update
-            db.add(order)
-            db.commit()
-            db.refresh(order)
+            self.repository.commit(db, order)
+            order_status_cache.delete(order_id)
             logger.info(f"Статус заказа {order_id} обновлен на {status}")
             return True
             
@@ -148,9 +225,8 @@ class OrderService:
             
             order.payment_id = payment_id
             # Аналогично статусу, сохраняем изменения напрямую через сессию
-            db.add(order)
-            db.commit()
-            db.refresh(order)
+            self.repository.commit(db, order)
+            order_status_cache.delete(order_id)
             logger.info(f"Payment ID {payment_id} добавлен к заказу {order_id}")
             return True
             
@@ -194,26 +270,156 @@ class OrderService:
             logger.error(f"Ошибка при получении последних заказов: {str(e)}")
             raise
     
+    def get_orders_by_email_page(self, db: Session, email: str, limit: int = 100, cursor: Optional[str] = None) -> OrderListResponse:
+        """
+        Получить страницу заказов по email (keyset-пагинация по created_at, id)
+        """
+        after = self._decode_cursor(cursor)
+        orders = self.repository.get_by_email(db, email, limit=limit + 1, after=after)
+        return self._build_page(orders, limit)
+    
+    def get_orders_by_status_page(self, db: Session, status: str, limit: int = 100, cursor: Optional[str] = None) -> OrderListResponse:
+        """
+        Получить страницу заказов по статусу (keyset-пагинация по created_at, id)
+        """
+        after = self._decode_cursor(cursor)
+        orders = self.repository.get_by_status(db, status, limit=limit + 1, after=after)
+        return self._build_page(orders, limit)
+    
+    def get_recent_orders_page(self, db: Session, limit: int = 100, cursor: Optional[str] = None) -> OrderListResponse:
+        """
+        Получить страницу последних заказов (keyset-пагинация по created_at, id)
+        """
+        after = self._decode_cursor(cursor)
+        orders = self.repository.get_recent_orders(db, limit=limit + 1, after=after)
+        return self._build_page(orders, limit)
+    
+    def _decode_cursor(self, cursor: Optional[str]) -> Optional[tuple]:
+        """
+        Курсор заказов — (created_at, id) последнего заказа страницы
+        """
+        after = decode_cursor(cursor, 2)
+        if after is None:
+            return None
+        try:
+            return datetime.fromisoformat(after[0]), int(after[1])
+        except (TypeError, ValueError):
+            raise InvalidCursorException(cursor)
+    
+    def _build_page(self, orders: List[Order], limit: int) -> OrderListResponse:
+        """
+        Собрать страницу: репозиторий вернул limit + 1 записей, лишняя означает наличие следующей страницы
+        """
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            last = orders[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return OrderListResponse(
+            orders=[OrderResponse.model_validate(order) for order in orders],
+            size=limit,
+            next_cursor=next_cursor
+        )
+    
     def get_orders_statistics(self, db: Session) -> dict:
         """
         Получить статистику заказов
         """
         try:
-            total_orders = self.repository.get_orders_count(db)
-            paid_orders = self.repository.get_orders_count_by_status(db, "paid")
-            created_orders = self.repository.get_orders_count_by_status(db, "created")
-            canceled_orders = self.repository.get_orders_count_by_status(db, "canceled")
-            total_revenue = self.repository.get_total_revenue(db)
+            # Один запрос с группировкой по статусу вместо отдельного запроса на каждый показатель
+            rows = self.repository.get_statistics_by_status(db)
+            by_status = {status: count for status, count, _ in rows}
+            total_revenue = sum(amount for status, _, amount in rows if status == "paid")
             
             return {
-                "total_orders": total_orders,
-                "paid_orders": paid_orders,
-                "created_orders": created_orders,
-                "canceled_orders": canceled_orders,
-                "total_revenue": total_revenue
+                "total_orders": sum(by_status.values()),
+                "paid_orders": by_status.get("paid", 0),
+                "created_orders": by_status.get("created", 0),
+                "canceled_orders": by_status.get("canceled", 0),
+                "total_revenue": total_revenue,
+                "by_status": by_status
             }
             
         except Exception as e:
             logger.error(f"Ошибка при получении статистики заказов: {str(e)}")
             raise
-
+    
+    def export_orders(
+        self,
+        db: Session,
+        export_format: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Потоковая выгрузка заказов (csv | ndjson), одна строка на позицию заказа
+        """
+        rows = self.repository.stream_for_export(db, date_from, date_to, status)
+        return export_chunks(rows, FORMATTERS[export_format]())
+    
+    def export_orders_async(
+        self,
+        db: AsyncSession,
+        export_format: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковая выгрузка заказов через async-сессию (asyncpg)
+        """
+        rows = self.async_repository.stream_for_export(db, date_from, date_to, status)
+        return async_export_chunks(rows, FORMATTERS[export_format]())
+    
+    async def stream_export(
+        self,
+        session_factory: Callable[[], Any],
+        export_format: str,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        status: Optional[str] = None
+    ) -> Union[Iterator[str], AsyncIterator[str]]:
+        """
+        Выгрузка для StreamingResponse в собственной сессии из session_factory: генератор закрывает
+        ее по окончании или при отключении клиента. Первая порция читается здесь, до начала ответа:
+        ошибка подключения к БД становится 500, а не обрывом потока после заголовков 200.
+        Для фабрики AsyncSession — асинхронный генератор
+        """
+        args = (export_format, date_from, date_to, status)
+        if isinstance(session_factory, async_sessionmaker):
+            chunks = self._stream_export_async(session_factory, *args)
+            return self._prepend_async(await anext(chunks, None), chunks)
+        chunks = self._stream_export(session_factory, *args)
+        return self._prepend(await asyncio.to_thread(next, chunks, None), chunks)
+    
+    def _stream_export(self, session_factory: Callable[[], Session], *args) -> Iterator[str]:
+        db = session_factory()
+        try:
+            yield from self.export_orders(db, *args)
+        finally:
+            db.close()
+    
+    async def _stream_export_async(self, session_factory: Callable[[], AsyncSession], *args) -> AsyncIterator[str]:
+        async with session_factory() as db:
+            async for chunk in self.export_orders_async(db, *args):
+                yield chunk
+    
+    @staticmethod
+    def _prepend(first: Optional[str], chunks: Iterator[str]) -> Iterator[str]:
+        try:
+            if first is not None:
+                yield first
+            yield from chunks
+        finally:
+            chunks.close()
+    
+    @staticmethod
+    async def _prepend_async(first: Optional[str], chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        try:
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List
+from ..schemas.order import get_size_label
+
+# Колонки выгрузки: одна строка на позицию заказа
+EXPORT_FIELDS = [
+    "order_id",
+    "created_at",
+    "status",
+    "customer_name",
+    "email",
+    "phone",
+    "address",
+    "delivery_time",
+    "order_time",
+    "total_amount",
+    "payment_id",
+    "item_index",
+    "item_name",
+    "item_size",
+    "item_size_label",
+    "item_quantity",
+    "item_price",
+]
+
+# Размер порции, отдаваемой клиенту (байт текста)
+CHUNK_SIZE = 64 * 1024
+
+# Начало ячейки, с которого Excel/LibreOffice считают ее формулой
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def flatten_order(row) -> Iterator[Dict[str, Any]]:
+    """
+    Строка заказа -> по одной записи на каждую позицию items (заказ без позиций — одна запись)
+    """
+    base = {
+        "order_id": row.id,
+        "created_at": _isoformat(row.created_at),
+        "status": row.status,
+        "customer_name": row.customer_name,
+        "email": row.email,
+        "phone": row.phone,
+        "address": row.address,
+        "delivery_time": _isoformat(row.delivery_time),
+        "order_time": _isoformat(row.order_time),
+        "total_amount": row.total_amount,
+        "payment_id": row.payment_id,
+    }
+    items = row.items or []
+    if not items:
+        yield {**base, "item_index": None, "item_name": None, "item_size": None,
+               "item_size_label": None, "item_quantity": None, "item_price": None}
+        return
+    for index, item in enumerate(items):
+        size = item.get("size")
+        yield {
+            **base,
+            "item_index": index,
+            "item_name": item.get("name"),
+            "item_size": size,
+            "item_size_label": get_size_label(size) if size is not None else None,
+            "item_quantity": item.get("quantity"),
+            "item_price": item.get("price"),
+        }
+
+
+class CsvFormatter:
+    """
+    CSV с заголовком. BOM в начале — чтобы Excel правильно открыл кириллицу.
+    Строки от клиента, начинающиеся с =, +, -, @, экранируются апострофом (CSV-инъекция формул)
+    """
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def header(self) -> str:
+        return "\ufeff" + self._line(EXPORT_FIELDS)
+
+    def format(self, record: Dict[str, Any]) -> str:
+        return self._line([self._cell(record[field]) for field in EXPORT_FIELDS])
+
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    @staticmethod
+    def _line(values: List[Any]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(["" if value is None else value for value in values])
+        return buffer.getvalue()
+
+
+class NdjsonFormatter:
+    """
+    NDJSON: один JSON-объект на строку
+    """
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def header(self) -> str:
+        return ""
+
+    def format(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+FORMATTERS = {
+    "csv": CsvFormatter,
+    "ndjson": NdjsonFormatter,
+}
+
+
+class ChunkBuffer:
+    """
+    Склейка мелких строк в порции по CHUNK_SIZE, чтобы не отправлять клиенту каждую строку отдельно
+    """
+
+    def __init__(self, initial: str = ""):
+        self.parts = [initial] if initial else []
+        self.size = len(initial)
+
+    def add(self, text: str) -> str:
+        """
+        Добавить строку; вернуть накопленную порцию, если она заполнена, иначе пустую строку
+        """
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= CHUNK_SIZE:
+            return self.flush()
+        return ""
+
+    def flush(self) -> str:
+        chunk = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return chunk
+
+
+def export_chunks(rows: Iterable, formatter) -> Iterator[str]:
+    """
+    Порции выгрузки из потока строк заказов
+    """
+    buffer = ChunkBuffer(formatter.header())
+    for row in rows:
+        for record in flatten_order(row):
+            chunk = buffer.add(formatter.format(record))
+            if chunk:
+                yield chunk
+    tail = buffer.flush()
+    if tail:
+        yield tail
+
+
+async def async_export_chunks(rows: AsyncIterable, formatter) -> AsyncIterator[str]:
+    """
+    Порции выгрузки из асинхронного потока строк заказов
+    """
+    buffer = ChunkBuffer(formatter.header())
+    async for row in rows:
+        for record in flatten_order(row):
+            chunk = buffer.add(formatter.format(record))
+            if chunk:
+                yield chunk
+    tail = buffer.flush()
+    if tail:
+        yield tail
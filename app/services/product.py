@@ -1,10 +1,75 @@
-from typing import List, Optional
+from typing import Callable, Hashable, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from uuid import UUID
-from ..repositories.product import ProductRepository
-from ..schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
-from ..core.exceptions import ProductNotFoundException
+from ..models.product import Product
+from ..repositories.product import PRODUCT_FIELDS, ProductRepository
+from ..schemas.photo import ProductPhotoResponse
+from ..schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductListResponse,
+    ProductBatchUpdateItem,
+    product_list_projection,
+    product_projection
+)
+from ..config import settings
+from ..database import run_in_read_session, unit_of_work
+from ..core.cache import Cache
+from ..core.exceptions import ProductNotFoundException, InvalidCursorException, InvalidFieldsException
+from ..core.invalidation import on_change, publish_change
+from ..core.pagination import encode_cursor, decode_cursor
+from ..core.single_flight import cached_load
+from .file_service import FileService
+from .search_index import search_index
+from .suggest_index import suggest_index
+
+# Кэш списков каталога: сбрасывается целиком при любом изменении товаров и фото,
+# после истечения TTL список еще cache_stale_ttl секунд отдается, пока обновляется в фоне
+catalog_cache = Cache("catalog", ttl=settings.catalog_cache_ttl, stale_ttl=settings.cache_stale_ttl)
+# Кэш карточек товаров: при изменении товара удаляется только его карточка
+product_cache = Cache(
+    "product",
+    ttl=settings.catalog_cache_ttl,
+    negative_ttl=settings.catalog_cache_negative_ttl
+)
+file_service = FileService()
+
+ResponseType = TypeVar("ResponseType", bound=BaseModel)
+
+
+def _on_product_change(product_id: str) -> None:
+    """
+    Изменение товара или его фото ("product:<id>", пакетные операции — "product:*")
+    """
+    catalog_cache.invalidate()
+    if product_id == "*":
+        product_cache.invalidate()
+        search_index.invalidate()
+        suggest_index.invalidate()
+    else:
+        product_cache.delete(product_id)
+        search_index.invalidate(UUID(product_id))
+        suggest_index.invalidate(UUID(product_id))
+
+
+on_change("product", _on_product_change)
+
+
+def product_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    ?fields=id,name,price -> отсортированный кортеж полей (id добавляется всегда).
+    None — все поля. Неизвестное поле — InvalidFieldsException (400)
+    """
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - PRODUCT_FIELDS.keys()
+    if unknown:
+        raise InvalidFieldsException(", ".join(sorted(unknown)))
+    return tuple(sorted(names | {"id"}))
 
 
 class ProductService:
@@ -14,6 +79,55 @@ class ProductService:
     
     def __init__(self):
         self.repository = ProductRepository()
+        self.cache = catalog_cache
+    
+    def _cached(
+        self,
+        db: Session,
+        key: Hashable,
+        load: Callable[[Session], ResponseType],
+        model: Type[ResponseType]
+    ) -> ResponseType:
+        """
+        Ответ из кэша каталога либо результат load(db), который сохраняется в кэш.
+        Одновременные промахи одного ключа выполняют load один раз; устаревший ответ
+        отдается сразу, а load выполняется в фоне в новой сессии чтения.
+        """
+        value = cached_load(self.cache, key, lambda: load(db), lambda: run_in_read_session(load))
+        # Из внешнего кэша приходит словарь
+        return value if isinstance(value, model) else model.model_validate(value)
+    
+    @staticmethod
+    def _list_model(photos: str, fields: Optional[Tuple[str, ...]]) -> Type[ProductListResponse]:
+        """
+        Схема списка: полная либо только с полями fields (photos — если фотографии запрошены)
+        """
+        if fields is None:
+            return ProductListResponse
+        return product_list_projection(fields, photos != "none")
+    
+    def _list_response(
+        self,
+        db: Session,
+        products: List[Product],
+        photos: str,
+        fields: Optional[Tuple[str, ...]],
+        **page
+    ) -> ProductListResponse:
+        """
+        Ответ со списком товаров. При photos="main" главные фотографии всей страницы
+        читаются одним запросом и подставляются вместо списка photos
+        """
+        item_model = ProductResponse if fields is None else product_projection(fields, photos != "none")
+        main = self.repository.get_main_photos(db, [p.id for p in products]) if photos == "main" else None
+        items = []
+        for product in products:
+            item = item_model.model_validate(product)
+            if main is not None:
+                photo = main.get(product.id)
+                item.photos = [ProductPhotoResponse.model_validate(photo)] if photo is not None else []
+            items.append(item)
+        return self._list_model(photos, fields)(products=items, **page)
     
     def create_product(self, db: Session, product_data: ProductCreate) -> ProductResponse:
         """
@@ -35,36 +149,167 @@ class ProductService:
             # Если вычисление не удалось, оставляем как есть (NULL)
             pass
 
-        product = self.repository.create(db, product_data)
-        return ProductResponse.model_validate(product)
+        with unit_of_work(db):
+            product = self.repository.create(db, product_data)
+            response = ProductResponse.model_validate(product)
+            publish_change(db, "product", product.id)
+        suggest_index.upsert(response)
+        return response
+    
+    def bulk_create_products(self, db: Session, items: List[ProductCreate]) -> List[ProductResponse]:
+        """
+        Создать товары пакетом: один запрос max(order_number) и один INSERT на весь пакет.
+        Товарам без order_number номера назначаются подряд после текущего максимума.
+        """
+        max_val = db.execute(select(func.max(self.repository.model.order_number))).scalar()
+        next_order = 1 if max_val is None else int(max_val) + 1
+        prepared = []
+        for item in items:
+            if item.order_number is None:
+                item = item.model_copy(update={"order_number": next_order})
+                next_order += 1
+            prepared.append(item)
+        
+        with unit_of_work(db):
+            products = self.repository.bulk_create(db, prepared)
+            # Ответ собирается до commit: после него атрибуты истекают
+            response = [ProductResponse.model_validate(p) for p in products]
+            publish_change(db, "product")
+        for item in response:
+            suggest_index.upsert(item)
+        return response
+    
+    def bulk_update_products(self, db: Session, items: List[ProductBatchUpdateItem]) -> List[ProductResponse]:
+        """
+        Обновить товары пакетом: проверка существования, executemany UPDATE и чтение результата —
+        по одному запросу на пакет. Если хотя бы одного товара нет, ничего не меняется.
+        """
+        ids = [item.id for item in items]
+        self._ensure_exist(db, ids)
+        
+        with unit_of_work(db):
+            self.repository.bulk_update(db, [(item.id, item) for item in items])
+            products = {p.id: p for p in self.repository.get_by_ids(db, ids)}
+            response = [ProductResponse.model_validate(products[product_id]) for product_id in dict.fromkeys(ids)]
+            publish_change(db, "product")
+        for item in response:
+            suggest_index.upsert(item)
+        return response
+    
+    def bulk_delete_products(self, db: Session, ids: List[UUID]) -> int:
+        """
+        Удалить товары пакетом вместе с их фотографиями: записи в БД, затем файлы
+        после фиксации транзакции
+        """
+        self._ensure_exist(db, ids)
+        file_paths = self.repository.get_photo_paths(db, ids)
+        with unit_of_work(db):
+            deleted = self.repository.bulk_delete(db, ids)
+            publish_change(db, "product")
+        for file_path in file_paths:
+            file_service.delete_file(file_path)
+        for product_id in ids:
+            suggest_index.remove(product_id)
+        return deleted
+    
+    def _ensure_exist(self, db: Session, ids: List[UUID]) -> None:
+        """
+        Проверить одним запросом, что все товары существуют
+        """
+        found = set(db.execute(
+            select(self.repository.model.id).where(self.repository.model.id.in_(ids))
+        ).scalars())
+        missing = [product_id for product_id in ids if product_id not in found]
+        if missing:
+            raise ProductNotFoundException(str(missing[0]))
     
     def get_product(self, db: Session, product_id: UUID) -> ProductResponse:
         """
         Получить товар по ID
         """
+        found, cached = product_cache.get(product_id)
+        if found:
+            if cached is None:
+                raise ProductNotFoundException(str(product_id))
+            return cached if isinstance(cached, ProductResponse) else ProductResponse.model_validate(cached)
+        
+        version = product_cache.version()
         product = self.repository.get_with_photos(db, product_id)
         if not product:
+            # Несуществующий ID запоминается ненадолго (catalog_cache_negative_ttl)
+            product_cache.set(product_id, None, version)
             raise ProductNotFoundException(str(product_id))
-        return ProductResponse.model_validate(product)
+        response = ProductResponse.model_validate(product)
+        product_cache.set(product_id, response, version)
+        return response
     
     def get_products(
         self, 
         db: Session, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
     ) -> ProductListResponse:
         """
-        Получить список товаров с пагинацией
+        Получить список товаров с пагинацией.
+        photos: all — все фотографии, main — только главная, none — без фотографий (photos=[]).
+        fields — только эти поля товара (см. product_fields).
         """
-        products = self.repository.get_all(db, skip, limit)
-        total = self.repository.count(db)
+        def load(db: Session) -> ProductListResponse:
+            products = self.repository.get_all(db, skip, limit, photos, fields)
+            total = self.repository.count(db, cached=settings.catalog_approximate_total)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=total,
+                page=skip // limit + 1,
+                size=limit
+            )
         
-        return ProductListResponse(
-            products=[ProductResponse.model_validate(p) for p in products],
-            total=total,
-            page=skip // limit + 1,
-            size=limit
-        )
+        return self._cached(db, ("list", skip, limit, photos, fields), load, self._list_model(photos, fields))
+    
+    def get_products_page(
+        self,
+        db: Session,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> ProductListResponse:
+        """
+        Получить страницу товаров по курсору (keyset-пагинация по order_number, id)
+        """
+        after = decode_cursor(cursor, 2)
+        if after is not None:
+            order_number, product_id = after
+            # Курсор приходит от клиента: типы проверяются до разбора (UUID(123) — AttributeError)
+            if not isinstance(product_id, str) or not (
+                order_number is None or (isinstance(order_number, int) and not isinstance(order_number, bool))
+            ):
+                raise InvalidCursorException(cursor)
+            try:
+                after = (order_number, UUID(product_id))
+            except ValueError:
+                raise InvalidCursorException(cursor)
+        
+        def load(db: Session) -> ProductListResponse:
+            # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+            products = self.repository.get_page(db, limit + 1, after, photos, fields)
+            next_cursor = None
+            if len(products) > limit:
+                products = products[:limit]
+                last = products[-1]
+                next_cursor = encode_cursor(last.order_number, last.id)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=self.repository.count(db, cached=settings.catalog_approximate_total),
+                size=limit,
+                next_cursor=next_cursor
+            )
+        
+        return self._cached(db, ("page", limit, after, photos, fields), load, self._list_model(photos, fields))
     
     def update_product(
         self, 
@@ -75,10 +320,14 @@ class ProductService:
         """
         Обновить товар
         """
-        product = self.repository.update(db, product_id, product_data)
-        if not product:
-            raise ProductNotFoundException(str(product_id))
-        return ProductResponse.model_validate(product)
+        with unit_of_work(db):
+            product = self.repository.update(db, product_id, product_data)
+            if not product:
+                raise ProductNotFoundException(str(product_id))
+            response = ProductResponse.model_validate(product)
+            publish_change(db, "product", product_id)
+        suggest_index.upsert(response)
+        return response
     
     def delete_product(self, db: Session, product_id: UUID) -> bool:
         """
@@ -87,26 +336,41 @@ class ProductService:
         product = self.repository.get(db, product_id)
         if not product:
             raise ProductNotFoundException(str(product_id))
-        return self.repository.delete(db, product_id)
+        with unit_of_work(db):
+            deleted = self.repository.delete(db, product_id)
+            publish_change(db, "product", product_id)
+        suggest_index.remove(product_id)
+        return deleted
     
     def search_products(
         self, 
         db: Session, 
         query: str, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
     ) -> ProductListResponse:
         """
-        Поиск товаров
+        Поиск товаров: по индексу в памяти (search_index_enabled) либо запросом к БД
         """
-        products = self.repository.search_products(db, query, skip, limit)
-        total = len(products)  # Для поиска считаем только найденные
+        def load(db: Session) -> ProductListResponse:
+            if settings.search_index_enabled:
+                ids, total = search_index.search(db, query, skip, limit)
+                found = {p.id: p for p in self.repository.get_by_ids(db, ids, photos, fields)}
+                products = [found[product_id] for product_id in ids if product_id in found]
+            else:
+                products, total = self.repository.search_products(db, query, skip, limit, photos, fields)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=total,
+                page=skip // limit + 1,
+                size=limit
+            )
         
-        return ProductListResponse(
-            products=[ProductResponse.model_validate(p) for p in products],
-            total=total,
-            page=skip // limit + 1,
-            size=limit
+        return self._cached(
+            db, ("search", query, skip, limit, photos, fields), load, self._list_model(photos, fields)
         )
     
     def get_products_by_size(
@@ -114,39 +378,77 @@ class ProductService:
         db: Session, 
         size: int, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
     ) -> ProductListResponse:
         """
         Получить товары по размеру
         """
-        products = self.repository.get_by_size(db, size, skip, limit)
-        total = len(products)
+        def load(db: Session) -> ProductListResponse:
+            products = self.repository.get_by_size(db, size, skip, limit, photos, fields)
+            total = len(products)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=total,
+                page=skip // limit + 1,
+                size=limit
+            )
         
-        return ProductListResponse(
-            products=[ProductResponse.model_validate(p) for p in products],
-            total=total,
-            page=skip // limit + 1,
-            size=limit
+        return self._cached(
+            db, ("size", size, skip, limit, photos, fields), load, self._list_model(photos, fields)
         )
     
+    def get_products_by_sizes(
+        self, 
+        db: Session, 
+        sizes: List[int], 
+        skip: int = 0, 
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> ProductListResponse:
+        """
+        Получить товары, у которых есть хотя бы один из размеров
+        """
+        def load(db: Session) -> ProductListResponse:
+            products = self.repository.get_by_sizes(db, sizes, skip, limit, photos, fields)
+            total = len(products)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=total,
+                page=skip // limit + 1,
+                size=limit
+            )
+        
+        key = ("sizes", tuple(sorted(set(sizes))), skip, limit, photos, fields)
+        return self._cached(db, key, load, self._list_model(photos, fields))
+    
     def get_products_by_price_range(
         self, 
         db: Session, 
         min_price: int, 
         max_price: int, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        photos: str = "all",
+        fields: Optional[Tuple[str, ...]] = None
     ) -> ProductListResponse:
         """
         Получить товары по диапазону цен
         """
-        products = self.repository.get_by_price_range(db, min_price, max_price, skip, limit)
-        total = len(products)
+        def load(db: Session) -> ProductListResponse:
+            products = self.repository.get_by_price_range(db, min_price, max_price, skip, limit, photos, fields)
+            total = len(products)
+            
+            return self._list_response(
+                db, products, photos, fields,
+                total=total,
+                page=skip // limit + 1,
+                size=limit
+            )
         
-        return ProductListResponse(
-            products=[ProductResponse.model_validate(p) for p in products],
-            total=total,
-            page=skip // limit + 1,
-            size=limit
-        )
-
+        key = ("price", min_price, max_price, skip, limit, photos, fields)
+        return self._cached(db, key, load, self._list_model(photos, fields))
@@ -0,0 +1,205 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..core.logging import get_logger
+from ..repositories.product import ProductRepository
+
+logger = get_logger("SearchIndex")
+
+# Вес совпадения в поле товара: название важнее артикула, артикул — цвета
+FIELD_WEIGHTS = (("name", 3.0), ("sku", 2.0), ("color", 1.0))
+# Вес вида совпадения слова запроса со словом товара
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+# Минимальное сходство по триграммам для слова с опечаткой
+FUZZY_THRESHOLD = 0.45
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Приведение к одному регистру (кириллица и латиница) и ё -> е
+    """
+    return (text or "").casefold().replace("ё", "е")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    """
+    Триграммы слова с границами (как в pg_trgm): "мир" -> {"  м", " ми", "мир", "ир "}
+    """
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    Поисковый индекс каталога в памяти процесса: слово -> товары (с весом поля) по названию,
+    артикулу и цвету, триграммы -> слова (опечатки) и отсортированный словарь (префиксы).
+
+    Каждое слово запроса должно совпасть со словом товара точно, по началу или с опечаткой;
+    ранг — сумма весов, при равенстве — порядок каталога. Индекс строится из БД при первом
+    поиске, изменения товаров (invalidate, в том числе из других воркеров по NOTIFY) дочитываются
+    перед следующим поиском только по измененным ID. Не реже раза в search_index_max_age секунд
+    индекс строится заново — если уведомление было потеряно.
+    """
+
+    def __init__(self):
+        self.repository = ProductRepository()
+        self._postings: Dict[str, Dict[UUID, float]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._documents: Dict[UUID, Tuple[Dict[str, float], Optional[int]]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._dirty: Set[UUID] = set()
+        self._stale = True
+        self._generation = 0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, product_id: Optional[UUID] = None) -> None:
+        """
+        Товар изменен (None — изменения пакетом, индекс строится заново)
+        """
+        with self._lock:
+            if product_id is None:
+                self._stale = True
+                self._generation += 1
+            else:
+                self._dirty.add(product_id)
+
+    def search(self, db: Session, query: str, skip: int = 0, limit: int = 100) -> Tuple[List[UUID], int]:
+        """
+        ID товаров страницы в порядке релевантности и общее количество найденных
+        """
+        self._refresh(db)
+        with self._lock:
+            scores: Optional[Dict[UUID, float]] = None
+            for token in dict.fromkeys(tokenize(query)):
+                matches = self._match(token)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {pid: score + matches[pid] for pid, score in scores.items() if pid in matches}
+                if not scores:
+                    return [], 0
+            if scores is None:
+                return [], 0
+            ranked = sorted(scores, key=lambda pid: (-scores[pid], self._order_key(pid), str(pid)))
+        return ranked[skip:skip + limit], len(ranked)
+
+    def _order_key(self, product_id: UUID) -> Tuple[bool, int]:
+        # Товары без order_number — в конце, как в каталоге
+        order_number = self._documents[product_id][1]
+        return order_number is None, order_number or 0
+
+    def _match(self, token: str) -> Dict[UUID, float]:
+        """
+        Товары, где есть слово token (точно, по началу или с опечаткой), и их вес
+        """
+        weights: Dict[str, float] = {}
+        if token in self._postings:
+            weights[token] = EXACT_WEIGHT
+        if len(token) >= 2:
+            vocabulary = self._sorted_vocabulary()
+            i = bisect_left(vocabulary, token)
+            while i < len(vocabulary) and vocabulary[i].startswith(token):
+                weights.setdefault(vocabulary[i], PREFIX_WEIGHT)
+                i += 1
+        if not weights and len(token) >= 4:
+            grams = trigrams(token)
+            candidates: Set[str] = set()
+            for gram in grams:
+                candidates |= self._trigrams.get(gram, set())
+            for candidate in candidates:
+                candidate_grams = trigrams(candidate)
+                similarity = len(grams & candidate_grams) / len(grams | candidate_grams)
+                if similarity >= FUZZY_THRESHOLD:
+                    weights[candidate] = FUZZY_WEIGHT * similarity
+        result: Dict[UUID, float] = {}
+        for word, weight in weights.items():
+            for product_id, field_weight in self._postings[word].items():
+                result[product_id] = max(result.get(product_id, 0.0), weight * field_weight)
+        return result
+
+    def _sorted_vocabulary(self) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        return self._vocabulary
+
+    def _refresh(self, db: Session) -> None:
+        """
+        Дочитать из БД измененные товары либо построить индекс заново. Пока индекс строится,
+        флаг _stale не снимается: одновременный поиск не получит пустой результат, а строит сам
+        """
+        with self._lock:
+            max_age = settings.search_index_max_age
+            if max_age and time.monotonic() - self._built_at >= max_age:
+                self._stale = True
+            stale, generation = self._stale, self._generation
+            dirty: Set[UUID] = set()
+            if not stale:
+                dirty, self._dirty = self._dirty, set()
+        if not stale and not dirty:
+            return
+        try:
+            rows = self.repository.get_search_documents(db, None if stale else list(dirty))
+        except Exception:
+            # Изменения не применены — повторим при следующем поиске
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        with self._lock:
+            if stale:
+                self._postings, self._trigrams, self._documents = {}, {}, {}
+                # Пакетное изменение во время чтения — при следующем поиске строим еще раз
+                self._stale = generation != self._generation
+                self._built_at = time.monotonic()
+            for product_id in dirty:
+                self._remove(product_id)
+            for row in rows:
+                self._add(row.id, {name: getattr(row, name) for name, _ in FIELD_WEIGHTS}, row.order_number)
+            self._vocabulary = None
+        if stale:
+            logger.info(f"Поисковый индекс построен: {len(rows)} товаров, {len(self._postings)} слов")
+
+    def _add(self, product_id: UUID, fields: Dict[str, Optional[str]], order_number: Optional[int]) -> None:
+        tokens: Dict[str, float] = {}
+        for name, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[name]):
+                tokens[token] = max(tokens.get(token, 0.0), weight)
+        for token, weight in tokens.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            self._postings[token][product_id] = weight
+        self._documents[product_id] = (tokens, order_number)
+
+    def _remove(self, product_id: UUID) -> None:
+        document = self._documents.pop(product_id, None)
+        if document is None:
+            return
+        for token in document[0]:
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                for gram in trigrams(token):
+                    words = self._trigrams[gram]
+                    words.discard(token)
+                    if not words:
+                        del self._trigrams[gram]
+
+
+# Индекс процесса: у каждого воркера свой, изменения приходят через on_change("product")
+search_index = ProductSearchIndex()
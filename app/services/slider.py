@@ -2,6 +2,13 @@ from typing import List
 from sqlalchemy.orm import Session
 from ..repositories.slider import SliderPhotoRepository
 from ..schemas.slider import SliderPhotoCreate, SliderPhotoUpdate, SliderPhotoResponse, SliderListResponse
+from ..config import settings
+from ..core.cache import Cache
+from ..core.invalidation import on_change
+
+# Кэш списка фото слайдера (ключ — базовый URL: в ответе абсолютные ссылки), сбрасывается при изменении манифеста
+slider_cache = Cache("slider", ttl=settings.slider_cache_ttl, stale_ttl=settings.cache_stale_ttl)
+on_change("slider", lambda photo_id: slider_cache.invalidate())
 
 
 class SliderService:
@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..core.logging import get_logger
+from ..database import run_in_read_session
+from ..repositories.product import ProductRepository
+from .search_index import normalize
+
+logger = get_logger("SuggestIndex")
+
+# Сколько совпадений префикса просматривать на запрос (потом ранжирование и топ-N)
+SCAN_LIMIT = 500
+# Через сколько секунд повторить загрузку после ошибки (БД недоступна)
+RETRY_DELAY = 5.0
+
+# Запись индекса: (ключ, начало ли строки, артикул ли, порядок каталога, текст, тип, ID товара)
+Entry = Tuple[str, bool, bool, Tuple[bool, int], str, str, UUID]
+
+
+def _key(text: str) -> str:
+    return " ".join(normalize(text).split())
+
+
+class SuggestIndex:
+    """
+    Подсказки поиска в памяти процесса: отсортированный массив ключей (названия с начала каждого
+    слова и артикулы) и поиск префикса через bisect — без обращений к БД в запросе.
+
+    Записи товара обновляются сразу при изменениях через ProductService (upsert/remove).
+    Изменения из других воркеров приходят по NOTIFY только с ID (invalidate) и дочитываются
+    фоновой задачей; до ее завершения подсказки отдаются по текущим данным. Не реже раза
+    в search_index_max_age секунд индекс загружается заново — если уведомление было потеряно.
+    """
+
+    def __init__(self):
+        self.repository = ProductRepository()
+        self._products: Dict[UUID, Tuple[str, Optional[str], Optional[int]]] = {}
+        self._entries: List[Entry] = []
+        self._keys: List[str] = []
+        self._built = False
+        self._dirty: Set[UUID] = set()
+        self._stale = True
+        # Товары, измененные через upsert/remove во время загрузки: их данные новее прочитанных
+        self._changed: Set[UUID] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        До limit подсказок для префикса: сначала совпадения с начала названия, затем
+        с начала слова и артикулы; при равенстве — порядок каталога
+        """
+        prefix = _key(query)
+        if not prefix:
+            return []
+        with self._lock:
+            if not self._built:
+                self._rebuild()
+            keys, entries = self._keys, self._entries
+        i = bisect_left(keys, prefix)
+        end = min(len(keys), i + SCAN_LIMIT)
+        candidates = []
+        while i < end and keys[i].startswith(prefix):
+            candidates.append(entries[i])
+            i += 1
+        candidates.sort(key=lambda entry: entry[1:5])
+        result, seen = [], set()
+        for _, _, _, _, text, kind, product_id in candidates:
+            if (kind, text) in seen:
+                continue
+            seen.add((kind, text))
+            result.append({"text": text, "kind": kind, "product_id": product_id})
+            if len(result) == limit:
+                break
+        return result
+
+    def upsert(self, product: Any) -> None:
+        """
+        Товар создан или изменен (ProductResponse или строка с id, name, sku, order_number)
+        """
+        with self._lock:
+            self._products[product.id] = (product.name, product.sku, product.order_number)
+            self._dirty.discard(product.id)
+            self._changed.add(product.id)
+            self._built = False
+
+    def remove(self, product_id: UUID) -> None:
+        with self._lock:
+            self._products.pop(product_id, None)
+            self._dirty.discard(product_id)
+            self._changed.add(product_id)
+            self._built = False
+
+    def invalidate(self, product_id: Optional[UUID] = None) -> None:
+        """
+        Товар изменен (None — изменения пакетом, индекс загружается заново)
+        """
+        with self._lock:
+            if product_id is None:
+                self._stale = True
+            else:
+                self._dirty.add(product_id)
+
+    def load(self, db: Session) -> None:
+        """
+        Дочитать из БД измененные товары либо загрузить все
+        """
+        with self._lock:
+            stale, dirty = self._stale, self._dirty
+            self._stale, self._dirty = False, set()
+            self._changed = set()
+        if not stale and not dirty:
+            return
+        try:
+            rows = self.repository.get_search_documents(db, None if stale else list(dirty))
+        except Exception:
+            with self._lock:
+                self._stale = self._stale or stale
+                self._dirty |= dirty
+            raise
+        with self._lock:
+            if stale:
+                self._products = {pid: self._products[pid] for pid in self._changed if pid in self._products}
+            for product_id in dirty - self._changed:
+                self._products.pop(product_id, None)
+            for row in rows:
+                if row.id not in self._changed:
+                    self._products[row.id] = (row.name, row.sku, row.order_number)
+            self._built = False
+        if stale:
+            self._loaded_at = time.monotonic()
+            logger.info(f"Индекс подсказок загружен: {len(rows)} товаров")
+
+    def refresh_in_background(self) -> None:
+        """
+        Запустить загрузку изменений в фоне, если они есть (или индекс старше
+        search_index_max_age) и загрузка еще не идет
+        """
+        max_age = settings.search_index_max_age
+        if max_age and time.monotonic() - self._loaded_at >= max_age:
+            self._stale = True
+        if not self._stale and not self._dirty:
+            return
+        if (self._task is not None and not self._task.done()) or time.monotonic() < self._retry_at:
+            return
+        # Пустой контекст: запросы загрузки не попадают в статистику HTTP-запроса
+        self._task = asyncio.get_running_loop().create_task(self._load_async(), context=contextvars.Context())
+
+    async def _load_async(self) -> None:
+        try:
+            await run_in_read_session(self.load)
+        except Exception as e:
+            self._retry_at = time.monotonic() + RETRY_DELAY
+            logger.warning(f"Не удалось обновить индекс подсказок: {str(e)}")
+
+    def _rebuild(self) -> None:
+        entries: List[Entry] = []
+        for product_id, (name, sku, order_number) in self._products.items():
+            order = (order_number is None, order_number or 0)
+            words = _key(name).split(" ")
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), i > 0, False, order, name, "name", product_id))
+            if sku:
+                entries.append((_key(sku), False, True, order, sku, "sku", product_id))
+        entries.sort(key=lambda entry: entry[0])
+        self._entries = entries
+        self._keys = [entry[0] for entry in entries]
+        self._built = True
+
+
+# Индекс процесса: у каждого воркера свой
+suggest_index = SuggestIndex()
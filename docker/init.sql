@@ -1,6 +1,7 @@
 -- Инициализация базы данных SOUTH CLUB
 -- Создаем расширения
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Создаем таблицу товаров
 CREATE TABLE IF NOT EXISTS products (
@@ -10,12 +11,22 @@ CREATE TABLE IF NOT EXISTS products (
     color TEXT,
     composition TEXT,
     print_technology TEXT,
-    size JSON NOT NULL,
+    size_mask SMALLINT NOT NULL DEFAULT 0 CHECK (size_mask BETWEEN 0 AND 31),
     price INTEGER NOT NULL CHECK (price >= 0),
     order_number INTEGER,
     soon BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Поиск товаров (миграция 0004): полнотекстовый и нечеткий (pg_trgm)
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(sku, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(color, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(composition, '') || ' ' || coalesce(print_technology, '')), 'C')
+    ) STORED,
+    search_text TEXT GENERATED ALWAYS AS (
+        coalesce(name, '') || ' ' || coalesce(sku, '') || ' ' || coalesce(color, '') || ' ' ||
+        coalesce(composition, '') || ' ' || coalesce(print_technology, '')
+    ) STORED
 );
 
 -- Добавляем комментарий к колонке sku
@@ -45,6 +56,9 @@ CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
 CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
 CREATE INDEX IF NOT EXISTS idx_products_order_number ON products(order_number);
 CREATE INDEX IF NOT EXISTS idx_products_soon ON products(soon);
+CREATE INDEX IF NOT EXISTS ix_products_size_mask ON products(size_mask);
+CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_products_search_text_trgm ON products USING gin (search_text gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_product_photos_product_id ON product_photos(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_photos_priority ON product_photos(priority);
 CREATE INDEX IF NOT EXISTS idx_slider_photos_order ON slider_photos(order_number);
@@ -65,10 +79,11 @@ CREATE TRIGGER update_products_updated_at
     EXECUTE FUNCTION update_updated_at_column();
 
 -- Вставляем тестовые данные (опционально)
-INSERT INTO products (name, color, composition, print_technology, size, price, order_number, soon) VALUES
-('Футболка SOUTH CLUB', 'Белый', '100% хлопок', 'Термопечать', '[1, 2, 3]', 2500, 1, FALSE),
-('Худи SOUTH CLUB', 'Черный', '80% хлопок, 20% полиэстер', 'Вышивка', '[2, 3, 4]', 4500, 2, FALSE),
-('Кепка SOUTH CLUB', 'Красный', '100% хлопок', 'Вышивка', '[0, 1]', 1200, 3, FALSE)
+-- size_mask: бит n установлен, если есть размер n (14 = [1, 2, 3], 28 = [2, 3, 4], 3 = [0, 1])
+INSERT INTO products (name, color, composition, print_technology, size_mask, price, order_number, soon) VALUES
+('Футболка SOUTH CLUB', 'Белый', '100% хлопок', 'Термопечать', 14, 2500, 1, FALSE),
+('Худи SOUTH CLUB', 'Черный', '80% хлопок, 20% полиэстер', 'Вышивка', 28, 4500, 2, FALSE),
+('Кепка SOUTH CLUB', 'Красный', '100% хлопок', 'Вышивка', 3, 1200, 3, FALSE)
 ON CONFLICT DO NOTHING;
 
 -- Создаем пользователя для приложения (если нужно)
@@ -5,8 +5,10 @@
 
 import os
 import sys
+from alembic import command
+from alembic.config import Config
 from sqlalchemy import text
-from app.database import engine, create_tables
+from app.database import engine
 from app.config import settings
 
 def init_database():
@@ -16,9 +18,9 @@ def init_database():
     try:
         print("🔧 Инициализация базы данных...")
         
-        # Создаем таблицы
-        create_tables()
-        print("✅ Таблицы созданы успешно")
+        # Применяем миграции Alembic
+        command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
+        print("✅ Миграции применены успешно")
         
         # Проверяем подключение
         with engine.connect() as conn:
@@ -0,0 +1,93 @@
+"""Исходная схема: products, product_photos, slider_photos, orders
+
+Базы, созданные раньше через create_all или docker/init.sql, уже содержат эти таблицы —
+ревизия создает только недостающие таблицы и колонки (в том числе products.sku,
+которую раньше добавлял migrate_add_sku.py), поэтому безопасна для существующих БД.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-20
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # В offline-режиме (--sql) подключения нет — генерируем полную схему
+    inspector = None if op.get_context().as_sql else sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names()) if inspector else set()
+
+    if "products" not in tables:
+        op.create_table(
+            "products",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("name", sa.Text(), nullable=False, comment="Название товара"),
+            sa.Column("sku", sa.Text(), nullable=True, comment="Артикул товара"),
+            sa.Column("color", sa.Text(), nullable=True, comment="Цвет"),
+            sa.Column("composition", sa.Text(), nullable=True, comment="Состав"),
+            sa.Column("print_technology", sa.Text(), nullable=True, comment="Технология печати"),
+            sa.Column("size", postgresql.JSON(), nullable=False, comment="Размеры (массив чисел 0-4)"),
+            sa.Column("price", sa.Integer(), nullable=False, comment="Цена"),
+            sa.Column("order_number", sa.Integer(), nullable=True, comment="Порядковый номер отображения"),
+            sa.Column("soon", sa.Boolean(), nullable=False, server_default=sa.text("false"), comment="Скоро в продаже"),
+        )
+    else:
+        columns = {c["name"] for c in inspector.get_columns("products")}
+        if "sku" not in columns:
+            op.add_column("products", sa.Column("sku", sa.Text(), nullable=True, comment="Артикул товара"))
+        if "order_number" not in columns:
+            op.add_column("products", sa.Column("order_number", sa.Integer(), nullable=True, comment="Порядковый номер отображения"))
+        if "soon" not in columns:
+            op.add_column("products", sa.Column("soon", sa.Boolean(), nullable=False, server_default=sa.text("false"), comment="Скоро в продаже"))
+
+    if "product_photos" not in tables:
+        op.create_table(
+            "product_photos",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id"), nullable=False),
+            sa.Column("name", sa.Text(), nullable=False, comment="Имя фотографии"),
+            sa.Column("file_path", sa.Text(), nullable=False, comment="Абсолютный путь к файлу"),
+            sa.Column("priority", sa.Integer(), nullable=False, comment="Приоритет (0-2)"),
+        )
+
+    if "slider_photos" not in tables:
+        op.create_table(
+            "slider_photos",
+            sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column("name", sa.Text(), nullable=False, comment="Имя фотографии"),
+            sa.Column("file_path", sa.Text(), nullable=False, comment="Абсолютный путь к файлу"),
+            sa.Column("order_number", sa.Integer(), nullable=False, comment="Порядковый номер"),
+        )
+
+    if "orders" not in tables:
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.Integer(), primary_key=True, comment="ID заказа"),
+            sa.Column("customer_name", sa.String(255), nullable=False, comment="Имя клиента"),
+            sa.Column("email", sa.String(255), nullable=False, comment="Email клиента"),
+            sa.Column("phone", sa.String(20), nullable=False, comment="Телефон клиента"),
+            sa.Column("address", sa.Text(), nullable=False, comment="Адрес доставки"),
+            sa.Column("delivery_time", sa.DateTime(timezone=True), nullable=False, comment="Время доставки"),
+            sa.Column("order_time", sa.DateTime(timezone=True), nullable=False, comment="Время заказа"),
+            sa.Column("items", postgresql.JSON(), nullable=False, comment="Товары в заказе (JSON)"),
+            sa.Column("total_amount", sa.Float(), nullable=False, comment="Общая сумма заказа"),
+            sa.Column("status", sa.String(50), nullable=False, comment="Статус заказа"),
+            sa.Column("payment_id", sa.String(255), nullable=True, comment="ID платежа в ЮKassa"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), comment="Дата создания"),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), comment="Дата обновления"),
+        )
+        op.create_index("ix_orders_id", "orders", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("orders")
+    op.drop_table("slider_photos")
+    op.drop_table("product_photos")
+    op.drop_table("products")
@@ -0,0 +1,50 @@
+"""Индексы заказов под горячие запросы
+
+- payment_id (уникальный) — get_by_payment_id на каждый вебхук ЮKassa
+- (status, created_at), (email, created_at) — get_by_status / get_by_email с сортировкой по дате
+- created_at — get_recent_orders
+
+Индексы строятся CONCURRENTLY вне транзакции, чтобы не блокировать запись в orders.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-20
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_payment_id", "orders", ["payment_id"],
+            unique=True, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_orders_status_created_at", "orders", ["status", "created_at"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_orders_email_created_at", "orders", ["email", "created_at"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_orders_created_at", "orders", ["created_at"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in (
+            "ix_orders_created_at",
+            "ix_orders_email_created_at",
+            "ix_orders_status_created_at",
+            "ix_orders_payment_id",
+        ):
+            op.drop_index(name, table_name="orders", if_exists=True, postgresql_concurrently=True)
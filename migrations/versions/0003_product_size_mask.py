@@ -0,0 +1,60 @@
+"""Размеры товара: JSON-массив -> битовая маска size_mask с btree-индексом
+
+Колонку JSON нельзя проиндексировать, и фильтр по размеру был полным сканированием
+с разбором JSON. Размеров всего пять (0-4), поэтому они хранятся 5-битной маской,
+а фильтр "есть любой из размеров" сводится к size_mask IN (...) по индексу.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-21
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql:
+        columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("products")}
+        if "size_mask" in columns:
+            # БД создана docker/init.sql уже с новой колонкой
+            return
+
+    op.add_column(
+        "products",
+        sa.Column("size_mask", sa.SmallInteger(), nullable=True, comment="Размеры 0-4 (битовая маска)")
+    )
+    op.execute("""
+        UPDATE products SET size_mask = COALESCE((
+            SELECT bit_or(1 << s.value::int)
+            FROM (SELECT DISTINCT value FROM json_array_elements_text(products.size)) AS s
+        ), 0)
+    """)
+    op.alter_column("products", "size_mask", nullable=False)
+    op.create_check_constraint("ck_products_size_mask", "products", "size_mask BETWEEN 0 AND 31")
+    op.create_index("ix_products_size_mask", "products", ["size_mask"])
+    op.drop_column("products", "size")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column("size", postgresql.JSON(), nullable=True, comment="Размеры (массив чисел 0-4)")
+    )
+    op.execute("""
+        UPDATE products SET size = (
+            SELECT COALESCE(json_agg(s ORDER BY s), '[]'::json)
+            FROM generate_series(0, 4) AS s
+            WHERE products.size_mask & (1 << s) <> 0
+        )
+    """)
+    op.alter_column("products", "size", nullable=False)
+    op.drop_index("ix_products_size_mask", table_name="products")
+    op.drop_constraint("ck_products_size_mask", "products", type_="check")
+    op.drop_column("products", "size_mask")
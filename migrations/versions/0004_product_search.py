@@ -0,0 +1,58 @@
+"""Поиск товаров: полнотекстовый (tsvector + GIN) и нечеткий (pg_trgm)
+
+Поиск был name ILIKE '%q%' OR color ILIKE '%q%' — всегда полное сканирование.
+Теперь у products две генерируемые колонки (в модель не входят, их заполняет PostgreSQL):
+
+- search_vector — tsvector конфигурации russian: название и артикул (вес A), цвет (B),
+  состав и технология печати (C); GIN-индекс для @@ и ранжирования ts_rank_cd
+- search_text — те же поля одной строкой; GIN-индекс gin_trgm_ops для word_similarity (<%):
+  опечатки и части слов
+
+Индексы строятся CONCURRENTLY вне транзакции.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-28
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(sku, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(color, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(composition, '') || ' ' || coalesce(print_technology, '')), 'C')
+        ) STORED
+    """)
+    op.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_text text GENERATED ALWAYS AS (
+            coalesce(name, '') || ' ' || coalesce(sku, '') || ' ' || coalesce(color, '') || ' ' ||
+            coalesce(composition, '') || ' ' || coalesce(print_technology, '')
+        ) STORED
+    """)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_search_vector", "products", ["search_vector"],
+            postgresql_using="gin", if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_products_search_text_trgm", "products", ["search_text"],
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"},
+            if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in ("ix_products_search_text_trgm", "ix_products_search_vector"):
+            op.drop_index(name, table_name="products", if_exists=True, postgresql_concurrently=True)
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_text")
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
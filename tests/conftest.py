@@ -3,9 +3,23 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db, get_session_factory
 from app.config import settings
+from app.core.cache import MemoryBackend, configure_cache
+from app.repositories import base as base_repository
+from app.services.search_index import search_index
+from app.services.suggest_index import suggest_index
+
+
+@compiles(UUID, "sqlite")
+def compile_uuid_sqlite(type_, compiler, **kw):
+    """
+    PostgreSQL UUID в тестовой SQLite хранится как CHAR(32)
+    """
+    return "CHAR(32)"
 
 
 # Создаем тестовую базу данных в памяти
@@ -32,6 +46,23 @@ def override_get_db():
 
 # Переопределяем зависимость
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+# Тестовая БД — SQLite: подписка на NOTIFY не запускается
+settings.cache_invalidation_listen = False
+
+
+@pytest.fixture(autouse=True)
+def cache_backend():
+    """
+    Кэш и поисковые индексы общие для процесса: каждый тест начинает с пустого бэкенда в памяти
+    и индексами, которые строятся заново из своей БД
+    """
+    backend = MemoryBackend()
+    configure_cache(backend, serializer="json", prefix="test")
+    search_index.invalidate()
+    suggest_index.invalidate()
+    yield backend
 
 
 @pytest.fixture
@@ -55,6 +86,8 @@ def db_session():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        # Кэш количества записей общий для процесса: следующий тест начинает с пустых таблиц
+        base_repository._count_cache.clear()
 
 
 @pytest.fixture
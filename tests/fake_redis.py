@@ -0,0 +1,94 @@
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Разбор команд RESP и ответы из словаря сервера
+    """
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            args = []
+            for _ in range(count):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.fake.execute(args))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeRedisServer:
+    """
+    Сервер с протоколом Redis в памяти процесса для тестов: GET, SET (EX/PX), DEL, INCR, PING, SELECT, FLUSHDB
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "FakeRedisServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args) -> bytes:
+        command = args[0].decode().upper()
+        with self._lock:
+            self.commands.append(command)
+            if command == "PING":
+                return b"+PONG\r\n"
+            if command in ("SELECT", "AUTH"):
+                return b"+OK\r\n"
+            if command == "FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+            if command == "GET":
+                value = self._alive(args[1])
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if command == "SET":
+                expires_at = None
+                if len(args) >= 5:
+                    unit = args[3].decode().upper()
+                    amount = int(args[4])
+                    expires_at = time.monotonic() + (amount / 1000 if unit == "PX" else amount)
+                self.data[args[1]] = (args[2], expires_at)
+                return b"+OK\r\n"
+            if command == "DEL":
+                removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+                return b":%d\r\n" % removed
+            if command == "INCR":
+                value = int(self._alive(args[1]) or 0) + 1
+                self.data[args[1]] = (str(value).encode(), None)
+                return b":%d\r\n" % value
+            return b"-ERR unknown command '%s'\r\n" % command.encode()
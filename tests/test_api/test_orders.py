@@ -0,0 +1,39 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from app.database import get_session_factory
+from app.main import app
+
+
+class TestOrdersExportAPI:
+    """
+    Тесты потоковой выгрузки заказов
+    """
+
+    def test_export_uses_overridden_session_factory(self, client, db_session, admin_token):
+        """
+        Выгрузка читает тестовую БД через переопределяемую фабрику сессий
+        """
+        response = client.get(
+            "/api/v1/orders/export?format=csv",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text.startswith("\ufefforder_id,")
+
+    def test_export_database_error_is_500(self, db_session, admin_token, monkeypatch):
+        """
+        Ошибка подключения к БД возникает до начала ответа — 500, а не обрыв после заголовков 200
+        """
+        def broken_factory():
+            raise OperationalError("connect", {}, Exception("connection refused"))
+
+        monkeypatch.setitem(app.dependency_overrides, get_session_factory, lambda: broken_factory)
+        with TestClient(app, raise_server_exceptions=False) as client:
+            response = client.get(
+                "/api/v1/orders/export?format=ndjson",
+                headers={"Authorization": f"Bearer {admin_token}"}
+            )
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import pytest
+from uuid import uuid4
+from sqlalchemy.util import greenlet_spawn
+from app.core import cache as cache_module
+from app.core.cache import (
+    Cache, Codec, MemoryBackend, RedisBackend, TTLCache, cache_stats_snapshot, configure_cache, run_cache_call
+)
+from app.schemas.order import OrderStatusResponse
+from tests.fake_redis import FakeRedisServer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Управляемое время для проверки TTL
+    """
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedisServer().start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def test_ttl_expiry(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == (True, 1)
+    clock[0] += 61
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_negative_entries_use_short_ttl(clock):
+    cache = Cache("test-negative", ttl=60, negative_ttl=5)
+    cache.set("missing", None)
+    assert cache.get("missing") == (True, None)
+    clock[0] += 6
+    assert cache.get("missing") == (False, None)
+
+
+def test_invalidate_bumps_version():
+    cache = Cache("test-version", ttl=60)
+    version = cache.version()
+    cache.set("a", 1)
+    cache.invalidate()
+    assert cache.get("a") == (False, None)
+    # Значение, прочитанное до invalidate, уходит под старую версию
+    cache.set("a", 1, version)
+    assert cache.get("a") == (False, None)
+
+
+def test_disabled_cache():
+    cache = Cache("test-disabled", ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") == (False, None)
+    assert "test-disabled" in cache_stats_snapshot()["namespaces"]
+
+
+@pytest.mark.parametrize("serializer", ["orjson", "msgpack", "json"])
+def test_codec_roundtrip(serializer):
+    codec = Codec(serializer)
+    response = OrderStatusResponse(order_id=1, status="paid", total_amount=3000.0, payment_id=str(uuid4()))
+    assert OrderStatusResponse.model_validate(codec.loads(codec.dumps(response))) == response
+
+
+def test_redis_backend_shared_between_workers(fake_redis):
+    # Два «воркера» со своими клиентами видят одни и те же записи и версии
+    first = RedisBackend(fake_redis.url)
+    second = RedisBackend(fake_redis.url)
+    cache = Cache("test-shared", ttl=60)
+    configure_cache(first, serializer="json", prefix="test")
+    cache.set(("product", 1), {"name": "Футболка"})
+    configure_cache(second, serializer="json", prefix="test")
+    assert cache.get(("product", 1)) == (True, {"name": "Футболка"})
+    cache.invalidate()
+    configure_cache(first, serializer="json", prefix="test")
+    assert cache.get(("product", 1)) == (False, None)
+    assert b"test:test-shared:version" in fake_redis.data
+
+
+def test_redis_backend_unavailable_is_a_miss(fake_redis):
+    url = fake_redis.url
+    fake_redis.stop()
+    backend = RedisBackend(url, timeout=0.2, cooldown=60)
+    configure_cache(backend, serializer="json", prefix="test")
+    cache = Cache("test-down", ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == (False, None)
+    # После первой ошибки сервер не опрашивается до конца cooldown
+    assert backend.errors == 1
+    assert cache_stats_snapshot()["backend"]["available"] is False
+
+
+@pytest.mark.asyncio
+async def test_slow_cache_server_does_not_block_event_loop(fake_redis, monkeypatch):
+    """
+    Ответ сервера кэша ждет поток: из корутины (run_cache_call) и из кода в AsyncSession.run_sync
+    """
+    configure_cache(RedisBackend(fake_redis.url), serializer="json", prefix="test")
+    cache = Cache("test-slow", ttl=60)
+    cache.set("a", 1)
+    execute = fake_redis.execute
+    monkeypatch.setattr(fake_redis, "execute", lambda args: time.sleep(0.2) or execute(args))
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    for call in (run_cache_call(cache.get, "a"), greenlet_spawn(cache.get, "a")):
+        ticks.clear()
+        result, _ = await asyncio.gather(call, ticker())
+        assert result == (True, 1)
+        assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.15
+
+
+def test_memory_backend_keeps_objects():
+    configure_cache(MemoryBackend(), serializer="json", prefix="test")
+    cache = Cache("test-objects", ttl=60)
+    value = OrderStatusResponse(order_id=1, status="paid", total_amount=1.0)
+    cache.set("a", value)
+    assert cache.get("a")[1] is value
@@ -0,0 +1,100 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core import compression
+from app.core.cache import Cache
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.http_cache import cached_get, encoded_response
+from tests.test_core.test_http_cache import make_request
+
+PAYLOAD = {"products": [{"name": "Футболка SOUTH CLUB", "file_path": "/uploads/products/abc.jpg"}] * 50}
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return PAYLOAD
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/image")
+    async def image():
+        return Response(content=b"\xff" * 2000, media_type="image/jpeg")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse((b"line\n" * 200 for _ in range(3)), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("br;q=0, *;q=0.1") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding(None) is None
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip") == "gzip"
+
+
+def test_middleware_compresses_large_json_only():
+    client = make_client()
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == PAYLOAD
+    assert int(response.headers["content-length"]) < len(json.dumps(PAYLOAD, ensure_ascii=False).encode()) / 5
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_middleware_compresses_streaming_body():
+    response = make_client().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "line\n" * 600
+
+
+@pytest.mark.asyncio
+async def test_cached_body_compressed_once(monkeypatch):
+    calls = []
+    real_compress = compression.compress
+
+    def counting_compress(body, encoding):
+        calls.append(encoding)
+        return real_compress(body, encoding)
+
+    monkeypatch.setattr("app.core.http_cache.compress", counting_compress)
+    cache = Cache("test-compressed-bodies", ttl=60)
+    request = make_request(query="limit=50")
+    request.scope["headers"].append((b"accept-encoding", b"gzip"))
+    response = Response()
+    assert await cached_get(request, response, cache) is None
+    first = encoded_response(request, response, PAYLOAD)
+    assert first.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(first.body)) == PAYLOAD
+
+    for _ in range(3):
+        again = make_request(query="limit=50")
+        again.scope["headers"].append((b"accept-encoding", b"gzip"))
+        assert (await cached_get(again, Response(), cache)).body == first.body
+    assert calls == ["gzip"]
+
+    # Клиенту без сжатия — исходное тело из той же записи
+    plain = await cached_get(make_request(query="limit=50"), Response(), cache)
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.body) == PAYLOAD
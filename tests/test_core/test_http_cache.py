@@ -0,0 +1,122 @@
+import json
+import pytest
+from fastapi import Request, Response
+from app.config import settings
+from app.core.cache import Cache, MemoryBackend, RedisBackend, configure_cache
+from app.core.http_cache import cache_control, cached_get, conditional_get, encoded_response, etag_matches, make_etag
+from app.schemas.order import OrderStatusResponse
+
+
+def make_request(path: str = "/api/v1/products/", query: str = "", if_none_match: str = None) -> Request:
+    headers = [(b"host", b"testserver")]
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "path": path,
+        "query_string": query.encode(),
+        "headers": headers,
+    })
+
+
+def test_etag_matches():
+    etag = make_etag(b'{"products": []}')
+    assert etag.startswith('W/"')
+    assert etag == make_etag(b'{"products": []}')
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_cache_control(monkeypatch):
+    monkeypatch.setattr(settings, "http_cache_max_age", 30)
+    monkeypatch.setattr(settings, "http_cache_stale_while_revalidate", 300)
+    assert cache_control() == "public, max-age=30, stale-while-revalidate=300"
+    monkeypatch.setattr(settings, "http_cache_stale_while_revalidate", 0)
+    assert cache_control() == "public, max-age=30"
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_304_until_invalidated():
+    cache = Cache("test-etag", ttl=60)
+    paid = OrderStatusResponse(order_id=1, status="paid", total_amount=10.0)
+    first = make_request(query="skip=0")
+    assert await conditional_get(first, cache) is None
+    etag = encoded_response(first, Response(), paid).headers["etag"]
+
+    request = make_request(query="skip=0", if_none_match=etag)
+    not_modified = await conditional_get(request, cache)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert "max-age" in not_modified.headers["cache-control"]
+
+    # Другие параметры запроса — тело еще не построено, 304 без него не выдается
+    assert await conditional_get(make_request(query="skip=100", if_none_match=etag), cache) is None
+
+    cache.invalidate()
+    assert await conditional_get(make_request(query="skip=0", if_none_match=etag), cache) is None
+
+
+@pytest.mark.asyncio
+async def test_etag_same_across_workers():
+    # ETag — хэш тела: воркер со своей версией пространства имен выдает тот же ETag и 304
+    cache = Cache("test-etag-workers", ttl=60)
+    paid = OrderStatusResponse(order_id=1, status="paid", total_amount=10.0)
+    request = make_request(query="skip=0")
+    assert await cached_get(request, Response(), cache) is None
+    etag = encoded_response(request, Response(), paid).headers["etag"]
+
+    configure_cache(MemoryBackend(), serializer="json", prefix="test")
+    cache.invalidate()
+    other = make_request(query="skip=0", if_none_match=etag)
+    assert await cached_get(other, Response(), cache) is None
+    assert encoded_response(other, Response(), paid).status_code == 304
+
+    changed = encoded_response(other, Response(), OrderStatusResponse(order_id=1, status="shipped", total_amount=10.0))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_without_cache_server():
+    # Версия неизвестна — тело не кэшируется, 304 до построения ответа невозможен
+    configure_cache(RedisBackend("redis://127.0.0.1:1/0", timeout=0.2, cooldown=60), serializer="json", prefix="test")
+    cache = Cache("test-etag-down", ttl=60)
+    assert await conditional_get(make_request(if_none_match="*"), cache) is None
+    assert await cached_get(make_request(), Response(), cache) is None
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "http_etag_enabled", False)
+    cache = Cache("test-etag-off", ttl=60)
+    request = make_request(if_none_match="*")
+    assert await cached_get(request, Response(), cache) is None
+    response = encoded_response(request, Response(), OrderStatusResponse(order_id=1, status="paid", total_amount=10.0))
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert (await cached_get(make_request(if_none_match="*"), Response(), cache)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_encoded_body_reused_until_invalidated():
+    cache = Cache("test-bodies", ttl=60)
+    request = make_request(query="limit=10")
+    response = Response()
+    assert await cached_get(request, response, cache) is None
+    first = encoded_response(request, response, OrderStatusResponse(order_id=1, status="paid", total_amount=10.0))
+    assert first.media_type == "application/json" and first.headers["etag"]
+    assert json.loads(first.body)["status"] == "paid"
+
+    hit = await cached_get(make_request(query="limit=10"), Response(), cache)
+    assert hit.body == first.body
+    assert hit.headers["etag"] == first.headers["etag"]
+
+    cache.invalidate()
+    assert await cached_get(make_request(query="limit=10"), Response(), cache) is None
@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.core import invalidation
+from app.core.cache import Cache, RedisBackend, configure_cache
+from app.core.invalidation import (
+    ChangeListener, apply_change, apply_remote_change, listener_dsn, on_change, publish_change
+)
+from app.database import unit_of_work
+from tests.conftest import TestingSessionLocal
+from tests.fake_redis import FakeRedisServer
+
+
+@pytest.fixture
+def received(monkeypatch):
+    """
+    Обработчик тестовой сущности, записывающий полученные id
+    """
+    monkeypatch.setattr(invalidation, "_handlers", {})
+    ids = []
+    on_change("thing", ids.append)
+    return ids
+
+
+def test_applied_after_commit(received):
+    db = TestingSessionLocal()
+    try:
+        publish_change(db, "thing", 1)
+        assert received == ["1"]
+        with unit_of_work(db):
+            publish_change(db, "thing", 2)
+            # Внутри единицы работы кэш сбрасывается только после commit
+            assert received == ["1"]
+        assert received == ["1", "2"]
+    finally:
+        db.close()
+
+
+def test_dropped_on_rollback(received):
+    db = TestingSessionLocal()
+    try:
+        with pytest.raises(RuntimeError):
+            with unit_of_work(db):
+                publish_change(db, "thing", 3)
+                raise RuntimeError("ошибка записи")
+        assert received == []
+    finally:
+        db.close()
+
+
+def test_unknown_entity_ignored(received):
+    apply_change("unknown:1")
+    apply_change("thing")
+    assert received == ["*"]
+
+
+def test_listener_dsn_drops_driver():
+    assert listener_dsn("postgresql+psycopg2://u:p@db:5432/shop") == "postgresql://u:p@db:5432/shop"
+
+
+class FakeConnection:
+    """
+    Соединение asyncpg: уведомления и разрыв вызываются тестом
+    """
+
+    def __init__(self):
+        self.listeners = {}
+        self.termination = []
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.termination.append(callback)
+
+    def notify(self, payload, pid=1):
+        self.listeners[invalidation.CHANNEL](self, pid, invalidation.CHANNEL, payload)
+
+    def terminate(self):
+        self.closed = True
+        for callback in self.termination:
+            callback(self)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    async def execute(self, query):
+        return None
+
+
+def test_listener_applies_notifications_and_resyncs(received):
+    async def scenario():
+        connections = []
+
+        async def connect(dsn):
+            connections.append(FakeConnection())
+            return connections[-1]
+
+        listener = ChangeListener("postgresql://test", reconnect_delay=0, connect=connect)
+        listener.start()
+        await asyncio.sleep(0.01)
+        connections[0].notify("thing:42")
+        assert received == ["42"]
+        # После разрыва — переподключение и полный сброс: уведомления могли потеряться
+        connections[0].terminate()
+        await asyncio.sleep(0.01)
+        assert len(connections) == 2
+        assert received == ["42", "*"]
+        await listener.stop()
+
+    asyncio.run(scenario())
+
+
+def test_listener_skips_own_notifications(received, monkeypatch):
+    monkeypatch.setattr(invalidation, "_own_pids", {7})
+
+    async def scenario():
+        connection = FakeConnection()
+
+        async def connect(dsn):
+            return connection
+
+        listener = ChangeListener("postgresql://test", connect=connect)
+        listener.start()
+        await asyncio.sleep(0.01)
+        # Свое уведомление уже применено после commit, чужое — применяется
+        connection.notify("thing:1", pid=7)
+        connection.notify("thing:2", pid=8)
+        assert received == ["2"]
+        assert (listener.received, listener.skipped_own) == (1, 1)
+        await listener.stop()
+
+    asyncio.run(scenario())
+
+
+def test_own_pid_forgotten_when_connection_closes(monkeypatch):
+    monkeypatch.setattr(invalidation, "_own_pids", {7})
+    invalidation._forget_backend_pid(None, SimpleNamespace(info={invalidation._BACKEND_PID: 7}))
+    assert invalidation._own_pids == set()
+
+
+def test_remote_change_keeps_shared_versions(monkeypatch, cache_backend):
+    monkeypatch.setattr(invalidation, "_handlers", {})
+    cache = Cache("test-remote", ttl=60)
+    on_change("thing", lambda thing_id: cache.invalidate())
+
+    # Кэш в памяти у каждого воркера свой — сбрасывается
+    apply_remote_change("thing:1")
+    assert cache.version() == 1
+
+    # Общий кэш уже сброшен отправителем: версия не увеличивается еще раз
+    server = FakeRedisServer().start()
+    try:
+        configure_cache(RedisBackend(server.url), serializer="json", prefix="test")
+        apply_remote_change("thing:1")
+        apply_remote_change()
+        assert cache.version() == 0
+        apply_change("thing:1")
+        assert cache.version() == 1
+        assert server.commands.count("INCR") == 1
+    finally:
+        server.stop()
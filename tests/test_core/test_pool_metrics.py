@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine, text
+from app.core.pool_metrics import TimedQueuePool, install_pool_metrics, pool_metrics_snapshot
+
+
+def _engine(tmp_path):
+    return create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+    )
+
+
+def test_checkout_metrics(tmp_path):
+    engine = _engine(tmp_path)
+    metrics = install_pool_metrics(engine, "test_checkout")
+
+    first = engine.connect()
+    second = engine.connect()
+    third = engine.connect()
+    state = metrics.snapshot()
+    assert state["checked_out"] == 3
+    assert state["overflow"] == 1
+    assert state["checkouts"] == 3
+    assert state["connects"] == 3
+    assert sum(state["checkout_wait_buckets"].values()) == 3
+
+    for connection in (first, second, third):
+        connection.close()
+    assert metrics.snapshot()["checked_out"] == 0
+    assert "test_checkout" in pool_metrics_snapshot()
+
+
+def test_invalidation_counted(tmp_path):
+    engine = _engine(tmp_path)
+    metrics = install_pool_metrics(engine, "test_invalidate")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.invalidate()
+
+    assert metrics.snapshot()["invalidations"] == 1
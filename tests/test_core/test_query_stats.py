@@ -0,0 +1,65 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core.query_stats import (
+    QueryStatsMiddleware,
+    install_query_listeners,
+    statement_shape,
+    track_queries,
+)
+from tests.conftest import TestingSessionLocal, engine
+
+install_query_listeners(engine)
+
+
+class TestQueryStats:
+    """
+    Тесты учета SQL-запросов
+    """
+
+    def test_statement_shape_ignores_literals(self):
+        """
+        Запросы, отличающиеся только литералами, имеют одну форму
+        """
+        first = statement_shape("SELECT * FROM products WHERE price > 100 AND name = 'Худи'")
+        second = statement_shape("SELECT *  FROM products\nWHERE price > 2500 AND name = 'Кепка'")
+        assert first == second
+        assert statement_shape("SELECT 1 WHERE id IN (?, ?, ?)") == statement_shape("SELECT 1 WHERE id IN (?)")
+
+    def test_track_queries_counts_statements(self):
+        """
+        track_queries считает запросы и находит повторяющиеся
+        """
+        db = TestingSessionLocal()
+        try:
+            with track_queries() as stats:
+                for i in range(5):
+                    db.execute(text(f"SELECT {i}"))
+            assert stats.count == 5
+            assert stats.total_time >= 0
+            assert stats.repeated(3) == [("SELECT ?", 5)]
+        finally:
+            db.close()
+
+    def test_middleware_reports_headers(self):
+        """
+        Middleware отдает X-DB-Queries и Server-Timing
+        """
+        app = FastAPI()
+        app.add_middleware(QueryStatsMiddleware, repeat_threshold=1)
+
+        @app.get("/items")
+        def items():
+            db = TestingSessionLocal()
+            try:
+                db.execute(text("SELECT 1"))
+                db.execute(text("SELECT 2"))
+            finally:
+                db.close()
+            return {"ok": True}
+
+        response = TestClient(app).get("/items")
+
+        assert response.status_code == 200
+        assert response.headers["x-db-queries"] == "2"
+        assert response.headers["server-timing"].startswith("db;dur=")
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.replicas import ReplicaRouter
+from app.database import connect_for_read
+
+
+def _sqlite_engine(path, name=None):
+    """
+    Файл SQLite как отдельная «база»; name записывается в таблицу marker
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    if name is not None:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE marker (name TEXT)"))
+            conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+    return engine
+
+
+def _read_marker(router) -> str:
+    connection = connect_for_read(router)
+    try:
+        return connection.execute(text("SELECT name FROM marker")).scalar()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def primary(tmp_path):
+    return _sqlite_engine(tmp_path / "primary.db", "primary")
+
+
+def test_round_robin(tmp_path, primary):
+    replicas = [_sqlite_engine(tmp_path / f"replica{i}.db", f"replica{i}") for i in range(2)]
+    router = ReplicaRouter(primary, replicas)
+
+    assert [_read_marker(router) for _ in range(4)] == ["replica0", "replica1", "replica0", "replica1"]
+
+
+def test_without_replicas_reads_primary(primary):
+    router = ReplicaRouter(primary, [])
+
+    assert _read_marker(router) == "primary"
+
+
+def test_failed_replica_falls_back_and_is_skipped(tmp_path, primary):
+    broken = _sqlite_engine(tmp_path / "missing" / "replica.db")
+    healthy = _sqlite_engine(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [broken, healthy], cooldown=60)
+
+    assert _read_marker(router) == "replica"
+    # Упавшая реплика исключена из ротации — дальше читаем только со здоровой
+    assert list(router.candidates()) == [healthy, primary]
+
+
+def test_all_replicas_down_falls_back_to_primary(tmp_path, primary):
+    router = ReplicaRouter(primary, [_sqlite_engine(tmp_path / "missing" / "replica.db")])
+
+    assert _read_marker(router) == "primary"
+
+
+def test_reads_primary_after_change(tmp_path, primary, monkeypatch):
+    """
+    После изменения каталога чтение идет из primary, пока реплика может отставать
+    """
+    from app import database
+    from app.core import replicas
+    from app.core.invalidation import apply_change
+    router = ReplicaRouter(primary, [_sqlite_engine(tmp_path / "replica.db", "replica")])
+    monkeypatch.setattr(database, "read_router", router)
+    monkeypatch.setattr(database.settings, "database_replica_read_after_write", 5)
+
+    assert _read_marker(router) == "replica"
+    apply_change("product:*")
+    assert _read_marker(router) == "primary"
+    now = replicas.time.monotonic()
+    monkeypatch.setattr(replicas.time, "monotonic", lambda: now + 6)
+    assert _read_marker(router) == "replica"
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core import cache as cache_module
+from app.core.cache import Cache
+from app.core.single_flight import SingleFlight, cached_load, cached_load_async
+
+
+async def _slow(value, calls, delay=0.01):
+    calls.append(value)
+    await asyncio.sleep(delay)
+    return value
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+    results = await asyncio.gather(*(flight.run("key", lambda: _slow("value", calls)) for _ in range(5)))
+    assert calls == ["value"]
+    assert [value for value, _ in results] == ["value"] * 5
+    assert sum(coalesced for _, coalesced in results) == 4
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared_with_waiters():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("БД недоступна")
+
+    results = await asyncio.gather(*(flight.run("key", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    # После ошибки ключ свободен: следующий вызов вычисляет заново
+    assert await flight.run("key", lambda: _slow("value", [])) == ("value", False)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_is_replaced():
+    flight = SingleFlight()
+    calls = []
+    leader = asyncio.create_task(flight.run("key", lambda: _slow("first", calls, delay=1)))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.run("key", lambda: _slow("second", calls)))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == ("second", False)
+    assert calls == ["first", "second"]
+
+
+def test_threads_share_one_computation():
+    """
+    Синхронный код в пуле потоков (sync-режим): ожидающие потоки получают результат лидера
+    """
+    flight = SingleFlight()
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", load))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert sorted(results, key=lambda result: result[1]) == [("value", False)] + [("value", True)] * 4
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing(monkeypatch):
+    cache = Cache("test-stale", ttl=60, stale_ttl=300)
+    cache.set("key", "old")
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 120)
+    calls = []
+
+    assert await cached_load_async(cache, "key", lambda: _slow("new", calls)) == "old"
+    # Второй запрос до окончания обновления тоже получает старое значение, обновление одно
+    assert await cached_load_async(cache, "key", lambda: _slow("new", calls)) == "old"
+    await asyncio.sleep(0.05)
+    assert calls == ["new"]
+    assert cache.lookup("key") == (True, "new", False)
+    assert cache.stats()["stale_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_stale_values():
+    cache = Cache("test-stale-invalidate", ttl=60, stale_ttl=300)
+    cache.set("key", "old")
+    cache.invalidate()
+    assert await cached_load_async(cache, "key", lambda: _slow("new", [])) == "new"
+
+
+def test_stale_without_event_loop_loads_inline(monkeypatch):
+    cache = Cache("test-stale-sync", ttl=60, stale_ttl=300)
+    cache.set("key", "old")
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 120)
+    assert cache.get("key") == (False, None)
+    assert cached_load(cache, "key", lambda: "new", refresh=lambda: _slow("new", [])) == "new"
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.core.logging import logger
+from app.core.slow_queries import SlowQueryLog, install_slow_query_log, statement_fingerprint
+
+
+class SearchRepository:
+    """
+    Имитация репозитория: источник запроса определяется по стеку вызовов
+    """
+
+    def search_products(self, engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :q AS q"), {"q": "%футболка%"})
+
+
+@pytest.fixture
+def messages():
+    records = []
+    handler_id = logger.add(lambda message: records.append(str(message)), level="WARNING")
+    try:
+        yield records
+    finally:
+        logger.remove(handler_id)
+
+
+def test_fingerprint_ignores_literals():
+    assert statement_fingerprint("SELECT * FROM products WHERE price > 10") == \
+        statement_fingerprint("SELECT * FROM products WHERE price > 2000")
+    assert statement_fingerprint("SELECT 1") != statement_fingerprint("SELECT * FROM orders")
+
+
+def test_slow_query_logged_with_params(messages):
+    engine = create_engine("sqlite://")
+    install_slow_query_log(engine, threshold=0.0)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT :q AS q"), {"q": "%футболка%"})
+
+    slow = [m for m in messages if "Медленный запрос" in m]
+    assert len(slow) == 1
+    assert "%футболка%" in slow[0]
+
+
+def test_fast_query_not_logged(messages):
+    engine = create_engine("sqlite://")
+    install_slow_query_log(engine, threshold=60.0)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert not [m for m in messages if "Медленный запрос" in m]
+
+
+def test_origin_is_repository_method(messages, monkeypatch):
+    engine = create_engine("sqlite://")
+    install_slow_query_log(engine, threshold=0.0)
+    # Источник ищется по имени модуля кадра — выдаем тестовый модуль за слой репозиториев
+    monkeypatch.setitem(globals(), "__name__", "app.repositories.fake")
+
+    SearchRepository().search_products(engine)
+
+    assert any("из SearchRepository.search_products" in m for m in messages)
+
+
+def test_explain_deduplicated_and_rate_limited():
+    slow_log = SlowQueryLog(create_engine("sqlite://"), threshold=0.0, explain_interval=3600, explain_per_minute=2)
+
+    assert slow_log._should_explain("a")
+    assert not slow_log._should_explain("a")
+    assert slow_log._should_explain("b")
+    assert not slow_log._should_explain("c")
+
+
+def test_explain_only_for_sync_postgres():
+    assert not SlowQueryLog(create_engine("sqlite://"), threshold=0.0, explain=True).explain
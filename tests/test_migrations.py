@@ -0,0 +1,27 @@
+"""
+Тесты цепочки миграций Alembic
+"""
+import os
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from app.models.order import Order
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _script() -> ScriptDirectory:
+    return ScriptDirectory.from_config(Config(os.path.join(ROOT, "alembic.ini")))
+
+
+def test_single_head():
+    """У цепочки миграций ровно одна голова"""
+    assert len(_script().get_heads()) == 1
+
+
+def test_order_indexes_declared_on_model():
+    """Индексы заказов из миграции 0002 объявлены и в модели (autogenerate не предложит их удалить)"""
+    indexes = {index.name: index for index in Order.__table__.indexes}
+    assert indexes["ix_orders_payment_id"].unique
+    assert [c.name for c in indexes["ix_orders_status_created_at"].columns] == ["status", "created_at"]
+    assert [c.name for c in indexes["ix_orders_email_created_at"].columns] == ["email", "created_at"]
+    assert "ix_orders_created_at" in indexes
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, run_in_session
+from app.models.product import Product
+from app.repositories.product import ProductRepository, AsyncProductRepository
+
+
+def _product(name: str, price: int = 1000) -> Product:
+    return Product(name=name, color="Черный", size=[1, 2], price=price)
+
+
+class TestAsyncRepository:
+    """
+    Тесты асинхронного варианта репозиториев
+    """
+
+    @pytest.mark.asyncio
+    async def test_async_repository_with_sync_session(self, db_session):
+        """
+        Async-репозиторий работает и с обычной Session (sync-режим)
+        """
+        repo = AsyncProductRepository()
+        created = await repo.create(db_session, _product("Худи"))
+
+        found = await repo.get(db_session, created.id)
+        assert found is not None
+        assert found.name == "Худи"
+        assert await repo.count(db_session) == 1
+
+    @pytest.mark.asyncio
+    async def test_run_in_session_with_sync_session(self, db_session):
+        """
+        run_in_session выполняет функцию в пуле потоков для обычной Session
+        """
+        ProductRepository().create(db_session, _product("Футболка", 2500))
+
+        products = await run_in_session(db_session, ProductRepository().get_by_price_range, 2000, 3000)
+        assert [p.name for p in products] == ["Футболка"]
+
+    @pytest.mark.asyncio
+    async def test_async_repository_with_async_session(self, tmp_path):
+        """
+        Async-репозиторий выполняет запросы через AsyncSession
+        """
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+        repo = AsyncProductRepository()
+        try:
+            async with session_factory() as db:
+                created = await repo.create(db, _product("Кепка", 1200))
+                products = await repo.get_all(db)
+                assert [p.id for p in products] == [created.id]
+                assert await repo.delete(db, created.id) is True
+                assert await repo.count(db) == 0
+        finally:
+            await async_engine.dispose()
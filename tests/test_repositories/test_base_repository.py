@@ -0,0 +1,50 @@
+from app.models.product import Product
+from app.repositories.product import ProductRepository
+
+
+def _product(name: str, price: int = 1000) -> Product:
+    return Product(name=name, color="Белый", size=[2], price=price)
+
+
+class TestBaseRepositoryCount:
+    """
+    Тесты подсчета количества записей
+    """
+
+    def test_count_exact(self, db_session):
+        """
+        count() считает записи через count(*)
+        """
+        repo = ProductRepository()
+        for i in range(3):
+            repo.create(db_session, _product(f"Товар {i}"))
+
+        assert repo.count(db_session) == 3
+
+    def test_count_cached_invalidated_on_write(self, db_session):
+        """
+        Кэшированный count сбрасывается при создании и удалении через репозиторий
+        """
+        repo = ProductRepository()
+        first = repo.create(db_session, _product("Первый"))
+        assert repo.count(db_session, cached=True) == 1
+
+        repo.create(db_session, _product("Второй"))
+        assert repo.count(db_session, cached=True) == 2
+
+        repo.delete(db_session, first.id)
+        assert repo.count(db_session, cached=True) == 1
+
+    def test_count_cached_serves_value_within_ttl(self, db_session):
+        """
+        В пределах TTL кэшированный count не обращается к БД
+        """
+        repo = ProductRepository()
+        repo.create(db_session, _product("Товар"))
+        assert repo.count(db_session, cached=True) == 1
+
+        # Запись в обход репозитория не сбрасывает кэш
+        db_session.add(_product("Вне репозитория"))
+        db_session.commit()
+        assert repo.count(db_session, cached=True) == 1
+        assert repo.count(db_session) == 2
@@ -0,0 +1,103 @@
+import pytest
+from uuid import uuid4
+from sqlalchemy import event
+from app.core.exceptions import ProductNotFoundException
+from app.models.photo import ProductPhoto
+from app.models.product import Product
+from app.schemas.product import ProductBatchUpdateItem, ProductCreate
+from app.services import product as product_service
+from app.services.product import ProductService
+from tests.conftest import engine
+
+
+@pytest.fixture
+def statements():
+    """
+    Выполненные SQL-запросы (executemany считается одним запросом)
+    """
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _items(n: int):
+    return [ProductCreate(name=f"Товар {i}", size=[1, 2], price=1000 + i) for i in range(n)]
+
+
+class TestBulkCreate:
+
+    def test_single_insert_for_batch(self, db_session, statements):
+        products = ProductService().bulk_create_products(db_session, _items(50))
+
+        assert len(products) == 50
+        assert [p.name for p in products] == [f"Товар {i}" for i in range(50)]
+        assert [p.order_number for p in products] == list(range(1, 51))
+        assert all(p.size == [1, 2] and p.photos == [] for p in products)
+        inserts = [q for q in statements if q.startswith("INSERT")]
+        assert len(inserts) == 1
+        # max(order_number) и INSERT ... RETURNING — без запросов на каждый товар
+        assert len(statements) == 2
+
+    def test_order_numbers_continue_after_existing(self, db_session):
+        db_session.add(Product(name="Старый", size=[1], price=100, order_number=7))
+        db_session.commit()
+
+        products = ProductService().bulk_create_products(db_session, _items(2) + [
+            ProductCreate(name="С номером", size=[1], price=100, order_number=100)
+        ])
+
+        assert [p.order_number for p in products] == [8, 9, 100]
+
+
+class TestBulkUpdate:
+
+    def test_partial_update(self, db_session, statements):
+        created = ProductService().bulk_create_products(db_session, _items(3))
+        statements.clear()
+
+        updated = ProductService().bulk_update_products(db_session, [
+            ProductBatchUpdateItem(id=created[0].id, price=5000),
+            ProductBatchUpdateItem(id=created[1].id, size=[4]),
+        ])
+
+        assert [(p.price, p.size) for p in updated] == [(5000, [1, 2]), (1001, [4])]
+        assert len([q for q in statements if q.startswith("UPDATE")]) == 2  # по executemany на набор полей
+        assert len(statements) <= 5
+
+    def test_missing_product_rejects_whole_batch(self, db_session):
+        created = ProductService().bulk_create_products(db_session, _items(1))
+
+        with pytest.raises(ProductNotFoundException):
+            ProductService().bulk_update_products(db_session, [
+                ProductBatchUpdateItem(id=created[0].id, price=1),
+                ProductBatchUpdateItem(id=uuid4(), price=1),
+            ])
+
+        assert db_session.get(Product, created[0].id).price == 1000
+
+
+class TestBulkDelete:
+
+    def test_deletes_products_and_photos(self, db_session, statements, tmp_path, monkeypatch):
+        monkeypatch.setattr(product_service.file_service, "upload_dir", str(tmp_path))
+        photo_file = tmp_path / "a.jpg"
+        photo_file.write_bytes(b"jpeg")
+        created = ProductService().bulk_create_products(db_session, _items(3))
+        db_session.add(ProductPhoto(product_id=created[0].id, name="a.jpg", file_path=str(photo_file), priority=0))
+        db_session.commit()
+        statements.clear()
+
+        deleted = ProductService().bulk_delete_products(db_session, [created[0].id, created[1].id])
+
+        assert deleted == 2
+        assert [p.name for p in db_session.query(Product).all()] == ["Товар 2"]
+        assert db_session.query(ProductPhoto).count() == 0
+        assert len([q for q in statements if q.startswith("DELETE")]) == 2
+        assert not photo_file.exists()
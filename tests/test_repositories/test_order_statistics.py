@@ -0,0 +1,59 @@
+import pytest
+from datetime import datetime, timezone
+from app.core.query_stats import install_query_listeners, track_queries
+from app.models.order import Order
+from app.services.order import OrderService
+from tests.conftest import engine
+
+install_query_listeners(engine)
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite с заказами в разных статусах
+    """
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for status, amount in [("paid", 1500.0), ("paid", 2500.0), ("created", 1000.0), ("canceled", 700.0), ("refunded", 300.0)]:
+        db_session.add(Order(
+            customer_name="Клиент",
+            email="client@example.com",
+            phone="+79990000000",
+            address="ул. Пушкина, д. 1",
+            delivery_time=now,
+            order_time=now,
+            items=[{"name": "Футболка", "quantity": 1, "price": amount, "size": 2}],
+            total_amount=amount,
+            status=status,
+        ))
+    db_session.commit()
+    return db_session
+
+
+def test_statistics_single_query(db):
+    """
+    Статистика считается одним запросом и включает все встречающиеся статусы
+    """
+    with track_queries() as stats:
+        result = OrderService().get_orders_statistics(db)
+
+    assert stats.count == 1
+    assert result == {
+        "total_orders": 5,
+        "paid_orders": 2,
+        "created_orders": 1,
+        "canceled_orders": 1,
+        "total_revenue": 4000.0,
+        "by_status": {"paid": 2, "created": 1, "canceled": 1, "refunded": 1},
+    }
+
+
+def test_statistics_empty(db):
+    db.query(Order).delete()
+    db.commit()
+
+    result = OrderService().get_orders_statistics(db)
+
+    assert result["total_orders"] == 0
+    assert result["total_revenue"] == 0
+    assert result["by_status"] == {}
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+from app.models.order import Order
+from app.models.product import Product
+from app.core.exceptions import InvalidCursorException
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.order import OrderService
+from app.services.product import ProductService
+
+
+def _order(i: int) -> Order:
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return Order(
+        customer_name=f"Клиент {i}",
+        email="client@example.com" if i % 2 else "other@example.com",
+        phone="+79990000000",
+        address="ул. Пушкина, д. 1",
+        delivery_time=now,
+        order_time=now,
+        items=[{"name": "Футболка", "quantity": 1, "price": 1500.0, "size": 2}],
+        total_amount=1500.0,
+        status="paid" if i % 3 == 0 else "created",
+        # Часть заказов с одинаковым created_at — порядок внутри определяет id
+        created_at=now + timedelta(minutes=i // 2),
+    )
+
+
+class TestKeysetPagination:
+    """
+    Тесты keyset-пагинации товаров и заказов
+    """
+
+    def test_cursor_roundtrip(self):
+        """
+        Курсор кодируется и раскодируется без потерь
+        """
+        cursor = encode_cursor(5, "58289d8c-6015-467d-97f3-7c87ccaf0d42")
+        assert decode_cursor(cursor, 2) == [5, "58289d8c-6015-467d-97f3-7c87ccaf0d42"]
+        assert decode_cursor("", 2) is None
+
+    def test_invalid_cursor(self):
+        """
+        Некорректный курсор приводит к InvalidCursorException
+        """
+        with pytest.raises(InvalidCursorException):
+            decode_cursor("не-курсор", 2)
+        with pytest.raises(InvalidCursorException):
+            decode_cursor(encode_cursor(1), 2)
+
+    def test_products_cursor_with_wrong_types(self, db_session):
+        """
+        Курсор правильной длины, но с полями не тех типов — тоже InvalidCursorException (400)
+        """
+        product_id = "58289d8c-6015-467d-97f3-7c87ccaf0d42"
+        for cursor in (encode_cursor(1, 123), encode_cursor("1", product_id), encode_cursor(True, product_id), encode_cursor(1, "не-uuid")):
+            with pytest.raises(InvalidCursorException):
+                ProductService().get_products_page(db_session, limit=2, cursor=cursor)
+
+    def test_products_pages_cover_catalog(self, db_session):
+        """
+        Страницы товаров по курсору проходят весь каталог без пропусков и повторов,
+        товары без order_number идут в конце
+        """
+        for i, order_number in enumerate([3, 1, None, 2, 2, None, 5]):
+            db_session.add(Product(name=f"Товар {i}", size=[1], price=1000, order_number=order_number))
+        db_session.commit()
+
+        service = ProductService()
+        seen, cursor = [], ""
+        while cursor is not None:
+            page = service.get_products_page(db_session, limit=2, cursor=cursor)
+            assert len(page.products) <= 2
+            seen.extend(page.products)
+            cursor = page.next_cursor
+
+        assert len({p.id for p in seen}) == 7
+        order_numbers = [p.order_number for p in seen]
+        assert order_numbers == [1, 2, 2, 3, 5, None, None]
+
+    def test_orders_pages_cover_history(self, db_session):
+        """
+        Страницы заказов по курсору идут от новых к старым без пропусков и повторов
+        """
+        for i in range(7):
+            db_session.add(_order(i))
+        db_session.commit()
+
+        service = OrderService()
+        seen, cursor = [], ""
+        while cursor is not None:
+            page = service.get_recent_orders_page(db_session, limit=3, cursor=cursor)
+            seen.extend(page.orders)
+            cursor = page.next_cursor
+
+        assert [o.id for o in seen] == [7, 6, 5, 4, 3, 2, 1]
+
+        by_email = service.get_orders_by_email_page(db_session, "client@example.com", limit=10, cursor="")
+        assert by_email.next_cursor is None
+        assert {o.email for o in by_email.orders} == {"client@example.com"}
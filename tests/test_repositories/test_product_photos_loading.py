@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event
+from app.core.exceptions import InvalidFieldsException
+from app.models.photo import ProductPhoto
+from app.models.product import Product
+from app.services.product import ProductService, product_fields
+from tests.conftest import engine
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite с каталогом из 10 товаров по 2 фотографии
+    """
+    for i in range(10):
+        product = Product(name=f"Товар {i}", color="Синий", size=[1, 2], price=1000 + i, order_number=i)
+        product.photos = [
+            ProductPhoto(name=f"{i}-{n}.jpg", file_path=f"/app/uploads/products/{i}-{n}.jpg", priority=n)
+            for n in range(2)
+        ]
+        db_session.add(product)
+    db_session.commit()
+    db_session.expunge_all()
+    return db_session
+
+
+@pytest.fixture
+def queries():
+    """
+    Список выполненных SQL-запросов
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestProductPhotosLoading:
+    """
+    Фотографии товаров в списках загружаются одним запросом на страницу
+    """
+
+    @pytest.mark.parametrize("call", [
+        lambda service, db: service.get_products(db, 0, 100),
+        lambda service, db: service.get_products_by_size(db, 2, 0, 100),
+        lambda service, db: service.get_products_page(db, 100, ""),
+        lambda service, db: service.search_products(db, "Товар", 0, 100),
+        lambda service, db: service.get_products_by_price_range(db, 0, 5000, 0, 100),
+    ])
+    def test_list_paths_do_not_issue_query_per_product(self, db, queries, call):
+        """
+        Количество запросов не зависит от числа товаров на странице
+        """
+        result = call(ProductService(), db)
+
+        assert len(result.products) == 10
+        assert all(len(p.photos) == 2 for p in result.products)
+        product_queries = [q for q in queries if "FROM product_photos" in q]
+        assert len(product_queries) == 1
+
+    def test_without_photos(self, db, queries):
+        """
+        photos="none" не загружает фотографии вовсе
+        """
+        result = ProductService().get_products(db, 0, 100, photos="none")
+
+        assert all(p.photos == [] for p in result.products)
+        assert not [q for q in queries if "FROM product_photos" in q]
+
+    def test_main_photo_only(self, db, queries):
+        """
+        photos="main" — одна главная фотография на товар, один запрос на страницу
+        """
+        result = ProductService().get_products(db, 0, 100, photos="main")
+
+        assert all([photo.priority for photo in p.photos] == [0] for p in result.products)
+        assert len([q for q in queries if "FROM product_photos" in q]) == 1
+
+    def test_fields_projection(self, db, queries):
+        """
+        ?fields= — в ответе и в SELECT только запрошенные поля
+        """
+        fields = product_fields("name, price")
+        result = ProductService().get_products(db, 0, 100, photos="none", fields=fields)
+
+        assert fields == ("id", "name", "price")
+        assert set(result.products[0].model_dump()) == {"id", "name", "price"}
+        product_query = next(q for q in queries if "FROM products" in q and "count" not in q.lower())
+        assert "composition" not in product_query
+        assert not [q for q in queries if "FROM product_photos" in q]
+
+    def test_unknown_field_rejected(self):
+        with pytest.raises(InvalidFieldsException):
+            product_fields("name,password")
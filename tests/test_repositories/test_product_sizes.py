@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+from app.models.product import Product, mask_to_sizes, masks_with_any_size, sizes_to_mask
+from app.repositories.product import ProductRepository
+from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate
+from tests.conftest import engine
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite с товарами разных размеров
+    """
+    for name, sizes in [("XS-S", [0, 1]), ("M", [2]), ("L-XL", [3, 4]), ("Скоро", [])]:
+        db_session.add(Product(name=name, size=sizes, price=1000, soon=not sizes))
+    db_session.commit()
+    return db_session
+
+
+class TestSizeMask:
+    """
+    Кодирование размеров битовой маской
+    """
+
+    def test_roundtrip(self):
+        assert sizes_to_mask([3, 1, 1]) == 0b01010
+        assert mask_to_sizes(0b01010) == [1, 3]
+        assert mask_to_sizes(0) == []
+
+    def test_masks_with_any_size(self):
+        masks = masks_with_any_size([1, 2])
+        assert len(masks) == 24
+        assert all(mask & 0b00110 for mask in masks)
+
+    def test_api_shape_unchanged(self, db):
+        """
+        В API size по-прежнему массив чисел
+        """
+        product = db.query(Product).filter(Product.name == "L-XL").one()
+        assert ProductResponse.model_validate(product).size == [3, 4]
+
+
+class TestGetBySizes:
+    """
+    Фильтр по размерам — один предикат по size_mask
+    """
+
+    @pytest.mark.parametrize("sizes, expected", [
+        ([2], {"M"}),
+        ([1, 2], {"XS-S", "M"}),
+        ([0, 4], {"XS-S", "L-XL"}),
+    ])
+    def test_any_of_sizes(self, db, sizes, expected):
+        products = ProductRepository().get_by_sizes(db, sizes, photos="none")
+        assert {p.name for p in products} == expected
+
+    def test_single_predicate(self, db):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            ProductRepository().get_by_sizes(db, [1, 2], photos="none")
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert len(statements) == 1
+        assert "products.size_mask IN" in statements[0]
+
+    def test_create_and_update_through_schemas(self, db):
+        repository = ProductRepository()
+        product = repository.create(db, ProductCreate(name="Новый", size=[4, 0], price=500))
+        assert product.size_mask == 0b10001
+
+        updated = repository.update(db, product.id, ProductUpdate(size=[2]))
+        assert updated.size == [2]
@@ -0,0 +1,115 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from app.database import unit_of_work, in_unit_of_work
+from app.models.order import Order
+from app.schemas.order import OrderCreate
+from app.services.order import OrderService
+from tests.conftest import engine
+
+
+@pytest.fixture
+def statements():
+    """
+    Выполненные SQL-запросы и число commit
+    """
+    executed = {"sql": [], "commits": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed["sql"].append(statement)
+
+    def commit(conn):
+        executed["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "commit", commit)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine, "commit", commit)
+
+
+def _order_data() -> OrderCreate:
+    return OrderCreate(
+        customer_name="Клиент",
+        email="client@example.com",
+        phone="+79990000000",
+        address="ул. Пушкина, д. 1",
+        delivery_time=datetime(2030, 1, 1, 12, 0),
+        items=[{"name": "Футболка", "quantity": 1, "price": 1500.0, "size": 2}],
+        total_amount=1500.0,
+    )
+
+
+def _fake_payment(**kwargs):
+    return {"payment_id": f"pay-{kwargs['order_id']}", "confirmation_token": "token"}
+
+
+def test_payment_created_outside_transaction(db_session, statements):
+    """
+    Платеж создается после commit заказа (транзакция не ждет ЮKassa), payment_id — одним UPDATE
+    """
+    def payment(**kwargs):
+        assert not db_session.in_transaction()
+        assert statements["commits"] == 1
+        return _fake_payment(**kwargs)
+
+    order, payment_data = OrderService().create_order_with_payment(db_session, _order_data(), payment)
+
+    assert order.payment_id == payment_data["payment_id"] == f"pay-{order.id}"
+    assert order.created_at is not None
+    assert statements["commits"] == 2
+    assert [q.split()[0] for q in statements["sql"]] == ["INSERT", "UPDATE"]
+    assert not in_unit_of_work(db_session)
+
+    stored = db_session.get(Order, order.id)
+    assert stored.payment_id == f"pay-{order.id}"
+
+
+def test_payment_failure_removes_order(db_session):
+    """
+    Если платеж не создан, заказ не остается в БД
+    """
+    def failing_payment(**kwargs):
+        raise RuntimeError("ЮKassa недоступна")
+
+    with pytest.raises(RuntimeError):
+        OrderService().create_order_with_payment(db_session, _order_data(), failing_payment)
+
+    assert db_session.query(Order).count() == 0
+    assert not in_unit_of_work(db_session)
+
+
+def test_payment_id_not_saved_is_linked_by_webhook(db_session, monkeypatch):
+    """
+    Платеж создан, но UPDATE payment_id не прошел: клиент получает платеж,
+    а webhook находит заказ по metadata.order_id и сохраняет payment_id
+    """
+    service = OrderService()
+
+    def failing_update(*args):
+        raise RuntimeError("БД недоступна")
+
+    monkeypatch.setattr(service.repository, "set_payment_id", failing_update)
+    order, payment_data = service.create_order_with_payment(db_session, _order_data(), _fake_payment)
+    assert payment_data["payment_id"] == f"pay-{order.id}"
+    assert db_session.get(Order, order.id).payment_id is None
+
+    assert service.get_order_by_payment_id(db_session, f"pay-{order.id}") is None
+    found = service.get_order_by_payment_id(db_session, f"pay-{order.id}", str(order.id))
+    assert found.id == order.id and found.payment_id == f"pay-{order.id}"
+    # Заказ, уже связанный с другим платежом, чужим metadata не перехватывается
+    assert service.get_order_by_payment_id(db_session, "pay-other", str(order.id)) is None
+
+
+def test_nested_unit_of_work_joins_outer(db_session, statements):
+    service = OrderService()
+    with unit_of_work(db_session):
+        order = service.create_order(db_session, _order_data())
+        with unit_of_work(db_session):
+            service.update_order_status(db_session, order.id, "paid")
+        assert statements["commits"] == 0
+
+    assert statements["commits"] == 1
+    assert db_session.get(Order, order.id).status == "paid"
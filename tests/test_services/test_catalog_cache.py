@@ -0,0 +1,131 @@
+import pytest
+import time
+from uuid import uuid4
+from app.config import settings
+from app.core.cache import RedisBackend, configure_cache
+from app.core.exceptions import ProductNotFoundException
+from app.core.query_stats import install_query_listeners, track_queries
+from app.database import Base
+from app.repositories import base as base_repository
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.product import ProductService
+from tests.conftest import engine
+from tests.fake_redis import FakeRedisServer
+
+install_query_listeners(engine)
+
+
+@pytest.fixture
+def service():
+    return ProductService()
+
+
+def test_list_served_from_cache(db_session, service):
+    service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+    first = service.get_products(db_session)
+    with track_queries() as stats:
+        second = service.get_products(db_session)
+    assert stats.count == 0
+    assert second == first
+
+
+def test_write_invalidates(db_session, service):
+    product = service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+    assert service.get_product(db_session, product.id).price == 1500
+    service.update_product(db_session, product.id, ProductUpdate(price=1800))
+    assert service.get_product(db_session, product.id).price == 1800
+    assert service.get_products(db_session).total == 1
+    service.delete_product(db_session, product.id)
+    assert service.get_products(db_session).total == 0
+
+
+def test_list_total_exact_unless_approximate_enabled(db_session, service, monkeypatch):
+    service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+    # Устаревшее значение в кэше количества записей
+    base_repository._count_cache["products"] = (5, time.monotonic() + 60)
+    assert service.get_products(db_session).total == 1
+
+    monkeypatch.setattr(settings, "catalog_approximate_total", True)
+    service.create_product(db_session, ProductCreate(name="Рубашка", size=[2], price=1500))
+    base_repository._count_cache["products"] = (5, time.monotonic() + 60)
+    assert service.get_products(db_session).total == 5
+
+
+def test_unknown_id_cached_negatively(db_session, service):
+    product_id = uuid4()
+    with pytest.raises(ProductNotFoundException):
+        service.get_product(db_session, product_id)
+    with track_queries() as stats:
+        with pytest.raises(ProductNotFoundException):
+            service.get_product(db_session, product_id)
+    assert stats.count == 0
+
+
+def test_filters_cached_per_arguments(db_session, service):
+    service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+    assert service.get_products_by_size(db_session, 2).products
+    assert not service.get_products_by_size(db_session, 3).products
+    assert service.get_products_by_sizes(db_session, [3, 2]) is service.get_products_by_sizes(db_session, [2, 3])
+    assert service.get_products_by_price_range(db_session, 1000, 2000).products
+    stats = service.cache.stats()
+    assert stats["hits"] >= 1 and stats["misses"] >= 4
+
+
+def test_shared_backend_roundtrip(db_session, service):
+    server = FakeRedisServer().start()
+    try:
+        configure_cache(RedisBackend(server.url), serializer="orjson", prefix="test")
+        product = service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+        first = service.get_products(db_session)
+        card = service.get_product(db_session, product.id)
+        with track_queries() as stats:
+            assert service.get_products(db_session) == first
+            assert service.get_product(db_session, product.id) == card
+        assert stats.count == 0
+    finally:
+        server.stop()
+
+
+def test_update_evicts_only_changed_card(db_session, service):
+    first = service.create_product(db_session, ProductCreate(name="Футболка", size=[2], price=1500))
+    second = service.create_product(db_session, ProductCreate(name="Худи", size=[3], price=4000))
+    service.get_product(db_session, first.id)
+    service.get_product(db_session, second.id)
+    service.update_product(db_session, first.id, ProductUpdate(price=1700))
+    with track_queries() as stats:
+        assert service.get_product(db_session, second.id).price == 4000
+    assert stats.count == 0
+    assert service.get_product(db_session, first.id).price == 1700
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query(tmp_path, service, monkeypatch):
+    """
+    Одновременные промахи в async-режиме выполняют один запрос списка
+    """
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import run_in_session
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'flight.db'}")
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    calls = []
+    get_all = service.repository.get_all
+    monkeypatch.setattr(service.repository, "get_all", lambda *args: calls.append(args) or get_all(*args))
+
+    async def request():
+        async with session_factory() as db:
+            return await run_in_session(db, service.get_products, 0, 10)
+
+    try:
+        results = await asyncio.gather(*(request() for _ in range(5)))
+    finally:
+        await async_engine.dispose()
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+    assert service.cache.stats()["coalesced"] == 4
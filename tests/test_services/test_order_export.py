@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timezone
+from app.models.order import Order
+from app.services import order_export
+from app.services.order import OrderService
+from tests.conftest import TestingSessionLocal
+
+
+def _order(status, created_at, items):
+    return Order(
+        customer_name="Клиент",
+        email="client@example.com",
+        phone="+79990000000",
+        address="ул. Пушкина, д. 1",
+        delivery_time=created_at,
+        order_time=created_at,
+        items=items,
+        total_amount=sum(item["price"] * item["quantity"] for item in items),
+        status=status,
+        created_at=created_at,
+    )
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite с тремя заказами: два оплаченных (один из двух позиций) и созданный без позиций
+    """
+    db_session.add_all([
+        _order("paid", datetime(2025, 1, 1, 10, tzinfo=timezone.utc), [
+            {"name": "Футболка", "quantity": 2, "price": 1500.0, "size": 2},
+            {"name": "Худи", "quantity": 1, "price": 4000.0, "size": 3},
+        ]),
+        _order("created", datetime(2025, 1, 2, 10, tzinfo=timezone.utc), []),
+        _order("paid", datetime(2025, 2, 1, 10, tzinfo=timezone.utc), [
+            {"name": "Кепка", "quantity": 1, "price": 900.0, "size": 0},
+        ]),
+    ])
+    db_session.commit()
+    return db_session
+
+
+def test_csv_row_per_item(db):
+    text = "".join(OrderService().export_orders(db, "csv"))
+    assert text.startswith("\ufeff")
+    rows = list(csv.DictReader(io.StringIO(text[1:])))
+    assert [row["item_name"] for row in rows] == ["Футболка", "Худи", "", "Кепка"]
+    assert rows[0]["order_id"] == rows[1]["order_id"]
+    assert rows[1]["item_size_label"] == "L"
+    assert rows[2]["status"] == "created" and rows[2]["item_index"] == ""
+
+
+def test_csv_escapes_formulas(db):
+    """
+    Значения клиента, которые Excel принял бы за формулу, начинаются с апострофа; NDJSON не меняется
+    """
+    order = _order("paid", datetime(2025, 3, 1, 10, tzinfo=timezone.utc), [
+        {"name": "=HYPERLINK(\"http://evil\")", "quantity": 1, "price": 100.0, "size": 2},
+    ])
+    order.customer_name = "@SUM(A1)"
+    order.address = "-2+3"
+    db.add(order)
+    db.commit()
+
+    text = "".join(OrderService().export_orders(db, "csv", status="paid", date_from=datetime(2025, 3, 1)))
+    row = next(csv.DictReader(io.StringIO(text[1:])))
+    assert row["item_name"] == "'=HYPERLINK(\"http://evil\")"
+    assert row["customer_name"] == "'@SUM(A1)"
+    assert row["address"] == "'-2+3"
+    assert row["phone"] == "'+79990000000"
+    assert row["email"] == "client@example.com"
+    assert row["item_price"] == "100.0"
+
+    chunks = OrderService().export_orders(db, "ndjson", date_from=datetime(2025, 3, 1))
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert records[0]["customer_name"] == "@SUM(A1)"
+
+
+def test_ndjson_filters(db):
+    chunks = OrderService().export_orders(
+        db, "ndjson",
+        date_from=datetime(2025, 1, 1),
+        date_to=datetime(2025, 2, 1),
+        status="paid"
+    )
+    records = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [record["item_name"] for record in records] == ["Футболка", "Худи"]
+    assert records[0]["item_quantity"] == 2 and records[0]["status"] == "paid"
+
+
+def test_chunks_are_batched(db, monkeypatch):
+    monkeypatch.setattr(order_export, "CHUNK_SIZE", 200)
+    chunks = list(OrderService().export_orders(db, "ndjson"))
+    assert len(chunks) > 1
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_stream_opens_and_closes_own_session(db):
+    """
+    Генератор для StreamingResponse не зависит от сессии запроса: открывает свою из фабрики,
+    первую порцию читает сразу и закрывает сессию по окончании
+    """
+    sessions = []
+
+    def session_factory():
+        sessions.append(TestingSessionLocal())
+        return sessions[-1]
+
+    chunks = await OrderService().stream_export(session_factory, "ndjson", status="paid")
+    assert len(sessions) == 1
+    assert len("".join(chunks).splitlines()) == 3
+    assert not sessions[0].in_transaction()
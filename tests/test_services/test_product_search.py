@@ -0,0 +1,150 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from app.config import settings
+from app.models.product import Product
+from app.repositories.product import ProductRepository
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.product import ProductService
+from app.services import search_index as search_index_module
+from app.services.search_index import ProductSearchIndex, search_index
+from tests.conftest import engine
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite: три футболки, совпадения по артикулу и составу, кепка
+    """
+    for n in range(3):
+        db_session.add(Product(name=f"Футболка {n}", color="Белый", size=[2], price=1000, order_number=n))
+    db_session.add(Product(name="Лонгслив", sku="TSHIRT-LS", size=[2], price=1500, order_number=3))
+    db_session.add(Product(name="Худи", composition="Хлопок, как у tshirt", size=[2], price=3000, order_number=4))
+    db_session.add(Product(name="Кепка", color="Черный", size=[2], price=500, order_number=5))
+    db_session.commit()
+    return db_session
+
+
+def test_total_counts_all_matches_in_one_query(db):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        products, total = ProductRepository().search_products(db, "Футболка", skip=0, limit=2, photos="none")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert [p.name for p in products] == ["Футболка 0", "Футболка 1"]
+    assert total == 3
+    assert len(statements) == 1
+
+
+def test_search_covers_sku_and_composition(db):
+    products, total = ProductRepository().search_products(db, "tshirt", photos="none")
+    assert {p.name for p in products} == {"Лонгслив", "Худи"}
+    assert total == 2
+
+
+def test_page_past_the_end_keeps_total(db):
+    assert ProductRepository().search_products(db, "Футболка", skip=10, limit=2, photos="none") == ([], 3)
+    assert ProductRepository().search_products(db, "нет такого", photos="none") == ([], 0)
+
+
+def test_service_total_is_not_page_size(db):
+    result = ProductService().search_products(db, "Футболка", skip=2, limit=2, photos="none")
+    assert [p.name for p in result.products] == ["Футболка 2"]
+    assert result.total == 3
+
+
+def test_postgres_query_uses_search_columns():
+    """
+    В PostgreSQL поиск идет по индексируемым search_vector (@@) и search_text (<%)
+    """
+    repository = ProductRepository()
+    captured = []
+
+    class FakeResult:
+        def all(self):
+            return []
+
+    class FakeSession:
+        def get_bind(self):
+            class Bind:
+                dialect = postgresql.dialect()
+            return Bind()
+
+        def execute(self, stmt):
+            captured.append(str(stmt.compile(dialect=postgresql.dialect())))
+            return FakeResult()
+
+    assert repository.search_products(FakeSession(), "футболка", photos="none") == ([], 0)
+    sql = captured[0]
+    assert "products.search_vector @@ websearch_to_tsquery(CAST(" in sql
+    assert "<%% products.search_text" in sql
+    assert "count(*) OVER ()" in sql
+    assert "ts_rank_cd(products.search_vector" in sql
+
+
+class TestSearchIndex:
+    """
+    Поиск по индексу в памяти (search_index_enabled)
+    """
+
+    def test_case_and_yo_folding(self, db):
+        db.add(Product(name="Ёлочная ТОЛСТОВКА", size=[2], price=4000, order_number=6))
+        db.commit()
+        assert ProductSearchIndex().search(db, "елочная толстовка")[1] == 1
+        assert ProductSearchIndex().search(db, "ЁЛОЧНАЯ")[1] == 1
+
+    def test_prefix_typo_and_sku(self, db):
+        index = ProductSearchIndex()
+        assert index.search(db, "футб")[1] == 3
+        assert index.search(db, "футболко")[1] == 3
+        assert index.search(db, "tshirt-ls")[1] == 1
+        # Все слова запроса должны совпасть
+        assert index.search(db, "футболка черный") == ([], 0)
+
+    def test_name_ranks_above_color(self, db):
+        db.add(Product(name="Белый носок", size=[2], price=300, order_number=7))
+        db.commit()
+        index = ProductSearchIndex()
+        ids, total = index.search(db, "белый", limit=1)
+        assert total == 4
+        assert db.get(Product, ids[0]).name == "Белый носок"
+
+    def test_service_writes_update_index(self, db):
+        service = ProductService()
+        assert service.search_products(db, "Свитшот", photos="none").total == 0
+        created = service.create_product(db, ProductCreate(name="Свитшот", color="Серый", size=[2], price=3500))
+        assert service.search_products(db, "свитшот", photos="none").total == 1
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        service.update_product(db, created.id, ProductUpdate(name="Бомбер"))
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert service.search_products(db, "бомбер", photos="none").total == 1
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        # Дочитывается только измененный товар
+        assert any("WHERE products.id IN" in s and "products.color" in s for s in statements)
+
+        service.delete_product(db, created.id)
+        assert service.search_products(db, "бомбер", photos="none").total == 0
+
+    def test_rebuilt_after_max_age_without_notifications(self, db, monkeypatch):
+        index = ProductSearchIndex()
+        assert index.search(db, "кепка")[1] == 1
+        # Изменение в другом воркере, уведомление потеряно
+        db.query(Product).filter(Product.name == "Кепка").update({"name": "Панама"})
+        db.commit()
+        assert index.search(db, "кепка")[1] == 1
+        now = search_index_module.time.monotonic()
+        monkeypatch.setattr(search_index_module.time, "monotonic", lambda: now + settings.search_index_max_age + 1)
+        assert index.search(db, "кепка") == ([], 0)
+        assert index.search(db, "панама")[1] == 1
+
+    def test_disabled_falls_back_to_sql(self, db, monkeypatch):
+        monkeypatch.setattr(settings, "search_index_enabled", False)
+        monkeypatch.setattr(search_index, "search", None)
+        result = ProductService().search_products(db, "Футболка", photos="none")
+        assert result.total == 3
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import event
+from app.config import settings
+from app.models.product import Product
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.product import ProductService
+from app.services import suggest_index as suggest_index_module
+from app.services.suggest_index import SuggestIndex, suggest_index
+from tests.conftest import engine
+
+
+@pytest.fixture
+def db(db_session):
+    """
+    Сессия SQLite с несколькими товарами
+    """
+    db_session.add(Product(name="Футболка SOUTH CLUB", sku="TS-001", size=[2], price=2500, order_number=2))
+    db_session.add(Product(name="Футболка SOUTH CLUB", sku="TS-002", size=[2], price=2500, order_number=3))
+    db_session.add(Product(name="Белая футболка", size=[2], price=2000, order_number=1))
+    db_session.add(Product(name="Ёжик худи", sku="HD-777", size=[2], price=4000, order_number=4))
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def queries():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def texts(suggestions):
+    return [s["text"] for s in suggestions]
+
+
+def test_prefix_ranking_and_dedup(db):
+    index = SuggestIndex()
+    index.load(db)
+    # Начало названия раньше совпадения с начала слова, одинаковые названия — одной подсказкой
+    assert texts(index.suggest("фут")) == ["Футболка SOUTH CLUB", "Белая футболка"]
+    assert texts(index.suggest("south")) == ["Футболка SOUTH CLUB"]
+    assert texts(index.suggest("ts-")) == ["TS-001", "TS-002"]
+    assert texts(index.suggest("ЕЖ")) == ["Ёжик худи"]
+    assert texts(index.suggest("фут", limit=1)) == ["Футболка SOUTH CLUB"]
+    assert index.suggest("носок") == []
+    assert index.suggest("   ") == []
+
+
+def test_suggest_does_not_touch_database(db, queries):
+    index = SuggestIndex()
+    index.load(db)
+    queries.clear()
+    index.suggest("фут")
+    assert queries == []
+
+
+def test_service_writes_update_suggestions(db, queries):
+    service = ProductService()
+    suggest_index.load(db)
+    created = service.create_product(db, ProductCreate(name="Свитшот", sku="SW-1", size=[2], price=3500))
+    service.update_product(db, created.id, ProductUpdate(name="Бомбер"))
+    queries.clear()
+    assert texts(suggest_index.suggest("бом")) == ["Бомбер"]
+    assert suggest_index.suggest("свит") == []
+    assert queries == []
+    service.delete_product(db, created.id)
+    assert suggest_index.suggest("бом") == []
+
+
+def test_changes_from_other_workers_reloaded_by_id(db):
+    index = SuggestIndex()
+    index.load(db)
+    product = db.query(Product).filter(Product.sku == "HD-777").one()
+    product.name = "Худи зимнее"
+    db.commit()
+    index.invalidate(product.id)
+    assert texts(index.suggest("ёжик")) == ["Ёжик худи"]
+    index.load(db)
+    assert texts(index.suggest("худи")) == ["Худи зимнее"]
+
+
+def test_suggest_endpoint(client, db, queries):
+    suggest_index.load(db)
+    queries.clear()
+    response = client.get("/api/v1/products/suggest", params={"q": "hd"})
+    assert response.status_code == 200
+    assert response.json()["suggestions"][0]["text"] == "HD-777"
+    assert response.json()["suggestions"][0]["kind"] == "sku"
+    assert queries == []
+
+
+@pytest.mark.asyncio
+async def test_background_reload_after_max_age(db, monkeypatch):
+    async def run_in_read_session(fn):
+        return fn(db)
+
+    monkeypatch.setattr(suggest_index_module, "run_in_read_session", run_in_read_session)
+    index = SuggestIndex()
+    index.load(db)
+    # Изменение в другом воркере, уведомление потеряно: до истечения max_age загрузки нет
+    db.query(Product).filter(Product.sku == "HD-777").update({"name": "Панама"})
+    db.commit()
+    index.refresh_in_background()
+    assert index._task is None
+    now = suggest_index_module.time.monotonic()
+    monkeypatch.setattr(suggest_index_module.time, "monotonic", lambda: now + settings.search_index_max_age + 1)
+    index.refresh_in_background()
+    await index._task
+    assert texts(index.suggest("пан")) == ["Панама"]
+    assert index.suggest("ежик") == []